@@ -1,12 +1,16 @@
+import asyncio
 from fastapi import FastAPI, status
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.middleware.trustedhost import TrustedHostMiddleware
 from fastapi.responses import JSONResponse
 from src.core.config import settings
-from src.db.init_db import engine, Base
 from src.api.routes import auth, users, requisition, evaluate, interview_analyse
 from src.middleware.auth import AuthMiddleware
 from src.middleware.logging import LoggingMiddleware
+from src.middleware.rate_limit import RateLimitMiddleware
+from src.middleware.compression import CompressionMiddleware
+from src.services.readiness import check_readiness, warm_up
+from src.services.analysis_jobs import relay_analysis_events
 import logging
 
 # Configure logging
@@ -16,8 +20,7 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-# Create tables
-Base.metadata.create_all(bind=engine)
+# Schema is managed by `python -m src.db.bootstrap`, run once per deploy
 
 # Initialize FastAPI app
 app = FastAPI(
@@ -29,8 +32,12 @@ app = FastAPI(
 )
 
 # Add custom middleware (order matters!)
+app.add_middleware(CompressionMiddleware)
 app.add_middleware(LoggingMiddleware)
 app.add_middleware(AuthMiddleware)
+# runs before auth, so floods are refused without a user lookup; inside CORS
+# so 429s still carry CORS headers
+app.add_middleware(RateLimitMiddleware)
 
 # CORS Middleware
 app.add_middleware(
@@ -68,6 +75,22 @@ def health_check():
         "version": settings.APP_VERSION
     }
 
+@app.on_event("startup")
+async def warm_dependencies():
+    # don't block startup on a slow dependency; /ready reports when it's warm
+    asyncio.get_running_loop().run_in_executor(None, warm_up)
+    # analysis results from the worker, pushed to this process's websockets
+    app.state.analysis_relay = asyncio.create_task(relay_analysis_events())
+
+
+@app.get("/ready", tags=["Health"])
+def readiness_check():
+    result = check_readiness()
+    return JSONResponse(
+        status_code=status.HTTP_200_OK if result["ready"] else status.HTTP_503_SERVICE_UNAVAILABLE,
+        content=result,
+    )
+
 @app.get("/", tags=["Root"])
 def root():
     return {
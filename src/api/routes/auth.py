@@ -1,4 +1,5 @@
 from fastapi import APIRouter, Depends, HTTPException, status, Response
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
 from typing import cast
 from src.db.init_db import get_db
@@ -6,11 +7,13 @@ from src.schemas.token import Token, UserLogin
 from src.schemas.user import UserCreate, UserResponse
 from src.models.user import User
 from src.core.security import (
-    verify_password,
-    get_password_hash,
+    verify_and_update_password,
+    hash_password_async,
     create_access_token,
     create_refresh_token
 )
+from src.core.password_pool import password_pool
+from src.api.deps import get_current_active_user
 from src.core.config import settings
 from sqlalchemy.exc import IntegrityError
 import re
@@ -19,7 +22,7 @@ router = APIRouter()
 
 
 @router.post("/register", response_model=UserResponse, status_code=status.HTTP_201_CREATED)
-def register(user_in: UserCreate, db: Session = Depends(get_db)):
+async def register(user_in: UserCreate, db: Session = Depends(get_db)):
 
     # Basic validations
     email_regex = r"^[^@\s]+@[^@\s]+\.[^@\s]+$"
@@ -49,9 +52,9 @@ def register(user_in: UserCreate, db: Session = Depends(get_db)):
         )
 
     # Check existing user (by email or username)
-    existing_user = db.query(User).filter(
+    existing_user = await run_in_threadpool(lambda: db.query(User).filter(
         (User.email == user_in.email) | (User.username == user_in.username)
-    ).first()
+    ).first())
 
     if existing_user:
         raise HTTPException(
@@ -63,13 +66,13 @@ def register(user_in: UserCreate, db: Session = Depends(get_db)):
         email=user_in.email,
         name=user_in.name,
         username=user_in.username,
-        hashed_password=get_password_hash(user_in.password),
+        hashed_password=await hash_password_async(user_in.password),
         team_role=user_in.team_role
     )
     db.add(user)
     try:
-        db.commit()
-        db.refresh(user)
+        await run_in_threadpool(db.commit)
+        await run_in_threadpool(db.refresh, user)
         return user
     except IntegrityError:
         db.rollback()
@@ -88,15 +91,31 @@ def register(user_in: UserCreate, db: Session = Depends(get_db)):
 
 
 @router.post("/login", response_model=Token)
-def login(credentials: UserLogin, response: Response, db: Session = Depends(get_db)):
-    user = db.query(User).filter(User.email == credentials.email).first()
-    if not user or not verify_password(credentials.password, cast(str, user.hashed_password)):
+async def login(credentials: UserLogin, response: Response, db: Session = Depends(get_db)):
+    # DB calls stay on the threadpool; only the Argon2 work goes to its own pool
+    user = await run_in_threadpool(
+        lambda: db.query(User).filter(User.email == credentials.email).first())
+    valid, updated_hash = (False, None)
+    if user:
+        valid, updated_hash = await verify_and_update_password(
+            credentials.password, cast(str, user.hashed_password))
+    if not user or not valid:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect email or password",
             headers={"WWW-Authenticate": "Bearer"},
         )
 
+    if updated_hash is not None:
+        # hashed with older Argon2 parameters: upgrade while we have the password
+        user.hashed_password = updated_hash  # type: ignore
+        try:
+            await run_in_threadpool(db.commit)
+            await run_in_threadpool(db.refresh, user)
+        except Exception:
+            # keep the old hash; the user is still authenticated
+            db.rollback()
+
     user_payload = UserResponse.model_validate(user).model_dump(mode="json")
 
     access_token = create_access_token(data={"sub": user.email, "user": user_payload})
@@ -119,3 +138,8 @@ def logout(response: Response):
     response.delete_cookie(key=settings.ACCESS_TOKEN_COOKIE_NAME, path="/")
     response.delete_cookie(key=settings.REFRESH_TOKEN_COOKIE_NAME, path="/")
     return {"msg": "Successfully logged out"}
+
+
+@router.get("/hash-stats")
+def hash_stats(current_user=Depends(get_current_active_user)):
+    return {"success": True, "data": password_pool.stats()}
@@ -6,10 +6,11 @@ from datetime import datetime, date, time
 from sqlalchemy.orm import joinedload
 from src.schemas.evaluation import EvaluationSingle
 from sqlalchemy.inspection import inspect
-from sqlalchemy import or_
+from sqlalchemy import func, or_
     
 
 from src.services.process_evalution import event_stream_generator
+from src.services.llm_router import llm_router
 from ..deps import get_current_active_user
 from src.models.candidateprofile import CandidateProfile
 from src.schemas.candidateSchema import CandidateCreate, CandidateResponse
@@ -17,6 +18,8 @@ from src.models.evaluations import Evaluation as EvalModel
 
 from src.models.Requisition import Requisition
 from src.db.init_db import get_db
+from src.db.replicas import get_read_db
+from src.utils.etag import conditional
 from sqlalchemy.exc import IntegrityError
 import re
 
@@ -128,12 +131,14 @@ async def upload_multiple_files(
 
 @router.get("/evaluations", status_code=status.HTTP_200_OK)
 def list_evaluations(
+    request: Request,
+    response: Response,
     skip: int = 0,
     limit: int = 100,
     today: bool = False,
     search: str = "",
     current_user: Any = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     """
     List candidate evaluations for requisitions created by the current user.
@@ -158,12 +163,8 @@ def list_evaluations(
         )
     
     try:
-        # Build the main query with eager loading
         # Filter evaluations for requisitions created by current user
-        query = db.query(EvalModel).options(
-            joinedload(EvalModel.candidate),
-            joinedload(EvalModel.requisition_obj).joinedload(Requisition.creator)
-        ).join(
+        query = db.query(EvalModel).join(
             Requisition,
             EvalModel.requisition_id == Requisition.id
         ).join(
@@ -194,8 +195,24 @@ def list_evaluations(
                 EvalModel.evaluated_at <= end_dt
             )
         
-        # Execute query with pagination
-        evaluations = query.offset(skip).limit(limit).all()
+        # Version stamp of everything the page is built from: answer 304
+        # before running the heavy query if the client's copy is current
+        stamp = query.with_entities(
+            func.count(EvalModel.id),
+            func.max(EvalModel.updated_at),
+            func.max(CandidateProfile.updated_at),
+            func.max(Requisition.updated_at),
+        ).one()
+        unchanged = conditional(
+            request, response, "evaluations", current_user.id, skip, limit, today, search, *stamp)
+        if unchanged is not None:
+            return unchanged
+
+        # Execute query with pagination, eager loading the relations
+        evaluations = query.options(
+            joinedload(EvalModel.candidate),
+            joinedload(EvalModel.requisition_obj).joinedload(Requisition.creator)
+        ).offset(skip).limit(limit).all()
         
         # Serialize the results
         result = []
@@ -265,4 +282,9 @@ def list_evaluations(
         raise HTTPException (
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Failed to fetch evaluations: {str(e)}"
-        )
\ No newline at end of file
+        )
+
+@router.get("/llm-stats", status_code=status.HTTP_200_OK)
+def llm_stats(current_user: Any = Depends(get_current_active_user)):
+    """Routing latency, key load and rate-budget queue metrics for this process."""
+    return {"success": True, "data": llm_router.stats()}
@@ -1,16 +1,30 @@
 import logging
+import uuid
 
-from fastapi import APIRouter, Depends, HTTPException, WebSocket, WebSocketDisconnect, status, Response
+from fastapi import APIRouter, Depends, HTTPException, Request, WebSocket, WebSocketDisconnect, status, Response
 from fastapi.encoders import jsonable_encoder
-from sqlalchemy.orm import Session, joinedload
+from sqlalchemy import func
+from sqlalchemy.orm import Session, contains_eager, joinedload
 from ..deps import get_current_active_user
 from src.services.websocket import manager
 from src.models.interview import Interview
 from src.models.evaluations import Evaluation
-from src.db.init_db import get_db
-from src.services.livekit import verify_livekit_token
+from src.models.candidateprofile import CandidateProfile
+from src.models.Requisition import Requisition
+from src.db.init_db import get_db, session_scope
+from src.db.replicas import get_read_db
+from src.utils.etag import conditional
+from src.utils.single_flight import single_flight
+from src.core.config import settings
+from src.services.livekit import token_expires_in, verify_livekit_token_cached
+from src.services.interview_cache import (
+    check_interview_password,
+    get_interview_data,
+    password_attempt_allowed,
+    set_interview_data,
+)
 from pydantic import BaseModel
-from src.services.process_interview import analyze_transcript_content
+from src.services.analysis_jobs import AnalysisQueueFull, get_job, submit_analysis
 
 
 class PasswordCheckRequest(BaseModel):
@@ -22,208 +36,208 @@ router = APIRouter()
 logger = logging.getLogger(__name__)
 
 
-@router.post("/analyze")
+@router.post("/analyze", status_code=status.HTTP_202_ACCEPTED)
 async def analyze_data(payload: dict, db: Session = Depends(get_db)):
 
     transcript_data = payload.get("transcript_data")
     room_name = payload.get("room_name")
-    candidate_details = payload.get("candidate_details")
-    job_description = payload.get("job_description")
 
-    processed = {
-        "transcript_data": transcript_data,
-        "room_name": room_name,
-        "candidate_details": candidate_details,
-        "job_description": job_description,
-    }
-
-    if transcript_data and room_name:
-        analysis_result = analyze_transcript_content(transcript_data)
-
-        if "error" in analysis_result:
-            raise HTTPException(
-                status_code=500, detail=analysis_result["error"])
+    if not transcript_data or not room_name:
+        raise HTTPException(
+            status_code=400, detail="transcript_data and room_name are required")
 
-        interview = (
-            db.query(Interview)
-            .options(joinedload(Interview.evaluationResult))
-            .filter(Interview.room_name == room_name)
-            .first()
-        )
-        if not interview:
-            raise HTTPException(
-                status_code=404, detail="Interview not found for provided room name")
+    interview = (
+        db.query(Interview.id, Interview.evaluation_id)
+        .filter(Interview.room_name == room_name)
+        .first()
+    )
+    if not interview:
+        raise HTTPException(
+            status_code=404, detail="Interview not found for provided room name")
+    if not interview.evaluation_id:
+        raise HTTPException(
+            status_code=404, detail="Evaluation not linked to interview")
 
-        evaluation = interview.evaluationResult
-        if not evaluation:
-            raise HTTPException(
-                status_code=404, detail="Evaluation not linked to interview")
-
-        report_payload = analysis_result.get("analysis") or analysis_result
-        evaluation.report = report_payload
-        evaluation.interview_status = True
-
-        try:
-            db.add(evaluation)
-            db.commit()
-            db.refresh(evaluation)
-        except Exception:
-            db.rollback()
-            logger.exception(
-                "Failed to persist interview analysis for room %s", room_name)
-            raise HTTPException(
-                status_code=500, detail="Failed to persist interview analysis")
+    try:
+        job = submit_analysis(db, transcript_data, room_name)
+    except AnalysisQueueFull:
+        raise HTTPException(
+            status_code=503, detail="Analysis queue is full, retry later")
 
-    payload = {
-        "status": "success",
+    return {
+        "status": "accepted",
+        "job_id": job["job_id"],
         "room_name": room_name,
-        "analysis": analysis_result,
     }
 
-    await manager.broadcast(payload)
 
-    return payload
+@router.get("/analyze/{job_id}")
+def get_analysis_job(job_id: uuid.UUID, db: Session = Depends(get_db), current_user=Depends(get_current_active_user)):
+    job = get_job(db, str(job_id))
+    if not job:
+        raise HTTPException(status_code=404, detail="Analysis job not found")
+    return {"success": True, "data": job}
 
 
 @router.websocket("/ws")
 async def websocket_endpoint(ws: WebSocket):
     await manager.connect(ws)
     try:
-        while True:
-            await ws.receive_text()  # keep connection alive
+        # reads until the client leaves; heartbeats catch peers that vanish
+        await manager.receive_until_closed(ws)
     except WebSocketDisconnect:
+        pass
+    finally:
         manager.disconnect(ws)
 
 
-@router.get('/get-context/{room_name}')
-def get_context(room_name: str, db: Session = Depends(get_db)):
-    interview = (
-        db.query(Interview)
-        .options(
-            joinedload(Interview.candidateDetails),
-            joinedload(Interview.requisition),
-        )
-        .filter(Interview.room_name == room_name)
-        .first()
-    )
-    if not interview:
-        raise HTTPException(
-            status_code=404, detail="Interview context not found")
-
-    candidate_payload = (
-        jsonable_encoder(
-            interview.candidateDetails,
-            exclude={"evaluation", "interviews", "evaluated_by"},
-        )
-        if getattr(interview, "candidateDetails", None)
-        else None
-    )
-
-    requisition_payload = None
-    job_description_text = ""
-    if getattr(interview, "requisition", None):
-        requisition_obj = interview.requisition
-        requisition_payload = jsonable_encoder(
-            requisition_obj,
-            exclude={"evaluations", "interviews", "creator"},
-        )
-        title = requisition_obj.requisition or ""
-        description = requisition_obj.description or ""
-        job_description_text = (title + "\n" + description).strip()
-
-    response_data = {
-        "candidate_details": candidate_payload,
-        "job_description": job_description_text,
-    }
-
-    return {"status": "success", "data": response_data}
-
+@router.get("/ws-stats")
+def websocket_stats(current_user=Depends(get_current_active_user)):
+    return {"success": True, "data": manager.stats()}
 
-@router.get('/get-data/{id}')
-def get_data(id: str, db: Session = Depends(get_db)):
-    try:
-        if not id:
-            raise HTTPException(
-                status_code=400, detail="Room name is required")
 
+@router.get('/get-context/{room_name}')
+@single_flight(key=lambda room_name, **_: ("context", room_name), ttl=settings.SINGLE_FLIGHT_TTL)
+def get_context(room_name: str):
+    # opened by the leader only, so coalesced callers never take a connection
+    with session_scope() as db:
         interview = (
             db.query(Interview)
             .options(
                 joinedload(Interview.candidateDetails),
                 joinedload(Interview.requisition),
-                joinedload(Interview.evaluationResult),
             )
-            .filter(Interview.id == id)
+            .filter(Interview.room_name == room_name)
             .first()
         )
         if not interview:
-            raise HTTPException(status_code=404, detail="Data not found")
-
-        token_value = getattr(interview, "token", None)
-        if token_value is not None and not isinstance(token_value, str):
-            token_value = str(token_value)
-
-        response = verify_livekit_token(token_value or "")
-        valid = False
-        if isinstance(response, dict):
-            valid = response.get("valid", False)
-        else:
-            valid = getattr(response, "valid", False)
-
-        if not valid:
-            logger.warning(
-                "LiveKit token validation failed for interview %s", interview.id)
-            raise HTTPException(status_code=401, detail="Invalid token")
-
-        base_payload = jsonable_encoder(
-            interview,
-            exclude={"candidateDetails", "requisition", "evaluationResult"},
-        )
+            raise HTTPException(
+                status_code=404, detail="Interview context not found")
 
         candidate_payload = (
             jsonable_encoder(
                 interview.candidateDetails,
-                exclude={"evaluation", "interviews", "evaluated_by"},
+                exclude={"evaluations", "interviews", "evaluated_by"},
             )
             if getattr(interview, "candidateDetails", None)
             else None
         )
 
-        requisition_payload = (
-            jsonable_encoder(
-                interview.requisition,
+        requisition_payload = None
+        job_description_text = ""
+        if getattr(interview, "requisition", None):
+            requisition_obj = interview.requisition
+            requisition_payload = jsonable_encoder(
+                requisition_obj,
                 exclude={"evaluations", "interviews", "creator"},
             )
-            if getattr(interview, "requisition", None)
-            else None
-        )
+            title = requisition_obj.requisition or ""
+            description = requisition_obj.description or ""
+            job_description_text = (title + "\n" + description).strip()
 
-        evaluation_payload = (
-            jsonable_encoder(
-                interview.evaluationResult,
-                exclude={"candidate", "requisition_obj", "interview"},
+        response_data = {
+            "candidate_details": candidate_payload,
+            "job_description": job_description_text,
+        }
+
+        return {"status": "success", "data": response_data}
+
+
+@router.get('/get-data/{id}')
+@single_flight(key=lambda id, **_: ("data", id), ttl=settings.SINGLE_FLIGHT_TTL)
+def get_data(id: str):
+    try:
+        if not id:
+            raise HTTPException(
+                status_code=400, detail="Room name is required")
+
+        # the candidate page polls this; serve the verified payload from memory
+        cached = get_interview_data(id)
+        if cached is not None:
+            return {"success": True, "data": cached}
+
+        # opened by the leader only, so coalesced callers never take a connection
+        with session_scope() as db:
+            interview = (
+                db.query(Interview)
+                .options(
+                    joinedload(Interview.candidateDetails),
+                    joinedload(Interview.requisition),
+                    joinedload(Interview.evaluationResult),
+                )
+                .filter(Interview.id == id)
+                .first()
             )
-            if getattr(interview, "evaluationResult", None)
-            else None
-        )
-        interview_payload = (
-            jsonable_encoder(
+            if not interview:
+                raise HTTPException(status_code=404, detail="Data not found")
+
+            token_value = getattr(interview, "token", None)
+            if token_value is not None and not isinstance(token_value, str):
+                token_value = str(token_value)
+
+            response = verify_livekit_token_cached(token_value or "")
+            valid = False
+            if isinstance(response, dict):
+                valid = response.get("valid", False)
+            else:
+                valid = getattr(response, "valid", False)
+
+            if not valid:
+                logger.warning(
+                    "LiveKit token validation failed for interview %s", interview.id)
+                raise HTTPException(status_code=401, detail="Invalid token")
+
+            base_payload = jsonable_encoder(
                 interview,
-                exclude={"candidateDetails",
-                         "requisition", "evaluationResult"},
+                exclude={"candidateDetails", "requisition", "evaluationResult"},
             )
-        )
 
-        base_payload.update(
-            {
+            candidate_payload = (
+                jsonable_encoder(
+                    interview.candidateDetails,
+                    exclude={"evaluations", "interviews", "evaluated_by"},
+                )
+                if getattr(interview, "candidateDetails", None)
+                else None
+            )
 
-                "candidate": candidate_payload,
-                "requisition": requisition_payload,
-                "evaluation": evaluation_payload,
-            }
-        )
+            requisition_payload = (
+                jsonable_encoder(
+                    interview.requisition,
+                    exclude={"evaluations", "interviews", "creator"},
+                )
+                if getattr(interview, "requisition", None)
+                else None
+            )
 
-        return {"success": True, "data": base_payload}
+            evaluation_payload = (
+                jsonable_encoder(
+                    interview.evaluationResult,
+                    exclude={"candidate", "requisition_obj", "interview"},
+                )
+                if getattr(interview, "evaluationResult", None)
+                else None
+            )
+            interview_payload = (
+                jsonable_encoder(
+                    interview,
+                    exclude={"candidateDetails",
+                             "requisition", "evaluationResult"},
+                )
+            )
+
+            base_payload.update(
+                {
+
+                    "candidate": candidate_payload,
+                    "requisition": requisition_payload,
+                    "evaluation": evaluation_payload,
+                }
+            )
+
+            set_interview_data(id, base_payload, token_expires_in(response))
+
+            return {"success": True, "data": base_payload}
     except HTTPException:
         raise
     except Exception as exc:
@@ -240,15 +254,19 @@ def check_password(payload: PasswordCheckRequest, db: Session = Depends(get_db))
         if not payload.password:
             raise HTTPException(status_code=400, detail="Password is required")
 
-        interview = db.query(Interview).filter(
-            Interview.id == payload.id).first()
-        if not interview:
-            raise HTTPException(status_code=404, detail="Data not found")
+        if not password_attempt_allowed(payload.id):
+            raise HTTPException(
+                status_code=429, detail="Too many attempts, please wait a minute",
+                headers={"Retry-After": "60"})
+
+        def load_password(interview_id: str):
+            row = db.query(Interview.password).filter(
+                Interview.id == interview_id).first()
+            return row.password if row else None
 
-        match = db.query(Interview).filter(
-            Interview.id == payload.id,
-            Interview.password == payload.password
-        ).first()
+        match = check_interview_password(payload.id, payload.password, load_password)
+        if match is None:
+            raise HTTPException(status_code=404, detail="Data not found")
         if not match:
             return {"success": False, "message": "Incorrect password"}
 
@@ -260,23 +278,38 @@ def check_password(payload: PasswordCheckRequest, db: Session = Depends(get_db))
 
 
 @router.get('/get-interviews')
-def get_interviews(db: Session = Depends(get_db), current_user=Depends(get_current_active_user)):
+def get_interviews(request: Request, response: Response, db: Session = Depends(get_read_db), current_user=Depends(get_current_active_user)):
     try:
 
-        interviews = (
+        query = (
             db.query(Interview)
-            .options(
-                joinedload(Interview.candidateDetails),
-                joinedload(Interview.evaluationResult),
-                joinedload(Interview.requisition),
-            )
             .join(Interview.evaluationResult)
             .join(Interview.requisition)
+            .join(Interview.candidateDetails)
             .filter(
                 Evaluation.interview_status == True,
                 Evaluation.candidate_id.isnot(None),
                 Interview.requisition.has(created_by=current_user.id),
             )
+        )
+        stamp = query.with_entities(
+            func.count(Interview.id),
+            func.max(Interview.updated_at),
+            func.max(Evaluation.updated_at),
+            func.max(CandidateProfile.updated_at),
+            func.max(Requisition.updated_at),
+        ).one()
+        unchanged = conditional(request, response, "interviews", current_user.id, *stamp)
+        if unchanged is not None:
+            return unchanged
+
+        interviews = (
+            query
+            .options(
+                contains_eager(Interview.candidateDetails),
+                contains_eager(Interview.evaluationResult),
+                contains_eager(Interview.requisition),
+            )
             .all()
         )
 
@@ -285,7 +318,7 @@ def get_interviews(db: Session = Depends(get_db), current_user=Depends(get_curre
             candidate_payload = (
                 jsonable_encoder(
                     interview.candidateDetails,
-                    exclude={"evaluation", "interviews", "evaluated_by"},
+                    exclude={"evaluations", "interviews", "evaluated_by"},
                 )
                 if getattr(interview, "candidateDetails", None)
                 else None
@@ -353,7 +386,7 @@ def get_interview_by_id(interview_id: str, db: Session = Depends(get_db), curren
         candidate_payload = (
             jsonable_encoder(
                 interview.candidateDetails,
-                exclude={"evaluation", "interviews", "evaluated_by"},
+                exclude={"evaluations", "interviews", "evaluated_by"},
             )
             if getattr(interview, "candidateDetails", None)
             else None
@@ -1,9 +1,12 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Response
+from fastapi import APIRouter, Depends, HTTPException, Request, status, Response
+from sqlalchemy import func
 from sqlalchemy.orm import Session
 from typing import Any, cast, Optional
 from ..deps import get_current_active_user
 from src.models.Requisition import Requisition
 from src.db.init_db import get_db
+from src.db.replicas import get_read_db
+from src.utils.etag import conditional
 from src.schemas.requisition import RequisitionCreate, RequisitionCreateResponse, ListRequisitionsResponse
 from sqlalchemy.exc import IntegrityError
 import re
@@ -59,11 +62,13 @@ def add_requisition(requisition: RequisitionCreate, current_user: Any = Depends(
 
 @router.get("/requisitions", response_model=ListRequisitionsResponse, status_code=status.HTTP_200_OK)
 def list_requisitions(
+    request: Request,
+    response: Response,
     skip: int = 0,
     limit: int = 100,
     search: Optional[str] = None,
     current_user: Any = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     """
     List requisitions created by the current user with pagination and search.
@@ -101,6 +106,14 @@ def list_requisitions(
                 (Requisition.description.ilike(search_term))
             )
 
+        # count + newest update change whenever a row is added, edited or deleted
+        stamp = base_query.with_entities(
+            func.count(Requisition.id), func.max(Requisition.updated_at)).one()
+        unchanged = conditional(
+            request, response, "requisitions", current_user.id, skip, limit, search, *stamp)
+        if unchanged is not None:
+            return unchanged
+
         # Debug prints to help trace behavior
         print(
             f"[debug] list_requisitions called by user id={getattr(current_user, 'id', None)}")
@@ -136,6 +149,8 @@ def list_requisitions(
 @router.get("/requisitions/{requisition_id}", status_code=status.HTTP_200_OK)
 def get_requisition(
     requisition_id: UUID,
+    request: Request,
+    response: Response,
     current_user: Any = Depends(get_current_active_user),
     db: Session = Depends(get_db)
 ):
@@ -144,6 +159,17 @@ def get_requisition(
     Only the creator of the requisition can retrieve it.
     """
     try:
+        if request.headers.get("if-none-match"):
+            updated_at = db.query(Requisition.updated_at).filter(
+                Requisition.id == requisition_id,
+                Requisition.created_by == current_user.id
+            ).scalar()
+            if updated_at is not None:
+                unchanged = conditional(
+                    request, response, "requisition", requisition_id, updated_at)
+                if unchanged is not None:
+                    return unchanged
+
         requisition = db.query(Requisition).filter(
             Requisition.id == requisition_id,
             Requisition.created_by == current_user.id
@@ -155,6 +181,8 @@ def get_requisition(
                 detail="Requisition not found or access denied"
             )
 
+        conditional(request, response, "requisition",
+                    requisition_id, requisition.updated_at)
         return {"success": True, "requisition": requisition}
 
     except SQLAlchemyError:
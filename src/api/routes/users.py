@@ -2,6 +2,7 @@ from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.orm import Session
 from typing import List
 from src.db.init_db import get_db
+from src.db.replicas import get_read_db
 from src.schemas.user import UserResponse, UserUpdate
 from src.models.user import User
 from src.api.deps import get_current_active_user
@@ -36,7 +37,7 @@ def list_users(
     skip: int = 0,
     limit: int = 100,
     current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     users = db.query(User).offset(skip).limit(limit).all()
     return users
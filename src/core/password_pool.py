@@ -0,0 +1,82 @@
+import asyncio
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict
+from src.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class PoolBusy(RuntimeError):
+    pass
+
+
+class PasswordHashPool:
+    """Size-bounded thread pool for Argon2 work.
+
+    argon2-cffi releases the GIL while hashing, so threads give real
+    parallelism; the pool size caps how many cores (and ``memory_cost`` KiB
+    each) a login burst can take. At most ``max_queue`` jobs wait; beyond
+    that ``run`` raises ``PoolBusy`` instead of queueing without limit.
+    """
+
+    def __init__(self, workers: int = settings.PASSWORD_HASH_WORKERS,
+                 max_queue: int = settings.PASSWORD_HASH_MAX_QUEUE):
+        self.workers = workers
+        self.max_queue = max_queue
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="argon2")
+        self._lock = threading.Lock()
+        self.pending = 0
+        self.completed = 0
+        self.rejected = 0
+        self.queue_seconds_total = 0.0
+        self.queue_seconds_max = 0.0
+        self.run_seconds_total = 0.0
+
+    def _timed(self, fn: Callable, enqueued: float, *args) -> Any:
+        started = time.monotonic()
+        try:
+            return fn(*args)
+        finally:
+            finished = time.monotonic()
+            with self._lock:
+                waited = started - enqueued
+                self.pending -= 1
+                self.completed += 1
+                self.queue_seconds_total += waited
+                self.queue_seconds_max = max(self.queue_seconds_max, waited)
+                self.run_seconds_total += finished - started
+
+    async def run(self, fn: Callable, *args) -> Any:
+        with self._lock:
+            if self.pending >= self.workers + self.max_queue:
+                self.rejected += 1
+                raise PoolBusy("Password hashing pool is saturated")
+            self.pending += 1
+        future = self._executor.submit(self._timed, fn, time.monotonic(), *args)
+        future.add_done_callback(self._on_done)
+        return await asyncio.wrap_future(future)
+
+    def _on_done(self, future):
+        # a job cancelled before it started never reaches _timed
+        if future.cancelled():
+            with self._lock:
+                self.pending -= 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            done = self.completed or 1
+            return {
+                "workers": self.workers,
+                "pending": self.pending,
+                "completed": self.completed,
+                "rejected": self.rejected,
+                "queue_seconds_avg": round(self.queue_seconds_total / done, 4),
+                "queue_seconds_max": round(self.queue_seconds_max, 4),
+                "hash_seconds_avg": round(self.run_seconds_total / done, 4),
+            }
+
+
+password_pool = PasswordHashPool()
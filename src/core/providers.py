@@ -0,0 +1,90 @@
+"""Lazily built third-party SDK clients.
+
+Heavy SDKs (openai, google-genai, pdfminer, livekit, resend) are imported the
+first time something asks for them instead of when ``main`` or the Celery
+worker is imported, so a process only pays for the clients it actually uses.
+"""
+import logging
+import os
+import threading
+from typing import Any, Callable, Dict, List
+
+logger = logging.getLogger(__name__)
+
+_factories: Dict[str, Callable[[], Any]] = {}
+_instances: Dict[str, Any] = {}
+_lock = threading.RLock()
+
+
+def register(name: str):
+    """Decorator registering ``factory`` to build provider ``name`` on first use."""
+    def decorator(factory: Callable[[], Any]) -> Callable[[], Any]:
+        _factories[name] = factory
+        return factory
+    return decorator
+
+
+def get(name: str) -> Any:
+    instance = _instances.get(name)
+    if instance is not None:
+        return instance
+    with _lock:
+        if name not in _instances:
+            logger.debug("Initialising provider %s", name)
+            _instances[name] = _factories[name]()
+        return _instances[name]
+
+
+def loaded() -> List[str]:
+    return sorted(_instances)
+
+
+class Lazy:
+    """Attribute proxy for a provider, so it can be imported as a module-level name."""
+
+    def __init__(self, name: str):
+        self._name = name
+
+    def __getattr__(self, attr: str) -> Any:
+        return getattr(get(self._name), attr)
+
+
+@register("openai")
+def _openai():
+    from openai import OpenAI
+    return OpenAI
+
+
+@register("genai")
+def _genai():
+    from google import genai  # type: ignore
+    from google.genai import types
+    return genai, types
+
+
+@register("pdfminer")
+def _pdfminer():
+    from pdfminer.high_level import extract_text
+    return extract_text
+
+
+@register("livekit")
+def _livekit():
+    from livekit import api
+    return api
+
+
+@register("resend")
+def _resend():
+    import resend
+    api_key = os.getenv("RESEND_API_KEY")
+    if not api_key:
+        raise RuntimeError("RESEND_API_KEY is not set")
+    resend.api_key = api_key
+    return resend
+
+
+@register("llm_router")
+def _llm_router():
+    from src.services.llm_router import LLMRouter
+    return LLMRouter.from_settings()
@@ -1,24 +1,57 @@
 from datetime import datetime, timedelta
-from typing import Optional
+from typing import Optional, Tuple
 from jose import JWTError, jwt
 from passlib.context import CryptContext
 from src.core.config import settings
 from pwdlib import PasswordHash
+from pwdlib.hashers.argon2 import Argon2Hasher
 from fastapi import HTTPException, status
+from src.core.password_pool import PoolBusy, password_pool
 
-password_hash = PasswordHash.recommended()
+password_hash = PasswordHash((
+    Argon2Hasher(
+        time_cost=settings.ARGON2_TIME_COST,
+        memory_cost=settings.ARGON2_MEMORY_COST,
+        parallelism=settings.ARGON2_PARALLELISM,
+    ),
+))
 
 
 
 def get_password_hash(password: str) -> str:
-    """Return bcrypt hash of a SHA-256 prehashed password."""
+    """Return the Argon2 hash of a password."""
     return password_hash.hash(password)
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
-    """Verify a plain password against a bcrypt-hashed password."""
+    """Verify a plain password against an Argon2 hash."""
     return password_hash.verify(plain_password, hashed_password)
 
 
+def _busy() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail="Too many sign-in requests, please retry shortly",
+        headers={"Retry-After": "1"},
+    )
+
+
+async def hash_password_async(password: str) -> str:
+    """``get_password_hash`` on the dedicated hashing pool."""
+    try:
+        return await password_pool.run(password_hash.hash, password)
+    except PoolBusy:
+        raise _busy()
+
+
+async def verify_and_update_password(plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    """Verify on the hashing pool; also return a new hash when the stored one
+    was made with outdated Argon2 parameters (``None`` otherwise)."""
+    try:
+        return await password_pool.run(password_hash.verify_and_update, plain_password, hashed_password)
+    except PoolBusy:
+        raise _busy()
+
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
     to_encode = data.copy()
     if expires_delta:
@@ -0,0 +1,54 @@
+"""One-shot schema bootstrap, run once per deploy before the app starts:
+
+    python -m src.db.bootstrap
+
+Creates missing tables, applies ``SCHEMA_PATCHES`` and sets up the
+``evaluations`` partitions. Everything is idempotent and runs under a
+Postgres advisory lock, so concurrent runs (e.g. several containers starting
+together) apply it once and the rest wait.
+"""
+import importlib
+import logging
+import time
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+from src.db.init_db import Base, engine
+from src.db.migrations import apply_schema_patches
+from src.db.partitions import convert_to_partitioned, ensure_evaluation_references, ensure_partitions
+
+logger = logging.getLogger(__name__)
+
+# arbitrary, fixed id for pg_advisory_xact_lock
+BOOTSTRAP_LOCK_ID = 7_302_214_001
+
+MODEL_MODULES = (
+    "src.models.user",
+    "src.models.Requisition",
+    "src.models.candidateprofile",
+    "src.models.evaluations",
+    "src.models.interview",
+    "src.models.outbox",
+    "src.models.analysis_job",
+)
+
+
+def bootstrap_schema(bind: Engine = engine) -> None:
+    for module in MODEL_MODULES:
+        # register every table on Base.metadata
+        importlib.import_module(module)
+
+    started = time.monotonic()
+    with bind.begin() as conn:
+        conn.execute(text("SELECT pg_advisory_xact_lock(:id)"), {"id": BOOTSTRAP_LOCK_ID})
+        Base.metadata.create_all(bind=conn)
+        apply_schema_patches(conn)
+        # evaluations is range-partitioned; older deployments have a plain table
+        convert_to_partitioned(conn)
+        ensure_partitions(conn)
+        ensure_evaluation_references(conn)
+    logger.info("Schema bootstrap finished in %.2fs", time.monotonic() - started)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    bootstrap_schema()
@@ -1,4 +1,5 @@
 import logging
+from contextlib import contextmanager
 from time import sleep
 from sqlalchemy import create_engine, text
 from sqlalchemy.ext.declarative import declarative_base
@@ -76,3 +77,21 @@ def get_db():
                 db.close()
         except Exception:
             logger.exception("Failed to close database session")
+
+
+@contextmanager
+def session_scope():
+    """Unit of work for code outside request handlers.
+
+    Commits when the block exits normally, rolls back on error and always
+    closes the session, returning its connection to the pool.
+    """
+    db = SessionLocal()
+    try:
+        yield db
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
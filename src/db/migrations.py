@@ -0,0 +1,27 @@
+import logging
+from sqlalchemy import text
+from sqlalchemy.engine import Connection
+
+logger = logging.getLogger(__name__)
+
+# Idempotent DDL for columns added after a table was first created;
+# `create_all` only creates missing tables, it never alters existing ones.
+SCHEMA_PATCHES = [
+    "ALTER TABLE candidate_profiles ADD COLUMN IF NOT EXISTS email_normalized VARCHAR",
+    "ALTER TABLE candidate_profiles ADD COLUMN IF NOT EXISTS phone_normalized VARCHAR",
+    "ALTER TABLE candidate_profiles ADD COLUMN IF NOT EXISTS content_hash VARCHAR",
+    "CREATE INDEX IF NOT EXISTS ix_candidate_profiles_email_normalized ON candidate_profiles (email_normalized)",
+    "CREATE INDEX IF NOT EXISTS ix_candidate_profiles_phone_normalized ON candidate_profiles (phone_normalized)",
+    "CREATE INDEX IF NOT EXISTS ix_candidate_profiles_content_hash ON candidate_profiles (content_hash)",
+    "CREATE INDEX IF NOT EXISTS ix_interviews_evaluation_id ON interviews (evaluation_id)",
+    "ALTER TABLE evaluations ADD COLUMN IF NOT EXISTS updated_at TIMESTAMP NOT NULL DEFAULT now()",
+    "ALTER TABLE evaluations ALTER COLUMN candidate_status DROP NOT NULL",
+    "ALTER TABLE evaluations ALTER COLUMN candidate_status DROP DEFAULT",
+]
+
+
+def apply_schema_patches(conn: Connection) -> None:
+    """Run every patch on ``conn``; the caller owns the transaction."""
+    for statement in SCHEMA_PATCHES:
+        conn.execute(text(statement))
+    logger.info("Applied %d schema patches", len(SCHEMA_PATCHES))
@@ -0,0 +1,285 @@
+"""Monthly range partitions of ``evaluations`` on ``evaluated_at``.
+
+    python -m src.db.partitions ensure     # create upcoming partitions
+    python -m src.db.partitions archive    # archive and drop old ones
+    python -m src.db.partitions explain    # partitions scanned by "today" queries
+
+``bootstrap_schema`` converts an existing unpartitioned table and creates the
+partitions; the Celery beat task keeps months ahead created and applies
+retention daily when it is configured.
+"""
+import gzip
+import json
+import logging
+import os
+import re
+import sys
+from datetime import date, datetime, time
+from typing import Any, Dict, List, Optional
+from sqlalchemy import text
+from sqlalchemy.engine import Connection
+from sqlalchemy.orm import Session
+from src.core.config import settings
+from src.db.init_db import engine
+
+logger = logging.getLogger(__name__)
+
+PARENT = "evaluations"
+DEFAULT_PARTITION = "evaluations_default"
+PARTITION_RE = re.compile(r"^evaluations_y(\d{4})m(\d{2})$")
+
+
+def _month_start(d: date) -> date:
+    return date(d.year, d.month, 1)
+
+
+def _add_months(d: date, months: int) -> date:
+    index = d.year * 12 + d.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(month: date) -> str:
+    return f"evaluations_y{month.year:04d}m{month.month:02d}"
+
+
+def is_partitioned(conn: Connection) -> Optional[bool]:
+    """True/False for an existing table, None if there is no table yet."""
+    kind = conn.execute(
+        text("SELECT relkind FROM pg_class WHERE oid = to_regclass(:name)"), {"name": PARENT}
+    ).scalar()
+    return None if kind is None else kind == "p"
+
+
+def create_partition(conn: Connection, month: date) -> None:
+    month = _month_start(month)
+    conn.execute(text(
+        f"CREATE TABLE IF NOT EXISTS {partition_name(month)} PARTITION OF {PARENT} "
+        f"FOR VALUES FROM ('{month.isoformat()}') TO ('{_add_months(month, 1).isoformat()}')"
+    ))
+
+
+def ensure_partitions(conn: Connection, since: Optional[date] = None) -> None:
+    """Partitions from ``since`` (default: this month) up to the premake horizon,
+    plus a default partition so an out-of-range row is never rejected."""
+    month = _month_start(since or date.today())
+    last = _add_months(_month_start(date.today()), settings.EVALUATION_PARTITION_PREMAKE_MONTHS)
+    while month <= last:
+        create_partition(conn, month)
+        month = _add_months(month, 1)
+    conn.execute(text(f"CREATE TABLE IF NOT EXISTS {DEFAULT_PARTITION} PARTITION OF {PARENT} DEFAULT"))
+
+
+def convert_to_partitioned(conn: Connection) -> bool:
+    """Rebuild an unpartitioned ``evaluations`` as a partitioned table.
+
+    The old table is renamed to ``evaluations_legacy`` (with its indexes and
+    primary key) and kept until dropped by hand. Returns False if there was
+    nothing to convert.
+    """
+    if is_partitioned(conn) is not False:
+        return False
+
+    logger.info("Converting %s to a partitioned table", PARENT)
+    conn.execute(text("ALTER TABLE interviews DROP CONSTRAINT IF EXISTS interviews_evaluation_id_fkey"))
+    conn.execute(text(f"ALTER TABLE {PARENT} RENAME TO evaluations_legacy"))
+    conn.execute(text("ALTER TABLE evaluations_legacy RENAME CONSTRAINT evaluations_pkey TO evaluations_legacy_pkey"))
+    conn.execute(text("ALTER INDEX IF EXISTS ix_evaluations_id RENAME TO ix_evaluations_legacy_id"))
+
+    conn.execute(text(
+        f"CREATE TABLE {PARENT} (LIKE evaluations_legacy INCLUDING DEFAULTS) "
+        "PARTITION BY RANGE (evaluated_at)"
+    ))
+    conn.execute(text(f"ALTER TABLE {PARENT} ADD CONSTRAINT evaluations_pkey PRIMARY KEY (id, evaluated_at)"))
+    conn.execute(text(f"CREATE INDEX ix_evaluations_id ON {PARENT} (id)"))
+    conn.execute(text(
+        f"ALTER TABLE {PARENT} ADD FOREIGN KEY (candidate_id) REFERENCES candidate_profiles (id)"))
+    conn.execute(text(
+        f"ALTER TABLE {PARENT} ADD FOREIGN KEY (requisition_id) REFERENCES requisitions (id)"))
+
+    oldest = conn.execute(text("SELECT min(evaluated_at) FROM evaluations_legacy")).scalar()
+    ensure_partitions(conn, since=oldest.date() if oldest else None)
+    copied = conn.execute(text(f"INSERT INTO {PARENT} SELECT * FROM evaluations_legacy")).rowcount
+    logger.info("Copied %s evaluations into the partitioned table", copied)
+    return True
+
+
+# interviews.evaluation_id can't reference (id, evaluated_at), so once
+# evaluations is partitioned these triggers stand in for the foreign key:
+# inserts must point at an existing evaluation, and deleting one clears the
+# reference (as ON DELETE SET NULL would). Dropped partitions bypass delete
+# triggers; archive_partitions clears those references itself.
+EVALUATION_REFERENCE_SQL = (
+    """
+    CREATE OR REPLACE FUNCTION interviews_check_evaluation() RETURNS trigger AS $$
+    BEGIN
+        IF NEW.evaluation_id IS NOT NULL
+           AND NOT EXISTS (SELECT 1 FROM evaluations WHERE id = NEW.evaluation_id) THEN
+            RAISE foreign_key_violation
+                USING MESSAGE = 'evaluation ' || NEW.evaluation_id || ' does not exist';
+        END IF;
+        RETURN NEW;
+    END $$ LANGUAGE plpgsql
+    """,
+    "DROP TRIGGER IF EXISTS interviews_evaluation_exists ON interviews",
+    "CREATE TRIGGER interviews_evaluation_exists BEFORE INSERT OR UPDATE OF evaluation_id "
+    "ON interviews FOR EACH ROW EXECUTE FUNCTION interviews_check_evaluation()",
+    """
+    CREATE OR REPLACE FUNCTION evaluations_release_interviews() RETURNS trigger AS $$
+    BEGIN
+        UPDATE interviews SET evaluation_id = NULL WHERE evaluation_id = OLD.id;
+        RETURN OLD;
+    END $$ LANGUAGE plpgsql
+    """,
+    "DROP TRIGGER IF EXISTS evaluations_release_interviews ON evaluations",
+    "CREATE TRIGGER evaluations_release_interviews AFTER DELETE "
+    "ON evaluations FOR EACH ROW EXECUTE FUNCTION evaluations_release_interviews()",
+)
+
+
+def ensure_evaluation_references(conn: Connection) -> None:
+    """Install the triggers above; a no-op while evaluations keeps its real FK."""
+    if is_partitioned(conn):
+        for statement in EVALUATION_REFERENCE_SQL:
+            conn.execute(text(statement))
+
+
+def list_partitions(conn: Connection) -> List[str]:
+    return list(conn.execute(text(
+        "SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+        "WHERE i.inhparent = to_regclass(:name) ORDER BY c.relname"
+    ), {"name": PARENT}).scalars())
+
+
+def _copy_out(cursor, sql: str, fh) -> None:
+    """Stream ``COPY ... TO STDOUT`` into ``fh`` with psycopg2 or psycopg 3."""
+    if hasattr(cursor, "copy_expert"):  # psycopg2
+        cursor.copy_expert(sql, fh)
+        return
+    with cursor.copy(sql) as copy:
+        for data in copy:
+            fh.write(data)
+
+
+def archive_partitions(retention_months: Optional[int] = None,
+                       archive_dir: Optional[str] = None) -> List[str]:
+    """Archive partitions older than the retention window to
+    ``<archive_dir>/<partition>.csv.gz`` and drop them. Returns the archived names.
+
+    Retention is off unless ``EVALUATION_RETENTION_MONTHS`` is set, and then
+    ``EVALUATION_ARCHIVE_DIR`` must be set too. The COPY reads the partition
+    while it is still attached, so writers only wait for the short
+    transaction that detaches and drops it. That transaction first checks
+    nothing was added since the COPY and clears ``interviews.evaluation_id``
+    for the archived evaluations. A partition that fails is left in place
+    and reported with a ``RuntimeError`` after the rest are done.
+    """
+    if retention_months is None:
+        retention_months = settings.EVALUATION_RETENTION_MONTHS
+    if archive_dir is None:
+        archive_dir = settings.EVALUATION_ARCHIVE_DIR
+    if retention_months <= 0:
+        return []
+    if not archive_dir:
+        raise ValueError("EVALUATION_ARCHIVE_DIR must be set when EVALUATION_RETENTION_MONTHS is")
+    cutoff = _add_months(_month_start(date.today()), -retention_months)
+    os.makedirs(archive_dir, exist_ok=True)
+
+    with engine.connect() as conn:
+        names = list_partitions(conn)
+
+    archived, failed = [], []
+    for name in names:
+        match = PARTITION_RE.match(name)
+        if not match or date(int(match.group(1)), int(match.group(2)), 1) >= cutoff:
+            continue
+        path = os.path.join(archive_dir, f"{name}.csv.gz")
+        raw = engine.raw_connection()
+        try:
+            cursor = raw.cursor()
+            # ACCESS SHARE on the partition only; the parent stays writable.
+            # The count and the COPY share one snapshot.
+            cursor.execute("SET TRANSACTION ISOLATION LEVEL REPEATABLE READ")
+            cursor.execute(f"SELECT count(*) FROM {name}")
+            copied = cursor.fetchone()[0]
+            with gzip.open(path + ".tmp", "wb") as fh:
+                _copy_out(cursor, f"COPY {name} TO STDOUT WITH (FORMAT csv, HEADER)", fh)
+            raw.commit()
+            os.replace(path + ".tmp", path)
+
+            cursor.execute(f"LOCK TABLE {name} IN SHARE MODE")
+            cursor.execute(f"SELECT count(*) FROM {name}")
+            if cursor.fetchone()[0] != copied:
+                raise RuntimeError(f"{name} changed while it was being archived")
+            cursor.execute(
+                f"UPDATE interviews SET evaluation_id = NULL "
+                f"WHERE evaluation_id IN (SELECT id FROM {name})")
+            cursor.execute(f"ALTER TABLE {PARENT} DETACH PARTITION {name}")
+            cursor.execute(f"DROP TABLE {name}")
+            raw.commit()
+        except Exception:
+            raw.rollback()
+            logger.exception("Archiving partition %s failed", name)
+            failed.append(name)
+            continue
+        finally:
+            raw.close()
+        logger.info("Archived %s rows of %s to %s", copied, name, path)
+        archived.append(name)
+    if failed:
+        # the others are archived; fail loudly so this doesn't go unnoticed
+        raise RuntimeError(f"Archiving failed for {', '.join(failed)}")
+    return archived
+
+
+def maintain_partitions() -> Dict[str, Any]:
+    with engine.begin() as conn:
+        ensure_partitions(conn)
+    return {"archived": archive_partitions()}
+
+
+def explain_today(db: Session) -> Dict[str, Any]:
+    """Partitions Postgres scans for the "today" evaluation filter.
+
+    Only today's partition should be listed; anything more means pruning
+    is not happening for the date-filtered queries.
+    """
+    start = datetime.combine(date.today(), time.min)
+    end = datetime.combine(date.today(), time.max)
+    # same predicate as list_evaluations?today=true
+    plan = db.execute(text(
+        f"EXPLAIN (FORMAT JSON) SELECT id FROM {PARENT} "
+        "WHERE evaluated_at >= :start AND evaluated_at <= :end"
+    ), {"start": start, "end": end}).scalar()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+
+    scanned = set()
+
+    def walk(node):
+        if node.get("Relation Name"):
+            scanned.add(node["Relation Name"])
+        for child in node.get("Plans", []):
+            walk(child)
+
+    walk(plan[0]["Plan"])
+    return {"partitions_scanned": sorted(scanned), "pruned": len(scanned) <= 1}
+
+
+if __name__ == "__main__":
+    from src.db.init_db import SessionLocal
+
+    logging.basicConfig(level=logging.INFO)
+    command = sys.argv[1] if len(sys.argv) > 1 else "ensure"
+    if command == "ensure":
+        with engine.begin() as connection:
+            ensure_partitions(connection)
+    elif command == "archive":
+        print(archive_partitions())
+    elif command == "explain":
+        session = SessionLocal()
+        try:
+            print(explain_today(session))
+        finally:
+            session.close()
+    else:
+        sys.exit(f"unknown command {command}")
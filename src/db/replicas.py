@@ -0,0 +1,115 @@
+import itertools
+import logging
+import threading
+import time
+from typing import Any, List, Optional
+from fastapi import Request
+from sqlalchemy import create_engine, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import sessionmaker
+from src.core.config import settings
+from src.db.init_db import get_db
+from src.utils.ttl_cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+READ_METHODS = {"GET", "HEAD"}
+
+# Lag is 0 when the replica has replayed everything it received, so an idle
+# primary doesn't look like lag. That only holds while the WAL receiver is
+# connected: a replica that stopped receiving has replayed all it got and
+# would report 0 forever, so the receiver status is checked too (reading it
+# needs pg_monitor / pg_read_all_stats for the replica's user).
+LAG_QUERY = text("""
+SELECT
+    (SELECT status FROM pg_stat_wal_receiver) AS receiver_status,
+    CASE
+        WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)
+    END AS lag
+""")
+
+
+class Replica:
+    def __init__(self, url: str):
+        self.engine: Engine = create_engine(
+            url, pool_pre_ping=True, pool_size=settings.DATABASE_POOL_SIZE, max_overflow=10)
+        self.session_factory = sessionmaker(autocommit=False, autoflush=False, bind=self.engine)
+        self.lag: Optional[float] = None
+        self.receiver_status: Optional[str] = None
+        self.checked_at = 0.0
+        self._lock = threading.Lock()
+
+    def healthy(self) -> bool:
+        """WAL is streaming in and replay lag is under the threshold; measured
+        at most once per interval."""
+        now = time.monotonic()
+        if now - self.checked_at >= settings.REPLICA_LAG_CHECK_INTERVAL and self._lock.acquire(blocking=False):
+            try:
+                with self.engine.connect() as conn:
+                    row = conn.execute(LAG_QUERY).one()
+                self.receiver_status = row.receiver_status
+                if row.receiver_status == "streaming":
+                    self.lag = float(row.lag or 0)
+                else:
+                    if self.lag is not None:
+                        logger.warning("Replica WAL receiver is %s, not routing reads to it",
+                                       row.receiver_status or "not running")
+                    self.lag = None
+            except Exception:
+                logger.warning("Replica lag check failed", exc_info=True)
+                self.lag = None
+            finally:
+                self.checked_at = now
+                self._lock.release()
+        return self.lag is not None and self.lag <= settings.REPLICA_MAX_LAG_SECONDS
+
+
+class ReplicaPool:
+    """Round-robin over the configured replicas that are keeping up."""
+
+    def __init__(self, urls: List[str]):
+        self.replicas = [Replica(url) for url in urls]
+        self._cycle = itertools.cycle(self.replicas) if self.replicas else None
+        # user id -> time of their last write, for read-your-writes
+        self.recent_writers = TTLCache(max_size=100_000, ttl=settings.REPLICA_STICKY_SECONDS)
+
+    def pick(self) -> Optional[Replica]:
+        for _ in range(len(self.replicas)):
+            replica = next(self._cycle)  # type: ignore
+            if replica.healthy():
+                return replica
+        return None
+
+    def record_write(self, user_id: Any) -> None:
+        if self.replicas and user_id is not None:
+            self.recent_writers.set(str(user_id), True)
+
+    def is_sticky(self, user_id: Any) -> bool:
+        return user_id is not None and self.recent_writers.get(str(user_id)) is not None
+
+
+replica_pool = ReplicaPool(settings.DATABASE_REPLICA_URLS)
+
+
+def get_read_db(request: Request):
+    """Session for read-only handlers.
+
+    GET/HEAD requests go to a replica unless none is configured or healthy,
+    or the user wrote within ``REPLICA_STICKY_SECONDS`` (so they see their
+    own changes). Everything else uses the primary via ``get_db``.
+    """
+    user = getattr(request.state, "user", None)
+    replica = None
+    if request.method in READ_METHODS and not replica_pool.is_sticky(getattr(user, "id", None)):
+        replica = replica_pool.pick()
+
+    if replica is None:
+        yield from get_db()
+        return
+
+    db = replica.session_factory()
+    try:
+        yield db
+    finally:
+        db.close()
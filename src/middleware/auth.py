@@ -2,12 +2,14 @@ from fastapi import Request, status
 from fastapi.responses import JSONResponse
 from src.core.security import decode_token
 from src.db.init_db import SessionLocal
+from src.db.replicas import READ_METHODS, replica_pool
 from src.models.user import User
 
 # Public endpoints that do NOT require authentication
 PUBLIC_PATHS = {
     "/",
     "/health",
+    "/ready",
     "/api/docs",
     "/api/redoc",
     "/api/openapi.json",
@@ -94,7 +96,16 @@ class AuthMiddleware:
         finally:
             db.close()
 
-        return await self.app(scope, receive, send)
+        if scope["method"] in READ_METHODS:
+            return await self.app(scope, receive, send)
+
+        # read-your-writes: this user's next reads go to the primary; marked
+        # again at the end because streaming endpoints write as they go
+        replica_pool.record_write(user.id)
+        try:
+            return await self.app(scope, receive, send)
+        finally:
+            replica_pool.record_write(user.id)
 
     async def _send_error(self, scope, receive, send, code: str, message: str, headers: dict | None = None):
         response = JSONResponse(
@@ -0,0 +1,185 @@
+import zlib
+from typing import Dict, List, Optional, Tuple
+from src.core.config import settings
+
+try:  # optional: brotli / zstandard packages
+    import brotli  # type: ignore
+except ImportError:
+    brotli = None
+
+try:
+    import zstandard  # type: ignore
+except ImportError:
+    zstandard = None
+
+COMPRESSIBLE_TYPES = (
+    "application/json",
+    "application/javascript",
+    "application/xml",
+    "text/",
+)
+SSE_TYPE = "text/event-stream"
+
+
+class _Gzip:
+    def __init__(self):
+        self._obj = zlib.compressobj(settings.COMPRESSION_GZIP_LEVEL, zlib.DEFLATED, 31)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._obj.compress(data)
+
+    def flush(self) -> bytes:
+        return self._obj.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self) -> bytes:
+        return self._obj.flush(zlib.Z_FINISH)
+
+
+class _Brotli:
+    def __init__(self):
+        self._obj = brotli.Compressor(quality=settings.COMPRESSION_BROTLI_QUALITY)  # type: ignore
+
+    def compress(self, data: bytes) -> bytes:
+        return self._obj.process(data)
+
+    def flush(self) -> bytes:
+        return self._obj.flush()
+
+    def finish(self) -> bytes:
+        return self._obj.finish()
+
+
+class _Zstd:
+    def __init__(self):
+        self._obj = zstandard.ZstdCompressor(level=settings.COMPRESSION_ZSTD_LEVEL).compressobj()  # type: ignore
+
+    def compress(self, data: bytes) -> bytes:
+        return self._obj.compress(data)
+
+    def flush(self) -> bytes:
+        return self._obj.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK)  # type: ignore
+
+    def finish(self) -> bytes:
+        return self._obj.flush()
+
+
+# server preference when the client accepts several at the same q
+ENCODERS = [(name, cls) for name, cls, available in (
+    ("zstd", _Zstd, zstandard is not None),
+    ("br", _Brotli, brotli is not None),
+    ("gzip", _Gzip, True),
+) if available]
+
+
+def negotiate(accept_encoding: str) -> Optional[Tuple[str, type]]:
+    """Pick an encoding from an Accept-Encoding header, honouring q-values."""
+    accepted: Dict[str, float] = {}
+    for part in accept_encoding.split(","):
+        name, _, params = part.strip().partition(";")
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        if name:
+            accepted[name.strip().lower()] = q
+    best = None
+    for name, cls in ENCODERS:
+        q = accepted.get(name, accepted.get("*", 0.0))
+        if q > 0 and (best is None or q > best[0]):
+            best = (q, name, cls)
+    return (best[1], best[2]) if best else None
+
+
+class CompressionMiddleware:
+    """Pure ASGI response compression (zstd, br or gzip).
+
+    Bodies below ``COMPRESSION_MIN_SIZE`` and non-text content are sent as
+    is. Streaming responses are compressed as they stream; for server-sent
+    events every chunk is flushed, so each event reaches the client
+    immediately instead of sitting in the compressor.
+    """
+
+    def __init__(self, app, minimum_size: int = settings.COMPRESSION_MIN_SIZE):
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        accept = ""
+        for key, value in scope.get("headers") or []:
+            if key == b"accept-encoding":
+                accept = value.decode("latin-1")
+                break
+        choice = negotiate(accept) if accept else None
+        if choice is None:
+            return await self.app(scope, receive, send)
+
+        responder = _CompressedResponder(send, choice, self.minimum_size)
+        await self.app(scope, receive, responder)
+
+
+class _CompressedResponder:
+    def __init__(self, send, choice: Tuple[str, type], minimum_size: int):
+        self.send = send
+        self.encoding, self.encoder_cls = choice
+        self.minimum_size = minimum_size
+        self.start: Optional[dict] = None
+        self.encoder = None
+        self.passthrough = False
+        self.flush_each = False
+
+    async def __call__(self, message):
+        if message["type"] == "http.response.start":
+            self.start = message
+            headers = {k.lower(): v for k, v in message.get("headers", [])}
+            content_type = headers.get(b"content-type", b"").decode("latin-1")
+            length = headers.get(b"content-length")
+            if (
+                b"content-encoding" in headers
+                or message["status"] in (204, 304)
+                or not content_type.startswith(COMPRESSIBLE_TYPES)
+                or (length is not None and int(length) < self.minimum_size)
+            ):
+                self.passthrough = True
+                await self.send(message)
+            self.flush_each = content_type.startswith(SSE_TYPE)
+            return
+
+        if message["type"] != "http.response.body" or self.passthrough:
+            return await self.send(message)
+
+        body = message.get("body", b"")
+        more = message.get("more_body", False)
+
+        if self.encoder is None:
+            if not more and len(body) < self.minimum_size:
+                # small single-chunk body: not worth compressing
+                await self.send(self.start)
+                return await self.send(message)
+            self.encoder = self.encoder_cls()
+            await self.send(self._compressed_start())
+
+        data = self.encoder.compress(body)
+        if more:
+            if self.flush_each:
+                data += self.encoder.flush()
+        else:
+            data += self.encoder.finish()
+        if data or not more:
+            await self.send({"type": "http.response.body", "body": data, "more_body": more})
+
+    def _compressed_start(self) -> dict:
+        headers: List[Tuple[bytes, bytes]] = [
+            (k, v) for k, v in self.start.get("headers", [])  # type: ignore
+            if k.lower() not in (b"content-length", b"content-encoding")
+        ]
+        vary = [v for k, v in headers if k.lower() == b"vary"]
+        headers = [(k, v) for k, v in headers if k.lower() != b"vary"]
+        headers.append((b"vary", b", ".join(vary + [b"Accept-Encoding"]) if vary else b"Accept-Encoding"))
+        headers.append((b"content-encoding", self.encoding.encode()))
+        return {**self.start, "headers": headers}  # type: ignore
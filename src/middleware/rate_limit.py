@@ -0,0 +1,173 @@
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+from fastapi import status
+from fastapi.responses import JSONResponse
+from src.core.config import settings
+from src.core.security import decode_token
+from src.utils.token_bucket import TokenBucket
+
+logger = logging.getLogger(__name__)
+
+
+class RatePolicy:
+    """``limit`` requests per minute for paths starting with ``prefix``,
+    counted per user when the request carries a valid token, else per IP."""
+
+    def __init__(self, name: str, prefix: str, limit: int, methods: Optional[Tuple[str, ...]] = None):
+        self.name = name
+        self.prefix = prefix
+        self.limit = limit
+        self.methods = methods
+
+    def matches(self, method: str, path: str) -> bool:
+        return path.startswith(self.prefix) and (self.methods is None or method in self.methods)
+
+
+# first match wins; other paths are not limited. There is deliberately no
+# catch-all: the interview agent calls get-context and analyze for every
+# interview from one IP, and candidate pages poll get-data.
+POLICIES: List[RatePolicy] = [
+    RatePolicy("login", "/api/auth/login", settings.RATE_LIMIT_LOGIN_PER_MINUTE),
+    RatePolicy("register", "/api/auth/register", settings.RATE_LIMIT_LOGIN_PER_MINUTE),
+    RatePolicy("check_password", "/api/interview/check-password", settings.RATE_LIMIT_CHECK_PASSWORD_PER_MINUTE),
+    RatePolicy("evaluation", "/api/evaluate/new_evaluation", settings.RATE_LIMIT_EVALUATION_PER_MINUTE),
+]
+
+EXEMPT_PATHS = {"/health", "/ready"}
+
+# Add the hits counted locally since the last sync to the current one-minute
+# window and return the current and previous window totals.
+# KEYS[1] current window, KEYS[2] previous window; ARGV[1] local hits
+_SYNC_SCRIPT = """
+local current = redis.call('INCRBY', KEYS[1], ARGV[1])
+redis.call('EXPIRE', KEYS[1], 120)
+local previous = tonumber(redis.call('GET', KEYS[2]) or '0')
+return {current, previous}
+"""
+
+
+class RateLimitMiddleware:
+    """Pure ASGI rate limiter.
+
+    Every request is decided locally against a token bucket per (policy,
+    identity), so the hot path is a dict lookup and never waits on Redis.
+    With ``RATE_LIMIT_REDIS_URL`` set, a background task pushes local hit
+    counts to Redis every ``RATE_LIMIT_SYNC_INTERVAL`` seconds and reads back
+    the cluster-wide sliding-window estimate; identities over their limit are
+    then refused by every worker until the window moves on.
+    """
+
+    def __init__(self, app, policies: List[RatePolicy] = POLICIES, max_identities: int = 100_000,
+                 redis_url: Optional[str] = settings.RATE_LIMIT_REDIS_URL):
+        self.app = app
+        self.policies = policies
+        self.max_identities = max_identities
+        self.buckets: "OrderedDict[Tuple[str, str], TokenBucket]" = OrderedDict()
+        self.blocked: Dict[Tuple[str, str], float] = {}  # -> blocked until (monotonic)
+        self.pending_hits: Dict[Tuple[str, str], int] = {}
+        self.redis_url = redis_url
+        self._redis = None
+        self._sync_task: Optional[asyncio.Task] = None
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] == "OPTIONS" or scope["path"] in EXEMPT_PATHS:
+            return await self.app(scope, receive, send)
+
+        policy = next((p for p in self.policies if p.matches(scope["method"], scope["path"])), None)
+        if policy is None or policy.limit <= 0:
+            return await self.app(scope, receive, send)
+
+        slot = (policy.name, self._identity(scope))
+        retry_after = self._hit(slot, policy)
+        if retry_after > 0:
+            return await self._reject(scope, receive, send, policy, retry_after)
+
+        if self.redis_url and self._sync_task is None:
+            self._sync_task = asyncio.create_task(self._sync_loop())
+        return await self.app(scope, receive, send)
+
+    def _identity(self, scope) -> str:
+        headers = dict(scope.get("headers") or [])
+        auth = headers.get(b"authorization", b"").decode("latin-1")
+        if auth.startswith("Bearer "):
+            payload = decode_token(auth[7:])
+            if isinstance(payload, dict) and payload.get("sub"):
+                return f"user:{payload['sub']}"
+        if settings.RATE_LIMIT_TRUST_FORWARDED and b"x-forwarded-for" in headers:
+            return "ip:" + headers[b"x-forwarded-for"].decode("latin-1").split(",")[0].strip()
+        client = scope.get("client")
+        return f"ip:{client[0] if client else 'unknown'}"
+
+    def _hit(self, slot: Tuple[str, str], policy: RatePolicy) -> float:
+        """Count the request; return seconds to wait if it is over the limit."""
+        now = time.monotonic()
+        blocked_until = self.blocked.get(slot)
+        if blocked_until is not None:
+            if blocked_until > now:
+                return blocked_until - now
+            del self.blocked[slot]
+
+        bucket = self.buckets.get(slot)
+        if bucket is None:
+            bucket = self.buckets[slot] = TokenBucket.per_minute(policy.limit)
+            if len(self.buckets) > self.max_identities:
+                self.buckets.popitem(last=False)
+        else:
+            self.buckets.move_to_end(slot)
+
+        if not bucket.consume(1):
+            return max(bucket.wait_time(1), 0.001)
+        if self.redis_url:
+            self.pending_hits[slot] = self.pending_hits.get(slot, 0) + 1
+        return 0.0
+
+    async def _sync_loop(self):
+        while True:
+            await asyncio.sleep(settings.RATE_LIMIT_SYNC_INTERVAL)
+            try:
+                await self._sync()
+            except Exception:
+                logger.warning("Rate limit sync with Redis failed", exc_info=True)
+
+    async def _sync(self):
+        if not self.pending_hits:
+            return
+        if self._redis is None:
+            import redis.asyncio as aioredis  # deferred: only needed for shared limits
+
+            self._redis = aioredis.Redis.from_url(self.redis_url, socket_timeout=0.5)
+            self._script = self._redis.register_script(_SYNC_SCRIPT)
+
+        hits, self.pending_hits = self.pending_hits, {}
+        limits = {p.name: p.limit for p in self.policies}
+        now = time.time()
+        window = int(now // 60)
+        elapsed = (now % 60) / 60
+
+        pipe = self._redis.pipeline(transaction=False)
+        slots = list(hits)
+        for slot in slots:
+            base = f"ratelimit:{slot[0]}:{slot[1]}"
+            await self._script(keys=[f"{base}:{window}", f"{base}:{window - 1}"], args=[hits[slot]], client=pipe)
+        results = await pipe.execute()
+
+        for slot, (current, previous) in zip(slots, results):
+            # sliding window: the previous minute counts in proportion to its overlap
+            estimate = int(previous) * (1 - elapsed) + int(current)
+            if estimate >= limits.get(slot[0], 0) > 0:
+                self.blocked[slot] = time.monotonic() + (1 - elapsed) * 60
+
+    async def _reject(self, scope, receive, send, policy: RatePolicy, retry_after: float):
+        response = JSONResponse(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            content={"success": False, "error": {"code": "rate_limited", "message": "Too many requests"}},
+            headers={
+                "Retry-After": str(max(1, int(retry_after + 0.999))),
+                "X-RateLimit-Limit": str(policy.limit),
+                "X-RateLimit-Policy": policy.name,
+            },
+        )
+        await response(scope, receive, send)
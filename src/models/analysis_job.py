@@ -0,0 +1,29 @@
+from datetime import datetime
+from uuid import uuid4
+
+from sqlalchemy import Column, DateTime, String, text
+from sqlalchemy.dialects.postgresql import UUID
+
+from src.db.init_db import Base
+
+
+class AnalysisJob(Base):
+    """State of one transcript analysis, shared by every web and Celery process."""
+
+    __tablename__ = "analysis_jobs"
+
+    id = Column(
+        UUID(as_uuid=True),
+        primary_key=True,
+        default=uuid4,
+        server_default=text("gen_random_uuid()"),
+        nullable=False,
+    )
+    room_name = Column(String, nullable=False, index=True)
+    # queued -> running -> completed | failed
+    status = Column(String, default="queued", server_default="queued", nullable=False, index=True)
+    error = Column(String, nullable=True)
+
+    created_at = Column(DateTime, default=datetime.utcnow, server_default=text("now()"), nullable=False)
+    started_at = Column(DateTime, nullable=True)
+    finished_at = Column(DateTime, nullable=True)
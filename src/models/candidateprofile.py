@@ -28,6 +28,11 @@ class CandidateProfile(Base):
     experience_months = Column(Integer, nullable=True)
     education = Column(JSONB, nullable=True)
 
+    # de-duplication keys, see src/services/candidate_dedup.py
+    email_normalized = Column(String, index=True, nullable=True)
+    phone_normalized = Column(String, index=True, nullable=True)
+    content_hash = Column(String, index=True, nullable=True)
+
     created_at = Column(DateTime, default=datetime.now, nullable=False)
     updated_at = Column(DateTime, default=datetime.now,
                         onupdate=datetime.now, nullable=False)
@@ -40,10 +45,10 @@ class CandidateProfile(Base):
         back_populates="candidate_profiles",
     )
 
-    evaluation = relationship(
+    # one profile is evaluated against every requisition it was uploaded for
+    evaluations = relationship(
         lambda: importlib.import_module("src.models.evaluations").Evaluation,
         back_populates="candidate",
-        uselist=False,
     )
 
     interviews = relationship(
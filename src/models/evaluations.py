@@ -23,7 +23,8 @@ class Evaluation(Base):
 
     candidate_id = Column(String, ForeignKey(
         "candidate_profiles.id"), nullable=False)
-    candidate_status = Column(Boolean, default=True, nullable=False)
+    # NULL while the model gave no eligibility verdict
+    candidate_status = Column(Boolean, nullable=True)
 
     requisition_id = Column(
         UUID(as_uuid=True), ForeignKey("requisitions.id"), nullable=True
@@ -42,12 +43,15 @@ class Evaluation(Base):
         nullable=True
     )
 
-    evaluated_at = Column(DateTime, default=datetime.now, nullable=False)
+    # partition key, so it is part of the primary key (see src/db/partitions.py)
+    evaluated_at = Column(DateTime, default=datetime.now, primary_key=True, nullable=False)
+    updated_at = Column(DateTime, default=datetime.now,
+                        onupdate=datetime.now, nullable=False)
 
     candidate = relationship(
         lambda: importlib.import_module(
             "src.models.candidateprofile").CandidateProfile,
-        back_populates="evaluation",
+        back_populates="evaluations",
     )
 
     requisition_obj = relationship(
@@ -55,8 +59,12 @@ class Evaluation(Base):
         back_populates="evaluations",
     )
 
+    # no FK from interviews: it would have to include the partition key
     interview = relationship(
         lambda: importlib.import_module("src.models.interview").Interview,
+        primaryjoin="Evaluation.id == foreign(Interview.evaluation_id)",
         back_populates="evaluationResult",
         uselist=False,
     )
+
+    __table_args__ = {"postgresql_partition_by": "RANGE (evaluated_at)"}
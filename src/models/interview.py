@@ -30,10 +30,11 @@ class Interview(Base):
         ForeignKey("requisitions.id"),
         nullable=True,
     )
+    # not a FK: evaluations is partitioned and keyed on (id, evaluated_at)
     evaluation_id = Column(
         String,
-        ForeignKey("evaluations.id"),
         nullable=True,
+        index=True,
     )
 
     room_name = Column(String, nullable=False)
@@ -60,6 +61,7 @@ class Interview(Base):
 
     evaluationResult = relationship(
         lambda: importlib.import_module("src.models.evaluations").Evaluation,
+        primaryjoin="foreign(Interview.evaluation_id) == Evaluation.id",
         back_populates="interview",
         uselist=False,
     )
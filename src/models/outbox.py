@@ -0,0 +1,38 @@
+from datetime import datetime
+from uuid import uuid4
+
+from sqlalchemy import Column, DateTime, Index, Integer, String, text
+from sqlalchemy.dialects.postgresql import JSONB, UUID
+
+from src.db.init_db import Base
+
+
+class OutboxEvent(Base):
+    """Side effect recorded in the same transaction as the change causing it.
+
+    ``pending`` rows are handed to Celery by the outbox relay, which marks them
+    ``published``; the task sets ``delivered_at`` once the effect happened.
+    """
+
+    __tablename__ = "outbox_events"
+
+    id = Column(
+        UUID(as_uuid=True),
+        primary_key=True,
+        default=uuid4,
+        server_default=text("gen_random_uuid()"),
+        nullable=False,
+    )
+    topic = Column(String, nullable=False)
+    payload = Column(JSONB, nullable=False)
+    status = Column(String, default="pending", server_default="pending", nullable=False)
+    attempts = Column(Integer, default=0, server_default="0", nullable=False)
+    last_error = Column(String, nullable=True)
+
+    created_at = Column(DateTime, default=datetime.utcnow, server_default=text("now()"), nullable=False)
+    published_at = Column(DateTime, nullable=True)
+    delivered_at = Column(DateTime, nullable=True)
+
+    __table_args__ = (
+        Index("ix_outbox_events_status_created_at", "status", "created_at"),
+    )
@@ -0,0 +1,186 @@
+import asyncio
+import json
+import logging
+from datetime import datetime, timedelta
+from typing import Any, Dict, Optional
+from sqlalchemy import and_, func, insert, or_, select, update
+from sqlalchemy.orm import Session, joinedload
+from src.core.config import settings
+from src.db.init_db import SessionLocal, session_scope
+from src.models.analysis_job import AnalysisJob
+from src.models.interview import Interview
+from src.services.interview_cache import invalidate_interview_data
+from src.services.outbox import ANALYSIS_REQUESTED, enqueue_event
+from src.services.websocket import manager
+
+logger = logging.getLogger(__name__)
+
+# analysis results reach every web process (and its websockets) through here
+EVENTS_CHANNEL = "interview-analysis"
+
+
+class AnalysisQueueFull(RuntimeError):
+    pass
+
+
+def _job_dict(job: AnalysisJob) -> Dict[str, Any]:
+    return {
+        "job_id": str(job.id),
+        "room_name": job.room_name,
+        "status": job.status,
+        "created_at": job.created_at.isoformat() if job.created_at else None,  # type: ignore
+        "finished_at": job.finished_at.isoformat() if job.finished_at else None,  # type: ignore
+        "error": job.error,
+    }
+
+
+def _stale():
+    """Jobs queued or running for longer than ``ANALYSIS_JOB_TIMEOUT_SECONDS``."""
+    cutoff = datetime.utcnow() - timedelta(seconds=settings.ANALYSIS_JOB_TIMEOUT_SECONDS)
+    return or_(
+        and_(AnalysisJob.status == "queued", AnalysisJob.created_at < cutoff),
+        and_(AnalysisJob.status == "running", AnalysisJob.started_at < cutoff),
+    )
+
+
+def reap_stale_jobs(db: Session) -> int:
+    """Mark jobs a crashed or lost worker never finished as failed."""
+    reaped = db.execute(
+        update(AnalysisJob).where(_stale())
+        .values(status="failed", error="timed out", finished_at=datetime.utcnow())
+    ).rowcount
+    if reaped:
+        logger.warning("Marked %s stale analysis jobs as failed", reaped)
+    return reaped
+
+
+def submit_analysis(db: Session, transcript_data: Any, room_name: str) -> Dict[str, Any]:
+    """Record a queued job and its Celery hand-off in one transaction.
+
+    The outbox relay publishes the task, so the request never waits on the
+    broker. Raises ``AnalysisQueueFull`` past ``ANALYSIS_QUEUE_SIZE``
+    unfinished jobs; stale ones (see ``reap_stale_jobs``) don't count.
+    """
+    pending = db.execute(
+        select(func.count()).select_from(AnalysisJob)
+        .where(AnalysisJob.status.in_(("queued", "running")), ~_stale())
+    ).scalar_one()
+    if pending >= settings.ANALYSIS_QUEUE_SIZE:
+        raise AnalysisQueueFull(f"{pending} analyses pending")
+
+    job = db.execute(
+        insert(AnalysisJob).values(room_name=room_name).returning(AnalysisJob)
+    ).scalar_one()
+    enqueue_event(db, ANALYSIS_REQUESTED, {
+        "job_id": str(job.id),
+        "room_name": room_name,
+        "transcript_data": transcript_data,
+    })
+    db.commit()
+    return _job_dict(job)
+
+
+def get_job(db: Session, job_id: str) -> Optional[Dict[str, Any]]:
+    job = db.get(AnalysisJob, job_id)
+    return _job_dict(job) if job else None
+
+
+def _set_status(job_id: str, **values) -> None:
+    with session_scope() as db:
+        db.execute(update(AnalysisJob).where(AnalysisJob.id == job_id).values(**values))
+
+
+def run_analysis_job(job_id: str, room_name: str, transcript_data: Any) -> Optional[Dict[str, Any]]:
+    """Analyse, store and announce one job. Runs in the Celery worker.
+
+    A job that already finished (e.g. a re-delivered task) is skipped.
+    """
+    from src.services.process_interview import analyze_transcript_content
+
+    with session_scope() as db:
+        status = db.execute(select(AnalysisJob.status).where(AnalysisJob.id == job_id)).scalar()
+    if status in ("completed", "failed"):
+        logger.info("Analysis job %s already %s, skipping", job_id, status)
+        return None
+
+    _set_status(job_id, status="running", started_at=datetime.utcnow())
+    try:
+        analysis_result = analyze_transcript_content(transcript_data)
+        if "error" in analysis_result:
+            raise RuntimeError(analysis_result["error"])
+        interview_id = persist_analysis(room_name, analysis_result)
+    except Exception as exc:
+        logger.exception("Interview analysis failed for room %s", room_name)
+        _set_status(job_id, status="failed", error=str(exc)[:1000], finished_at=datetime.utcnow())
+        publish_event({"status": "failed", "job_id": job_id, "room_name": room_name, "error": str(exc)})
+        return None
+
+    _set_status(job_id, status="completed", finished_at=datetime.utcnow())
+    publish_event({
+        "status": "success",
+        "job_id": job_id,
+        "room_name": room_name,
+        "interview_id": str(interview_id),
+        "analysis": analysis_result,
+    })
+    return analysis_result
+
+
+def persist_analysis(room_name: str, analysis_result: Dict[str, Any]) -> Any:
+    """Store the analysis on the evaluation linked to ``room_name``; returns the interview id."""
+    db = SessionLocal()
+    try:
+        interview = (
+            db.query(Interview)
+            .options(joinedload(Interview.evaluationResult))
+            .filter(Interview.room_name == room_name)
+            .first()
+        )
+        if not interview or not interview.evaluationResult:
+            raise LookupError(f"No evaluation linked to room {room_name}")
+
+        evaluation = interview.evaluationResult
+        evaluation.report = analysis_result.get("analysis") or analysis_result
+        evaluation.interview_status = True  # type: ignore
+        db.commit()
+        return interview.id
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+def publish_event(event: Dict[str, Any]) -> None:
+    import redis  # deferred: only the worker publishes
+
+    try:
+        redis.Redis.from_url(settings.REDIS_URL, socket_timeout=2).publish(
+            EVENTS_CHANNEL, json.dumps(event))
+    except Exception:
+        logger.warning("Could not publish analysis event for job %s", event.get("job_id"), exc_info=True)
+
+
+async def relay_analysis_events() -> None:
+    """Forward worker results to this process's websockets; runs for the app's lifetime."""
+    import redis.asyncio as aioredis  # deferred: only needed in the web process
+
+    while True:
+        try:
+            client = aioredis.Redis.from_url(settings.REDIS_URL)
+            async with client.pubsub() as pubsub:
+                await pubsub.subscribe(EVENTS_CHANNEL)
+                async for message in pubsub.listen():
+                    if message.get("type") != "message":
+                        continue
+                    event = json.loads(message["data"])
+                    interview_id = event.pop("interview_id", None)
+                    if interview_id:
+                        # the stored report changed; drop this process's cached get-data
+                        invalidate_interview_data(interview_id)
+                    await manager.broadcast(event)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            logger.warning("Analysis event relay lost Redis, reconnecting", exc_info=True)
+            await asyncio.sleep(2)
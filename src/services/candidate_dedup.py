@@ -0,0 +1,172 @@
+import hashlib
+import logging
+import re
+from typing import Any, Dict, Optional
+from sqlalchemy import func, or_, select, update
+from sqlalchemy.orm import Session
+from src.models.candidateprofile import CandidateProfile
+from src.models.evaluations import Evaluation
+from src.models.interview import Interview
+from src.services.prefilter import plausible_phone
+
+logger = logging.getLogger(__name__)
+
+_WS_RE = re.compile(r"\s+")
+_NON_DIGIT_RE = re.compile(r"\D")
+
+
+def normalize_email(email: Optional[str]) -> Optional[str]:
+    email = (email or "").strip().lower()
+    return email or None
+
+
+def normalize_phone(phone: Optional[str]) -> Optional[str]:
+    """Digits only, compared on the last 10 so country prefixes don't matter."""
+    if not phone or not plausible_phone(phone):
+        return None
+    return _NON_DIGIT_RE.sub("", phone)[-10:]
+
+
+def content_hash(resume_text: str) -> str:
+    normalized = _WS_RE.sub(" ", (resume_text or "").lower()).strip()
+    return hashlib.sha256(normalized.encode("utf-8")).hexdigest()
+
+
+def dedup_keys(email: Optional[str], phone: Optional[str]) -> Dict[str, Optional[str]]:
+    return {
+        "email_normalized": normalize_email(email),
+        "phone_normalized": normalize_phone(phone),
+    }
+
+
+def find_candidate(
+    db: Session,
+    content_digest: Optional[str] = None,
+    email: Optional[str] = None,
+    phone: Optional[str] = None,
+) -> Optional[CandidateProfile]:
+    """Oldest profile with the same resume content, else the same email.
+
+    A phone number only identifies a candidate when neither side has an
+    email; with an email, a profile under a different (or no) email is
+    another person even if the phone matches.
+    """
+    def oldest(*criteria):
+        return (
+            db.query(CandidateProfile)
+            .filter(*criteria)
+            .order_by(CandidateProfile.created_at)
+            .first()
+        )
+
+    if content_digest:
+        profile = oldest(CandidateProfile.content_hash == content_digest)
+        if profile:
+            return profile
+
+    email_key = normalize_email(email)
+    if email_key:
+        return oldest(CandidateProfile.email_normalized == email_key)
+
+    phone_key = normalize_phone(phone)
+    if phone_key:
+        return oldest(
+            CandidateProfile.phone_normalized == phone_key,
+            or_(CandidateProfile.email_normalized.is_(None), CandidateProfile.email_normalized == ""),
+        )
+    return None
+
+
+def find_evaluation(db: Session, candidate_id: Any, requisition_id: Any) -> Optional[Evaluation]:
+    return (
+        db.query(Evaluation)
+        .filter(
+            Evaluation.candidate_id == candidate_id,
+            Evaluation.requisition_id == requisition_id,
+        )
+        .order_by(Evaluation.evaluated_at.desc())
+        .first()
+    )
+
+
+def backfill_dedup_keys(db: Session, batch_size: int = 1000) -> int:
+    """Fill the normalized columns for profiles created before de-duplication."""
+    updated = 0
+    while True:
+        rows = (
+            db.query(CandidateProfile)
+            .filter(
+                CandidateProfile.email_normalized.is_(None),
+                CandidateProfile.email.isnot(None),
+            )
+            .limit(batch_size)
+            .all()
+        )
+        if not rows:
+            break
+        for row in rows:
+            keys = dedup_keys(row.email, row.phone)  # type: ignore
+            # an email that normalizes to nothing still needs a marker to leave the loop
+            row.email_normalized = keys["email_normalized"] or ""  # type: ignore
+            row.phone_normalized = keys["phone_normalized"]  # type: ignore
+        db.commit()
+        updated += len(rows)
+    return updated
+
+
+def merge_duplicate_candidates(db: Session) -> Dict[str, int]:
+    """Fold profiles sharing a normalized email into the oldest one.
+
+    Evaluations and interviews are re-pointed to the surviving profile, then
+    the duplicates are deleted. Each email group is merged in its own
+    transaction.
+    """
+    backfilled = backfill_dedup_keys(db)
+
+    groups = db.execute(
+        select(CandidateProfile.email_normalized)
+        .where(CandidateProfile.email_normalized.isnot(None), CandidateProfile.email_normalized != "")
+        .group_by(CandidateProfile.email_normalized)
+        .having(func.count() > 1)
+    ).scalars().all()
+
+    merged = 0
+    for email in groups:
+        ids = db.execute(
+            select(CandidateProfile.id)
+            .where(CandidateProfile.email_normalized == email)
+            .order_by(CandidateProfile.created_at)
+        ).scalars().all()
+        keeper, duplicates = ids[0], ids[1:]
+        try:
+            db.execute(
+                update(Evaluation)
+                .where(Evaluation.candidate_id.in_(duplicates))
+                .values(candidate_id=keeper)
+            )
+            db.execute(
+                update(Interview)
+                .where(Interview.candidate_profile_id.in_(duplicates))
+                .values(candidate_profile_id=keeper)
+            )
+            db.query(CandidateProfile).filter(
+                CandidateProfile.id.in_(duplicates)
+            ).delete(synchronize_session=False)
+            db.commit()
+            merged += len(duplicates)
+        except Exception:
+            db.rollback()
+            logger.exception("Failed to merge duplicate candidates for %s", email)
+
+    return {"backfilled": backfilled, "groups": len(groups), "merged": merged}
+
+
+if __name__ == "__main__":
+    from src.db.init_db import SessionLocal
+
+    logging.basicConfig(level=logging.INFO)
+    session = SessionLocal()
+    try:
+        print(merge_duplicate_candidates(session))
+    finally:
+        session.close()
@@ -7,11 +7,11 @@ from src.models.evaluations import Evaluation
 
 def get_recent_entries_sql(db: Session) -> Dict[str, Any]:
     try:
-        start_of_today = datetime.datetime.now(tz=datetime.timezone.utc).replace(
-            hour=0, minute=0, second=0, microsecond=0
-        )
+        # evaluated_at is naive local time; a plain range on it lets
+        # Postgres prune to today's partition
+        start_of_today = datetime.datetime.combine(datetime.date.today(), datetime.time.min)
 
-        stmt = select(Evaluation).where(Evaluation.created_at >= start_of_today).order_by(desc(Evaluation.created_at))
+        stmt = select(Evaluation).where(Evaluation.evaluated_at >= start_of_today).order_by(desc(Evaluation.evaluated_at))
         rows = db.execute(stmt).scalars().all()
 
         # convert ORM objects to dicts if needed (e.g. with pydantic schema)
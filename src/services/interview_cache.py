@@ -0,0 +1,65 @@
+import hashlib
+import hmac
+from typing import Any, Callable, Dict, Optional
+from src.core.config import settings
+from src.utils.token_bucket import TokenBucket
+from src.utils.ttl_cache import TTLCache
+
+# get-data payloads by interview id
+interview_data_cache = TTLCache(
+    max_size=settings.INTERVIEW_DATA_CACHE_SIZE,
+    ttl=settings.INTERVIEW_DATA_CACHE_TTL,
+)
+
+
+def get_interview_data(interview_id: str) -> Optional[Dict[str, Any]]:
+    return interview_data_cache.get(str(interview_id))
+
+
+def set_interview_data(interview_id: str, payload: Dict[str, Any], expires_in: float) -> None:
+    """Cache a payload, never past the expiry of the interview's token."""
+    interview_data_cache.set(
+        str(interview_id), payload, ttl=min(settings.INTERVIEW_DATA_CACHE_TTL, expires_in))
+
+
+def invalidate_interview_data(interview_id: Any) -> None:
+    interview_data_cache.pop(str(interview_id))
+
+
+# interview id -> sha256 of its password; "" marks an unknown interview
+_password_digests = TTLCache(max_size=10000, ttl=settings.INTERVIEW_PASSWORD_CACHE_TTL)
+# interview id -> attempt budget
+_password_attempts = TTLCache(max_size=10000, ttl=600)
+
+
+def _digest(password: str) -> bytes:
+    return hashlib.sha256(password.encode("utf-8")).digest()
+
+
+def password_attempt_allowed(interview_id: str) -> bool:
+    key = str(interview_id)
+    bucket = _password_attempts.get(key)
+    if bucket is None:
+        bucket = TokenBucket.per_minute(settings.INTERVIEW_PASSWORD_ATTEMPTS_PER_MINUTE)
+        _password_attempts.set(key, bucket)
+    return bucket.consume(1)
+
+
+def check_interview_password(interview_id: str, password: str,
+                             load_password: Callable[[str], Optional[str]]) -> Optional[bool]:
+    """Compare ``password`` with the interview's in constant time.
+
+    ``load_password`` fetches the stored password (``None`` if the interview
+    doesn't exist) and only runs on a cache miss. Returns ``None`` for an
+    unknown interview.
+    """
+    key = str(interview_id)
+    stored = _password_digests.get(key)
+    if stored is None:
+        password_value = load_password(key)
+        stored = _digest(password_value) if password_value is not None else b""
+        _password_digests.set(key, stored)
+    if not stored:
+        return None
+    # fixed-length digests, so the comparison time says nothing about the password
+    return hmac.compare_digest(stored, _digest(password))
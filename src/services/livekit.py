@@ -1,17 +1,22 @@
-import os
+import hashlib
+import time
 from typing import Any, Dict
 import jwt
 from jwt import ExpiredSignatureError, InvalidTokenError
-from dotenv import load_dotenv
+from src.core.config import settings
+from src.utils.ttl_cache import TTLCache
 
-load_dotenv()
+# read once; rotating the secret needs a restart anyway
+LIVEKIT_API_SECRET = settings.LIVEKIT_API_SECRET
+
+_verified = TTLCache(max_size=settings.LIVEKIT_VERIFY_CACHE_SIZE)
 
 
 def verify_livekit_token(token: str) -> Dict[str, Any]:
     if not token:
         return {"valid": False, "error": "Token or secret missing"}
 
-    secret = os.getenv("LIVEKIT_API_SECRET")
+    secret = LIVEKIT_API_SECRET
     if not secret:
         return {"valid": False, "error": "Token or secret missing"}
 
@@ -21,4 +26,26 @@ def verify_livekit_token(token: str) -> Dict[str, Any]:
     except ExpiredSignatureError:
         return {"valid": False, "error": "Token expired"}
     except InvalidTokenError as err:
-        return {"valid": False, "error": str(err)}
\ No newline at end of file
+        return {"valid": False, "error": str(err)}
+
+
+def token_expires_in(result: Dict[str, Any]) -> float:
+    """Seconds until a verified token's ``exp``; 0 if unknown or invalid."""
+    exp = (result.get("payload") or {}).get("exp") if result.get("valid") else None
+    return max(0.0, exp - time.time()) if exp else 0.0
+
+
+def verify_livekit_token_cached(token: str) -> Dict[str, Any]:
+    """``verify_livekit_token`` memoised by token hash until the token expires.
+
+    Only valid results are cached; they stop being served at ``exp``, so an
+    expired token is always re-checked and rejected.
+    """
+    if not token:
+        return verify_livekit_token(token)
+    key = hashlib.sha256(token.encode()).hexdigest()
+    result = _verified.get(key)
+    if result is None:
+        result = verify_livekit_token(token)
+        _verified.set(key, result, ttl=token_expires_in(result))
+    return result
@@ -0,0 +1,310 @@
+import logging
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, CancelledError, Future, ThreadPoolExecutor, wait
+from threading import Event, Lock
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+from src.core import providers
+from src.core.config import settings
+from src.utils.keymanager import KeyManager
+
+logger = logging.getLogger(__name__)
+
+OPENROUTER_BASE_URL = "https://openrouter.ai/api/v1"
+
+
+def estimate_tokens(*texts: str) -> int:
+    """Rough prompt size (~4 characters per token) plus the expected answer."""
+    return sum(len(t) for t in texts) // 4 + settings.LLM_EXPECTED_OUTPUT_TOKENS
+
+
+class LatencyStats:
+    """Rolling window of call latencies and outcomes."""
+
+    def __init__(self, window: int):
+        self.latencies: deque = deque(maxlen=window)
+        self.outcomes: deque = deque(maxlen=window)
+
+    def record(self, latency: float, ok: bool):
+        if ok:
+            self.latencies.append(latency)
+        self.outcomes.append(ok)
+
+    def percentile(self, pct: float) -> Optional[float]:
+        if not self.latencies:
+            return None
+        ordered = sorted(self.latencies)
+        index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+        return ordered[index]
+
+    @property
+    def error_rate(self) -> float:
+        if not self.outcomes:
+            return 0.0
+        return self.outcomes.count(False) / len(self.outcomes)
+
+    def score(self) -> float:
+        """Lower is better. Unmeasured backends score 0 so they get tried."""
+        p50 = self.percentile(50)
+        if p50 is None:
+            return 0.0
+        return p50 * (1 + 4 * self.error_rate)
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "p50": self.percentile(50),
+            "p95": self.percentile(95),
+            "error_rate": round(self.error_rate, 3),
+            "samples": len(self.outcomes),
+        }
+
+
+class LLMRouter:
+    """Send completions to the fastest healthy (provider, model, key).
+
+    Latency and error rate are tracked per model and per key. A call still
+    running the primary backend's p95 (or ``LLM_HEDGE_AFTER_SECONDS`` before
+    any samples exist) after it got its key is hedged with a second attempt on
+    the next best backend, or on the same model with another key when there
+    is only one; whichever answers first wins and the other is abandoned.
+    """
+
+    def __init__(self, models: Dict[str, List[str]], key_managers: Dict[str, KeyManager]):
+        self.models = models
+        self.key_managers = key_managers
+        self.model_stats: Dict[Tuple[str, str], LatencyStats] = {}
+        self.key_stats: Dict[str, LatencyStats] = {}
+        self._clients: Dict[Tuple[str, str], Any] = {}
+        self._lock = Lock()
+        self._executor = ThreadPoolExecutor(
+            max_workers=settings.LLM_MAX_PARALLEL_CALLS, thread_name_prefix="llm")
+
+    @classmethod
+    def from_settings(cls) -> "LLMRouter":
+        return cls(
+            models={
+                "openrouter": settings.LLM_OPENROUTER_MODELS,
+                "gemini": settings.LLM_GEMINI_MODELS,
+            },
+            key_managers={
+                "openrouter": KeyManager("LLM_KEYS"),
+                "gemini": KeyManager("GEMINI_KEYS", ("GEMINI_API_KEY", "GOOGLE_API_KEY")),
+            },
+        )
+
+    def _stats(self, table: Dict, key) -> LatencyStats:
+        with self._lock:
+            if key not in table:
+                table[key] = LatencyStats(settings.LLM_STATS_WINDOW)
+            return table[key]
+
+    def _candidates(self, providers: Optional[Iterable[str]]) -> List[Tuple[str, str]]:
+        """Healthy (provider, model) pairs, best first."""
+        wanted = set(providers) if providers else set(self.models)
+        ranked = []
+        for provider, models in self.models.items():
+            if provider not in wanted or provider not in self.key_managers:
+                continue
+            if not self.key_managers[provider].active_keys():
+                continue
+            for model in models:
+                stats = self._stats(self.model_stats, (provider, model))
+                if stats.error_rate > settings.LLM_MAX_ERROR_RATE and len(stats.outcomes) >= 5:
+                    continue
+                ranked.append((stats.score(), provider, model))
+        ranked.sort(key=lambda r: r[0])
+        return [(p, m) for _, p, m in ranked]
+
+    def _key_order(self, provider: str, exclude: Sequence[str] = ()) -> List[str]:
+        # fastest keys first; the key manager breaks ties on load
+        keys = [k for k in self.key_managers[provider].keys if k not in exclude]
+        return sorted(keys, key=lambda k: self._stats(self.key_stats, k).score())
+
+    def _hedge_target(self, candidates: List[Tuple[str, str]],
+                      primary_keys: Sequence[str]) -> Optional[Tuple[Tuple[str, str], Sequence[str]]]:
+        """Backend for the hedge and the keys it must not use, or None.
+
+        Prefers the next best model; with a single model the hedge goes to
+        the same one with a key the primary isn't holding.
+        """
+        if len(candidates) > 1:
+            return candidates[1], ()
+        provider, _ = candidates[0]
+        spare = [k for k in self.key_managers[provider].active_keys() if k not in primary_keys]
+        return (candidates[0], tuple(primary_keys)) if spare else None
+
+    def _client(self, provider: str, key: str):
+        with self._lock:
+            client = self._clients.get((provider, key))
+            if client is None:
+                if provider == "openrouter":
+                    client = providers.get("openai")(base_url=OPENROUTER_BASE_URL, api_key=key)
+                else:
+                    genai, _ = providers.get("genai")
+                    client = genai.Client(api_key=key)
+                self._clients[(provider, key)] = client
+            return client
+
+    def _call(self, provider: str, model: str, key: str, system_prompt: str, user_text: str,
+              json_mode: bool = False, on_delta: Optional[Callable[[str], None]] = None,
+              cancel: Optional[Event] = None) -> str:
+        """One completion, always streamed so it can be abandoned.
+
+        ``on_delta`` receives every chunk of text as it arrives.
+        Once ``cancel`` is set the stream is closed and ``CancelledError``
+        raised, which lets the provider stop generating.
+        """
+        client = self._client(provider, key)
+        if provider == "openrouter":
+            extra = {"response_format": {"type": "json_object"}} if json_mode else {}
+            stream = client.chat.completions.create(
+                model=model,
+                messages=[
+                    {"role": "system", "content": system_prompt},
+                    {"role": "user", "content": user_text},
+                ],
+                stream=True,
+                **extra,
+            )
+            deltas = (chunk.choices[0].delta.content if chunk.choices else None for chunk in stream)
+        else:
+            _, types = providers.get("genai")
+            config = types.GenerateContentConfig(
+                system_instruction=system_prompt,
+                response_mime_type="application/json" if json_mode else None,
+            )
+            stream = client.models.generate_content_stream(
+                model=model, config=config, contents=user_text)
+            deltas = (chunk.text for chunk in stream)
+
+        parts: List[str] = []
+        try:
+            for delta in deltas:
+                if cancel is not None and cancel.is_set():
+                    raise CancelledError()
+                if delta:
+                    parts.append(delta)
+                    if on_delta is not None:
+                        on_delta(delta)
+        finally:
+            close = getattr(stream, "close", None)
+            if close is not None:
+                close()
+        return "".join(parts)
+
+    def _timed_call(self, backend: Tuple[str, str], system_prompt: str, user_text: str,
+                    on_wait: Optional[Callable[[Dict[str, Any]], None]] = None,
+                    json_mode: bool = False,
+                    on_delta: Optional[Callable[[str], None]] = None,
+                    cancel: Optional[Event] = None,
+                    leased: Optional[Event] = None,
+                    exclude_keys: Sequence[str] = (),
+                    leased_keys: Optional[List[str]] = None) -> str:
+        provider, model = backend
+        key_manager = self.key_managers[provider]
+        tokens = estimate_tokens(system_prompt, user_text)
+        with key_manager.lease(self._key_order(provider, exclude_keys), tokens=tokens,
+                               on_wait=on_wait, cancel=cancel) as key:
+            if leased_keys is not None:
+                leased_keys.append(key)
+            if leased is not None:
+                leased.set()
+            if cancel is not None and cancel.is_set():
+                raise CancelledError()
+            start = time.perf_counter()
+            try:
+                text = self._call(provider, model, key, system_prompt, user_text,
+                                  json_mode, on_delta, cancel)
+            except CancelledError:
+                # lost the hedge race; says nothing about the backend's health
+                logger.debug("Abandoned LLM call to %s/%s", provider, model)
+                raise
+            except Exception as exc:
+                elapsed = time.perf_counter() - start
+                self._stats(self.model_stats, backend).record(elapsed, False)
+                self._stats(self.key_stats, key).record(elapsed, False)
+                key_manager.mark_key_as_failed(key)
+                logger.warning("LLM call to %s/%s with key %s... failed after %.2fs: %s",
+                               provider, model, key[:8], elapsed, exc)
+                raise
+            elapsed = time.perf_counter() - start
+            self._stats(self.model_stats, backend).record(elapsed, True)
+            self._stats(self.key_stats, key).record(elapsed, True)
+            return text
+
+    def _hedge_delay(self, backend: Tuple[str, str]) -> float:
+        p95 = self._stats(self.model_stats, backend).percentile(95)
+        if p95 is None:
+            return settings.LLM_HEDGE_AFTER_SECONDS
+        return max(settings.LLM_HEDGE_MIN_SECONDS, p95)
+
+    def complete(self, system_prompt: str, user_text: str,
+                 providers: Optional[Iterable[str]] = None, retries: int = 3,
+                 on_wait: Optional[Callable[[Dict[str, Any]], None]] = None,
+                 json_mode: bool = False,
+                 on_stream: Optional[Callable[[], Callable[[str], None]]] = None) -> str:
+        """Return the model's text answer, trying up to ``retries`` rounds.
+
+        ``on_wait`` receives queue position updates while the call waits for
+        a key's rate budget. ``json_mode`` asks the provider for a bare JSON
+        object (OpenAI ``response_format`` / Gemini ``response_mime_type``).
+        ``on_stream`` is called at the start of every attempt and returns the
+        callback that receives that attempt's chunks, so a retry starts from a
+        clean slate. Only the primary attempt is streamed, so partial output
+        never interleaves. Once one attempt answers, the other is cancelled.
+        """
+        last_exc: Optional[Exception] = None
+        for attempt in range(retries):
+            candidates = self._candidates(providers)
+            if not candidates:
+                break
+            primary = candidates[0]
+            logger.debug("Using %s/%s (attempt %d/%d)", primary[0], primary[1], attempt + 1, retries)
+
+            # set once a winner is chosen so the other attempt stops reading
+            on_delta = on_stream() if on_stream is not None else None
+            cancel = Event()
+            leased = Event()
+            primary_keys: List[str] = []
+            pending: List[Future] = [self._executor.submit(
+                self._timed_call, primary, system_prompt, user_text, on_wait, json_mode,
+                on_delta, cancel, leased, (), primary_keys)]
+            # a call queued for key budget is not slow yet; the hedge clock
+            # starts once the primary holds its key (or gave up waiting)
+            pending[0].add_done_callback(lambda _: leased.set())
+            try:
+                leased.wait()
+                done, _ = wait(pending, timeout=self._hedge_delay(primary))
+                hedge = None if done else self._hedge_target(candidates, primary_keys)
+                if hedge is not None:
+                    backend, exclude = hedge
+                    logger.info("Hedging slow LLM call on %s/%s", backend[0], backend[1])
+                    pending.append(self._executor.submit(
+                        self._timed_call, backend, system_prompt, user_text, None,
+                        json_mode, None, cancel, None, exclude))
+
+                while pending:
+                    done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        pending.remove(future)
+                        try:
+                            return future.result()
+                        except Exception as exc:
+                            last_exc = exc
+            finally:
+                cancel.set()
+                for future in pending:
+                    future.cancel()
+
+        raise RuntimeError("🚨 All API keys failed after retries.") from last_exc
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "models": {f"{p}/{m}": s.snapshot() for (p, m), s in self.model_stats.items()},
+            "keys": {f"{k[:8]}...": s.snapshot() for k, s in self.key_stats.items()},
+            "key_load": {p: km.stats() for p, km in self.key_managers.items()},
+        }
+
+
+# built on first use, see src.core.providers
+llm_router: LLMRouter = providers.Lazy("llm_router")  # type: ignore
@@ -0,0 +1,101 @@
+import logging
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, Mapping
+from sqlalchemy import and_, insert, or_, select, update
+from sqlalchemy.orm import Session
+from src.core.config import settings
+from src.db.init_db import session_scope
+from src.models.outbox import OutboxEvent
+
+logger = logging.getLogger(__name__)
+
+EVALUATION_COMPLETED = "evaluation.completed"
+ANALYSIS_REQUESTED = "analysis.requested"
+
+
+def enqueue_event(db: Session, topic: str, payload: Dict[str, Any]) -> str:
+    """Record a side effect in the caller's transaction; nothing is committed here."""
+    event_id = db.execute(
+        insert(OutboxEvent)
+        .values(topic=topic, payload=payload)
+        .returning(OutboxEvent.id)
+    ).scalar_one()
+    return str(event_id)
+
+
+def drain_outbox(publishers: Mapping[str, Callable[[str, Dict[str, Any]], None]],
+                 batch_size: int = settings.OUTBOX_BATCH_SIZE) -> int:
+    """Hand pending events to the broker, one batch per transaction.
+
+    ``publishers`` maps a topic to ``publish(event_id, payload)``. Rows are
+    claimed with ``FOR UPDATE SKIP LOCKED`` so several relays can run side by
+    side. Events published long ago but never delivered (e.g. lost by the
+    broker) are published again; consumers dedupe on the event id.
+    Returns the number of events published.
+    """
+    published = 0
+    while True:
+        now = datetime.utcnow()
+        stale = now - timedelta(seconds=settings.OUTBOX_REPUBLISH_AFTER_SECONDS)
+        with session_scope() as db:
+            events = db.execute(
+                select(OutboxEvent)
+                .where(
+                    or_(
+                        OutboxEvent.status == "pending",
+                        and_(
+                            OutboxEvent.status == "published",
+                            OutboxEvent.delivered_at.is_(None),
+                            OutboxEvent.published_at < stale,
+                        ),
+                    ),
+                    OutboxEvent.attempts < settings.OUTBOX_MAX_ATTEMPTS,
+                )
+                .order_by(OutboxEvent.created_at)
+                .limit(batch_size)
+                .with_for_update(skip_locked=True)
+            ).scalars().all()
+
+            for event in events:
+                event.attempts += 1  # type: ignore
+                publish = publishers.get(event.topic)  # type: ignore
+                if publish is None:
+                    event.status = "failed"  # type: ignore
+                    event.last_error = f"no publisher for topic {event.topic}"  # type: ignore
+                    continue
+                try:
+                    publish(str(event.id), event.payload)  # type: ignore
+                except Exception as exc:
+                    # broker down: leave the rest of the batch for the next run
+                    logger.warning("Outbox publish failed for %s: %s", event.id, exc)
+                    event.last_error = str(exc)  # type: ignore
+                    break
+                event.status = "published"  # type: ignore
+                event.published_at = now  # type: ignore
+                published += 1
+            else:
+                if len(events) == batch_size:
+                    continue
+            return published
+
+
+def is_delivered(db: Session, event_id: str) -> bool:
+    return db.execute(
+        select(OutboxEvent.delivered_at).where(OutboxEvent.id == event_id)
+    ).scalar() is not None
+
+
+def mark_delivered(db: Session, event_id: str) -> None:
+    db.execute(
+        update(OutboxEvent)
+        .where(OutboxEvent.id == event_id)
+        .values(status="delivered", delivered_at=datetime.utcnow(), last_error=None)
+    )
+
+
+def mark_failed(db: Session, event_id: str, error: str) -> None:
+    db.execute(
+        update(OutboxEvent)
+        .where(OutboxEvent.id == event_id)
+        .values(last_error=error[:1000])
+    )
@@ -0,0 +1,84 @@
+from typing import Any, Dict, List, Optional, Tuple
+from uuid import uuid4
+from sqlalchemy import insert, update
+from sqlalchemy.orm import Session
+from src.models.candidateprofile import CandidateProfile
+from src.models.evaluations import Evaluation
+
+
+def persist_evaluation(
+    db: Session,
+    profile_values: Dict[str, Any],
+    evaluation_values: Dict[str, Any],
+    candidate_id: Optional[str] = None,
+    evaluation_id: Optional[str] = None,
+    evaluated_by_id: Any = None,
+) -> Tuple[str, str, bool]:
+    """Write a candidate and its evaluation without ORM refresh round trips.
+
+    Inserts (or, given ``candidate_id``, updates) the profile and inserts (or,
+    given ``evaluation_id``, updates) the evaluation, using ``RETURNING`` for
+    the generated ids. Nothing is committed here: run it inside
+    ``session_scope()`` so both rows land in one transaction.
+
+    Returns ``(candidate_id, evaluation_id, evaluation_created)``.
+    """
+    if candidate_id is None:
+        candidate_id = db.execute(
+            insert(CandidateProfile)
+            .values(evaluated_by_id=evaluated_by_id, **profile_values)
+            .returning(CandidateProfile.id)
+        ).scalar_one()
+    else:
+        db.execute(
+            update(CandidateProfile)
+            .where(CandidateProfile.id == candidate_id)
+            .values(**profile_values)
+        )
+
+    if evaluation_id is not None:
+        db.execute(
+            update(Evaluation)
+            .where(Evaluation.id == evaluation_id)
+            .values(**evaluation_values)
+        )
+        return candidate_id, evaluation_id, False
+
+    evaluation_id = db.execute(
+        insert(Evaluation)
+        .values(candidate_id=candidate_id, **evaluation_values)
+        .returning(Evaluation.id)
+    ).scalar_one()
+    return candidate_id, evaluation_id, True
+
+
+def persist_evaluations_bulk(
+    db: Session,
+    rows: List[Tuple[Dict[str, Any], Dict[str, Any]]],
+    evaluated_by_id: Any = None,
+) -> List[Tuple[str, str]]:
+    """Insert new candidates and their evaluations for a whole batch.
+
+    One multi-row ``INSERT ... RETURNING`` per table. Candidate ids are
+    generated up front so each evaluation can be paired with its profile
+    without a second lookup. Every row must carry the same keys.
+    """
+    if not rows:
+        return []
+    candidate_rows = [
+        {"id": str(uuid4()), "evaluated_by_id": evaluated_by_id, **profile}
+        for profile, _ in rows
+    ]
+    evaluation_rows = [
+        {"id": str(uuid4()), "candidate_id": candidate["id"], **evaluation}
+        for candidate, (_, evaluation) in zip(candidate_rows, rows)
+    ]
+    candidate_ids = db.execute(
+        insert(CandidateProfile).returning(CandidateProfile.id, sort_by_parameter_order=True),
+        candidate_rows,
+    ).scalars().all()
+    evaluation_ids = db.execute(
+        insert(Evaluation).returning(Evaluation.id, sort_by_parameter_order=True),
+        evaluation_rows,
+    ).scalars().all()
+    return list(zip(candidate_ids, evaluation_ids))
@@ -0,0 +1,138 @@
+import hashlib
+import math
+import re
+import threading
+from collections import Counter, OrderedDict
+from typing import Dict, List, Optional, Sequence, Tuple
+
+TOKEN_RE = re.compile(r"[a-z0-9][a-z0-9+#]*(?:\.[a-z0-9]+)*")
+EMAIL_RE = re.compile(r"[\w.+-]+@[\w-]+(?:\.[\w-]+)+")
+# an optional +country code and area code in parentheses, then digit groups
+# joined by single separators; ``plausible_phone`` decides on the digits
+PHONE_RE = re.compile(
+    r"(?<![\w+.])(?:\+\d{1,3}[\s.-]?)?(?:\(\d{1,5}\)[\s.-]?)?(?:\d{6,15}|\d{2,5}(?:[\s.-]\d{2,5}){0,4})(?![\w])"
+)
+_DIGIT_GROUP_RE = re.compile(r"\d+")
+_YEAR_RE = re.compile(r"(?:19|20)\d\d")
+
+STOPWORDS = frozenset("""
+a about above after all also an and any are as at be been being below between both but by
+can could did do does doing during each etc few for from further had has have having he her
+here hers him his how i if in into is it its itself just least less like looking may me more
+most must my need needs no nor not now of off on once only or other our ours out over own per
+plus preferred required requirement requirements responsibilities role same she should so
+some strong such than that the their theirs them then there these they this those through to
+too under until up using very via was we well were what when where which while who whom why
+will with within work working would year years you your
+""".split())
+
+# BM25 parameters
+K1 = 1.2
+B = 0.75
+
+
+def tokenize(text: str) -> List[str]:
+    return [
+        t for t in TOKEN_RE.findall((text or "").lower())
+        if t not in STOPWORDS and (len(t) > 1 or t in ("c", "r"))
+    ]
+
+
+class RequisitionIndex:
+    """BM25 scorer with the requisition text as the query.
+
+    Document frequencies and the average length come from a fixed corpus:
+    the requisition plus the batch being scored. A resume's score depends
+    only on what was uploaded with it, never on earlier uploads or on the
+    order of the batch, while terms that appear in almost every resume of
+    the batch ("team", "project") still lose weight.
+    """
+
+    def __init__(self, description: str):
+        tokens = tokenize(description)
+        query = Counter(tokens)
+        # saturate repeated requirement terms instead of counting them linearly
+        self.query_weights: Dict[str, float] = {t: 1 + math.log(c) for t, c in query.items()}
+        self.description_len = len(tokens)
+
+    def score_batch(self, texts: Sequence[str]) -> List[float]:
+        """Relevance of each resume in [0, 1]; 0 means no requisition term at all."""
+        if not self.query_weights:
+            return [1.0] * len(texts)
+        docs = [Counter(tokenize(text)) for text in texts]
+        n_docs = len(docs) + 1
+        # the requisition contains every query term once
+        doc_freq = Counter({term: 1 for term in self.query_weights})
+        for counts in docs:
+            doc_freq.update(t for t in counts if t in self.query_weights)
+        idf = {
+            term: math.log(1 + (n_docs - df + 0.5) / (df + 0.5))
+            for term, df in doc_freq.items()
+        }
+        avg_len = (self.description_len + sum(sum(c.values()) for c in docs)) / n_docs
+        # best is the score of a document that saturates every query term
+        best = sum(w * idf[t] * (K1 + 1) for t, w in self.query_weights.items())
+
+        scores = []
+        for counts in docs:
+            norm = K1 * (1 - B + B * sum(counts.values()) / (avg_len or 1))
+            achieved = sum(
+                w * idf[t] * counts[t] * (K1 + 1) / (counts[t] + norm)
+                for t, w in self.query_weights.items() if counts.get(t)
+            )
+            scores.append(achieved / best if best else 0.0)
+        return scores
+
+    def score(self, text: str) -> float:
+        return self.score_batch([text])[0]
+
+
+_indexes: "OrderedDict[Tuple[str, str], RequisitionIndex]" = OrderedDict()
+_indexes_lock = threading.Lock()
+
+
+def get_index(requisition_id: Optional[str], description: str, max_size: int = 128) -> RequisitionIndex:
+    """Index for a requisition, built once and reused until its text changes."""
+    digest = hashlib.sha1((description or "").encode()).hexdigest()
+    cache_key = (str(requisition_id), digest)
+    with _indexes_lock:
+        index = _indexes.get(cache_key)
+        if index is None:
+            index = _indexes[cache_key] = RequisitionIndex(description)
+            while len(_indexes) > max_size:
+                _indexes.popitem(last=False)
+        else:
+            _indexes.move_to_end(cache_key)
+        return index
+
+
+def plausible_phone(candidate: str) -> bool:
+    """Whether a number looks like a phone rather than a date range or a score.
+
+    Needs 10-15 digits, or 8-15 with a leading +, and is rejected when every
+    digit group is a year ("2019 - 2021", "2015-2019").
+    """
+    groups = _DIGIT_GROUP_RE.findall(candidate or "")
+    digits = sum(len(g) for g in groups)
+    minimum = 8 if candidate.lstrip().startswith("+") else 10
+    if not minimum <= digits <= 15:
+        return False
+    return not all(_YEAR_RE.fullmatch(g) for g in groups)
+
+
+def find_phone(text: str) -> Optional[str]:
+    for match in PHONE_RE.finditer(text or ""):
+        if plausible_phone(match.group(0)):
+            return match.group(0).strip()
+    return None
+
+
+def contact_details(text: str) -> Dict[str, Optional[str]]:
+    """Best-effort name, email and phone for resumes that skip the LLM."""
+    email = EMAIL_RE.search(text or "")
+    name = next((line.strip() for line in (text or "").splitlines() if line.strip()), None)
+    return {
+        "name": name[:100] if name else None,
+        "email": email.group(0) if email else None,
+        "phone": find_phone(text),
+    }
@@ -1,122 +1,378 @@
 from fastapi import Depends, FastAPI, UploadFile, File, Form, Request
 from fastapi.responses import StreamingResponse
-from typing import Any, List, Optional
+from typing import Any, AsyncIterator, Callable, List, Optional
 import asyncio
 import json
 from sqlalchemy.orm import Session
 from datetime import datetime
 import traceback
-from .process_file import parse_resume
+import logging
+from .process_file import extract_resume_text, generate_content
+from .prefilter import contact_details, get_index
+from .candidate_dedup import content_hash, dedup_keys, find_candidate, find_evaluation
 import tempfile
 import os
 import inspect
 from ..models.candidateprofile import CandidateProfile
 from ..models.evaluations import Evaluation
-from ..db.init_db import get_db
+from ..schemas.evaluation import (
+    CandidateProfile as CandidateProfileOut,
+    Evaluation as EvaluationResult,
+    EvaluationOut,
+    MatchAnalysis,
+)
+from ..core.config import settings
+from ..db.init_db import session_scope
+from .persistence import persist_evaluation, persist_evaluations_bulk
+from .outbox import EVALUATION_COMPLETED, enqueue_event
 from ..api.deps import get_current_active_user
-from ..worker.conn import send_email_task
 import uuid
-from sqlalchemy.exc import IntegrityError
+
+logger = logging.getLogger(__name__)
+
+
+def prefilter_rejection(resume_text: str, score: float) -> EvaluationOut:
+    """Evaluation for a resume rejected by the pre-filter, built without the LLM."""
+    contact = contact_details(resume_text)
+    if not contact["email"]:
+        raise ValueError("Resume rejected by pre-filter and no email address found")
+    return EvaluationOut(
+        candidate_profile=CandidateProfileOut(**contact),
+        evaluation=EvaluationResult(
+            match_score=None,
+            is_eligible=False,
+            match_analysis=MatchAnalysis(
+                summary=(
+                    "Automatically rejected: the resume shares too little with the "
+                    f"requisition (pre-filter score {score:.2f} < {settings.PREFILTER_MIN_SCORE:.2f})."
+                ),
+            ),
+        ),
+    )
+
+
+def _requisition_uuid(requisition: Any) -> Any:
+    # convert requisition to UUID if a string was provided
+    if not requisition:
+        return None
+    try:
+        return uuid.UUID(str(requisition))
+    except Exception:
+        # leave as-is; DB driver may accept string UUIDs, but keep safe
+        return requisition
+
+
+def _duplicate_result(candidate: CandidateProfile, evaluation: Evaluation) -> dict:
+    """SSE payload for a resume that was already evaluated for the requisition."""
+    return {
+        "duplicate_of": {"candidate_id": candidate.id, "evaluation_id": evaluation.id},
+        "candidate_profile": {
+            "name": candidate.name,
+            "email": candidate.email,
+            "phone": candidate.phone,
+            "skills": candidate.skills,
+            "experience": candidate.experience,
+            "experienceMonths": candidate.experience_months,
+            "education": candidate.education,
+        },
+        "evaluation": {
+            "match_score": evaluation.match_score,
+            "is_eligible": evaluation.candidate_status,
+            "match_analysis": {
+                "summary": evaluation.summary,
+                "strengths": evaluation.strengths,
+                "weaknesses": evaluation.weaknesses,
+            },
+        },
+    }
+
+
+def _row_values(result_candidate: EvaluationOut, digest: str) -> tuple[dict, dict]:
+    """Column values for the candidate and evaluation rows of a parsed resume."""
+    profile = result_candidate.candidate_profile or CandidateProfileOut()
+    eval_data = result_candidate.evaluation or EvaluationResult()
+    match_analysis = eval_data.match_analysis or MatchAnalysis()
+
+    profile_values = dict(
+        name=profile.name or "Unknown",
+        email=profile.email,
+        phone=profile.phone,
+        skills=profile.skills or [],
+        experience=[e.model_dump() for e in profile.experience or []],
+        experience_months=profile.experienceMonths,
+        education=[e.model_dump() for e in profile.education or []],
+        content_hash=digest,
+        **dedup_keys(profile.email, profile.phone),
+    )
+    evaluation_values = dict(
+        # None when the model gave no verdict; left for a recruiter to decide
+        candidate_status=eval_data.is_eligible,
+        match_score=round(eval_data.match_score) if eval_data.match_score is not None else None,
+        summary=match_analysis.summary,
+        strengths=match_analysis.strengths,
+        weaknesses=match_analysis.weaknesses,
+    )
+    return profile_values, evaluation_values
+
+
+def _queue_result_email(db, job_description: str, profile_values: dict, evaluation_values: dict,
+                        candidate_id: str, evaluation_id: str, requisition_id: Any) -> Optional[str]:
+    """Record the result email in the outbox, inside the evaluation's transaction.
+
+    Nothing is sent while eligibility is unknown; returns the event id or None.
+    """
+    if evaluation_values["candidate_status"] is None:
+        return None
+    position = (job_description or "").split('\n', 1)[0]
+
+    return enqueue_event(db, EVALUATION_COMPLETED, {
+        "to_email": profile_values["email"],
+        "candidate_name": profile_values["name"],
+        "position": position,
+        "is_eligible": evaluation_values["candidate_status"],
+        "candidate_id": candidate_id,
+        "evaluation_id": evaluation_id,
+        "requisition_id": str(requisition_id) if requisition_id else None,
+    })
+
+
+def _find_duplicate(db, digest: str, resume_text: str, requisition_id: Any) -> tuple[Any, Optional[dict]]:
+    """Known candidate id for a resume, and its earlier result if it was
+    already evaluated for the requisition (then nothing is scored, stored or
+    emailed)."""
+    contact = contact_details(resume_text)
+    candidate = find_candidate(db, digest, contact["email"], contact["phone"])
+    if candidate is None:
+        return None, None
+    previous = find_evaluation(db, candidate.id, requisition_id)
+    if previous is not None:
+        return candidate.id, _duplicate_result(candidate, previous)
+    return candidate.id, None
 
 
 async def process_evaluation_job(
-    file_path: str,
+    index: int,
+    resume_text: str,
+    job_description: str,
+    requisition: Any = None,
+    on_progress: Optional[Callable[[dict], None]] = None,
+    prefilter_score: Optional[float] = None
+) -> dict:
+    """Score one resume; nothing is stored here, see ``persist_parsed_resumes``.
+
+    Returns ``{"index", "duplicate"}`` for a resume already evaluated for the
+    requisition, else a parsed entry ``{"index", "result_candidate",
+    "digest", "candidate_id"}``.
+    """
+    requisition_id = _requisition_uuid(requisition)
+    digest = content_hash(resume_text)
+
+    with session_scope() as db:
+        candidate_id, duplicate = _find_duplicate(db, digest, resume_text, requisition_id)
+    if duplicate is not None:
+        return {"index": index, "duplicate": duplicate}
+
+    # no session is held while the model works
+    if (
+        settings.PREFILTER_MODE == "reject"
+        and prefilter_score is not None
+        and prefilter_score < settings.PREFILTER_MIN_SCORE
+    ):
+        result_candidate = prefilter_rejection(resume_text, prefilter_score)
+    else:
+        # the LLM call blocks (and may queue for key budget), keep it off the loop
+        result_candidate = await asyncio.to_thread(
+            generate_content, resume_text, job_description, on_progress=on_progress)
+
+    print("Parsed candidate data:", result_candidate)
+    return {"index": index, "result_candidate": result_candidate, "digest": digest, "candidate_id": candidate_id}
+
+
+def _store_parsed(db, parsed: List[dict], job_description: str, current_user: Any,
+                  requisition_id: Any) -> dict:
+    """Write parsed resumes with the caller's session; see ``persist_parsed_resumes``."""
+    outcomes: dict = {}
+    pending = parsed
+    while pending:
+        stored, deferred, claimed = [], [], set()
+        for entry in pending:
+            profile_values, evaluation_values = _row_values(entry["result_candidate"], entry["digest"])
+            evaluation_values["requisition_id"] = requisition_id
+
+            candidate_id = entry.get("candidate_id")
+            if candidate_id is None:
+                match = find_candidate(
+                    db, entry["digest"], profile_values["email"], profile_values["phone"])
+                candidate_id = match.id if match else None
+            if candidate_id is not None:
+                previous = find_evaluation(db, candidate_id, requisition_id)
+                ids = persist_evaluation(
+                    db, profile_values, evaluation_values,
+                    candidate_id=candidate_id,
+                    evaluation_id=previous.id if previous else None,
+                    evaluated_by_id=current_user,
+                )
+                stored.append((entry, profile_values, evaluation_values, ids))
+                continue
+
+            person = (
+                profile_values["email_normalized"]
+                or profile_values["phone_normalized"]
+                or entry["digest"]
+            )
+            if person in claimed:
+                deferred.append(entry)
+                continue
+            claimed.add(person)
+            stored.append((entry, profile_values, evaluation_values, None))
+
+        new_rows = [(p, e) for _, p, e, ids in stored if ids is None]
+        new_ids = iter(persist_evaluations_bulk(
+            db, new_rows, evaluated_by_id=current_user) if new_rows else [])
+        for entry, profile_values, evaluation_values, ids in stored:
+            candidate_id, evaluation_id, created = ids if ids is not None else (*next(new_ids), True)
+            # the email is committed with the evaluation; the outbox relay sends it
+            event_id = _queue_result_email(
+                db, job_description, profile_values, evaluation_values,
+                candidate_id, evaluation_id, requisition_id) if created else None
+            outcomes[entry["index"]] = (entry["result_candidate"].model_dump(mode="json"), event_id)
+        pending = deferred
+    return outcomes
+
+
+def persist_parsed_resumes(
+    parsed: List[dict],
     job_description: str,
     current_user: Any = None,
     requisition: Any = None
-):
+) -> dict:
+    """Store a batch of parsed resumes in one transaction.
+
+    New candidates go in with one multi-row INSERT per table; known ones are
+    refreshed from the newest resume, and an existing evaluation for the
+    requisition is updated without a second email. A resume of someone first
+    seen earlier in the same batch is stored in a second pass, once that
+    person's row exists.
+
+    A resume without an email address is rejected on its own, and if the
+    batch still fails every resume is retried in its own transaction, so one
+    bad row never costs its neighbours their (already paid for) results.
+    Returns ``{index: (result, outbox_event_id) | Exception}``.
+    """
+    requisition_id = _requisition_uuid(requisition)
+    outcomes: dict = {}
+    valid = []
+    for entry in parsed:
+        profile = entry["result_candidate"].candidate_profile
+        if profile is None or not profile.email:
+            outcomes[entry["index"]] = ValueError("No email address found in the resume")
+        else:
+            valid.append(entry)
 
-    db = next(get_db())
+    try:
+        with session_scope() as db:
+            outcomes.update(_store_parsed(db, valid, job_description, current_user, requisition_id))
+        return outcomes
+    except Exception as err:
+        if len(valid) == 1:
+            logger.warning("Storing evaluation %s failed: %s", valid[0]["index"], err)
+            outcomes[valid[0]["index"]] = err
+            return outcomes
+        logger.warning("Storing %s evaluations together failed, retrying one by one",
+                       len(valid), exc_info=True)
+
+    for entry in valid:
+        try:
+            with session_scope() as db:
+                outcomes.update(_store_parsed(db, [entry], job_description, current_user, requisition_id))
+        except Exception as err:
+            logger.warning("Storing evaluation %s failed: %s", entry["index"], err)
+            outcomes[entry["index"]] = err
+    return outcomes
 
-    result_candidate = parse_resume(file_path, job_description)
 
-    print("Parsed candidate data:", result_candidate)
+async def process_prefilter_rejections(
+    entries: List[dict],
+    job_description: str,
+    current_user: Any = None,
+    requisition: Any = None
+) -> dict:
+    """Store a batch of pre-filter rejections with one INSERT per table.
 
-    result = result_candidate.get("candidate_profile", {})
-    eval_data = result_candidate.get("evaluation", {})
-    
-    
-    new = CandidateProfile(
-        name=result.get("name", "Unknown"),  # type: ignore
-        email=result.get("email"),  # type: ignore
-        phone=result.get("phone"),  # type: ignore
-        skills=result.get("skills", []),  # type: ignore
-        experience=result.get("experience", []),  # type: ignore
-        experience_months=result.get("experienceMonths"),   # type: ignore
-        education=result.get("education", []),  # type: ignore
-        evaluated_by_id=current_user
-    )
+    Returns ``{index: (result, outbox_event_id) | Exception}``.
+    """
+    requisition_id = _requisition_uuid(requisition)
+    outcomes: dict = {}
+    parsed = []
 
-    db.add(new)
-    db.commit()
-    db.refresh(new)
+    with session_scope() as db:
+        for entry in entries:
+            try:
+                result_candidate = prefilter_rejection(entry["text"], entry["score"])
+            except ValueError as err:
+                outcomes[entry["index"]] = err
+                continue
+            digest = content_hash(entry["text"])
+            candidate_id, duplicate = _find_duplicate(db, digest, entry["text"], requisition_id)
+            if duplicate is not None:
+                outcomes[entry["index"]] = (duplicate, None)
+                continue
+            parsed.append({
+                "index": entry["index"],
+                "result_candidate": result_candidate,
+                "digest": digest,
+                "candidate_id": candidate_id,
+            })
+
+    if parsed:
+        outcomes.update(await asyncio.to_thread(
+            persist_parsed_resumes, parsed, job_description, current_user, requisition))
+    return outcomes
+
+
+async def _extract_resumes(files: List[UploadFile]) -> AsyncIterator[dict]:
+    """Extract each resume's text, yielding every entry as soon as it is ready."""
+    for i, file in enumerate(files):
+        original_name = file.filename
+        entry = {"index": i, "filename": original_name, "text": None, "score": None, "error": None}
+        try:
+            # Read file content
+            content = await file.read()
 
-    # defensively read nested fields
-    match_analysis = eval_data.get("match_analysis") or {} # type: ignore 
-    summary = match_analysis.get("summary") if isinstance(
-        match_analysis, dict) else None
-    strengths = match_analysis.get("strengths") if isinstance(
-        match_analysis, dict) else None
-    weaknesses = match_analysis.get("weaknesses") if isinstance(
-        match_analysis, dict) else None
+            # Save to system temp directory in a cross-platform safe way
+            tmp_dir = tempfile.gettempdir()
+            safe_name = os.path.basename(original_name or "uploaded_file")
+            name, ext = os.path.splitext(safe_name)
+            with tempfile.NamedTemporaryFile(delete=False, prefix="eval_", suffix=ext, dir=tmp_dir) as tmpf:
+                tmpf.write(content)
+                temp_path = tmpf.name
 
-    # convert requisition to UUID if a string was provided
-    requisition_id = None
-    if requisition:
-        try:
-            requisition_id = uuid.UUID(str(requisition))
-        except Exception:
-            # leave as-is; DB driver may accept string UUIDs, but keep safe
-            requisition_id = requisition
-
-    # create evaluation using relationship so SQLAlchemy keeps both sides in sync
-    new_eval = Evaluation(
-        candidate=new,
-        candidate_status=eval_data.get("is_eligible"),  # type: ignore
-        match_score=eval_data.get("match_score"),  # type: ignore
-        summary=summary,  # type: ignore
-        strengths=strengths,  # type: ignore
-        weaknesses=weaknesses,  # type: ignore
-        requisition_id=requisition_id,
-    )
+            try:
+                entry["text"] = await asyncio.to_thread(extract_resume_text, temp_path)
+            finally:
+                # Clean up temp file
+                try:
+                    os.remove(temp_path)
+                except Exception:
+                    pass
+        except Exception as err:
+            entry["error"] = str(err)
+        yield entry
 
-    try:
-        db.add(new_eval)
-        db.commit()
-        db.refresh(new_eval)
-        # also refresh candidate so relationship is populated
-        db.refresh(new)
-    except IntegrityError:
-        db.rollback()
-        raise
-    except Exception:
-        db.rollback()
-        raise
 
-    position = (job_description or "").split('\n', 1)[0]
+def _score_batch(screened: List[dict], job_description: str, requisition: Any = None) -> None:
+    """Score the extracted resumes against the requisition, as one corpus."""
+    if settings.PREFILTER_MODE == "off":
+        return
+    extracted = [e for e in screened if not e["error"]]
+    scores = get_index(requisition, job_description).score_batch([e["text"] for e in extracted])
+    for entry, score in zip(extracted, scores):
+        entry["score"] = score
 
-    task = send_email_task.delay(
-        to_email=new.email,
-        candidate_name=new.name,
-        position=position,
-        is_eligible=eval_data.get("is_eligible"), # type: ignore
-        candidate_id=new.id,
-        evaluation_id=new_eval.id,
-        requisition_id=requisition_id
-        
-    )
-    
-    # send_email_task(
-    #     to_email=new.email, # type: ignore
-    #     candidate_name=new.name, # type: ignore
-    #     position=position,
-    #     is_eligible=eval_data.get("is_eligible"), # type: ignore
-    #     candidate_id=new.id,# type: ignore
-    #     evaluation_id=new_eval.id,# type: ignore
-    #     requisition_id=requisition_id# type: ignore
-    # )
 
-    return result_candidate, task.id
+def _sse(event: str, data: Any) -> str:
+    # one chunk per event, so it is written (and compressed) as a unit
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
 
 
 async def event_stream_generator(
@@ -127,58 +383,126 @@ async def event_stream_generator(
     requisition: Any = None
 ):
     """
-    Generator that processes files and yields SSE events
+    Generator that processes files and yields SSE events.
+
+    Resumes are first scored locally against the requisition. Depending on
+    PREFILTER_MODE, low scorers are sent to the LLM last ("deprioritize") or
+    rejected without an LLM call ("reject"). Scored resumes are stored in
+    batches of EVALUATION_PERSIST_BATCH_SIZE, each in one transaction.
     """
     results = []
 
     try:
-        for i, file in enumerate(files):
+        screened = []
+        async for entry in _extract_resumes(files):
+            screened.append(entry)
+            yield _sse("progress", {'index': entry['index'], 'status': 'extracted', 'error': entry['error']})
+            if await request.is_disconnected():
+                print("Client disconnected, stopping processing")
+                return
+
+        # scores need the whole batch: it is the corpus the IDF comes from
+        _score_batch(screened, job_description, requisition)
+        for entry in screened:
+            yield _sse("progress", {'index': entry['index'], 'status': 'prescreened', 'prefilter_score': entry['score']})
+
+        if settings.PREFILTER_MODE in ("deprioritize", "reject"):
+            # best matches first; failed extractions keep their place at the end
+            screened.sort(key=lambda e: -(e["score"] if e["score"] is not None else -1))
+
+        if settings.PREFILTER_MODE == "reject":
+            # rejections need no LLM call, so store them all in one transaction
+            rejected = [
+                e for e in screened
+                if not e["error"] and e["score"] is not None and e["score"] < settings.PREFILTER_MIN_SCORE
+            ]
+            rejected_ids = {e["index"] for e in rejected}
+            screened = [e for e in screened if e["index"] not in rejected_ids]
+            outcomes = await process_prefilter_rejections(
+                rejected, job_description, current_user, requisition) if rejected else {}
+            for entry in rejected:
+                outcome = outcomes[entry["index"]]
+                if isinstance(outcome, Exception):
+                    screened.append({**entry, "error": str(outcome)})
+                    continue
+                results.append({"result": outcome})
+                yield _sse("result", {'index': entry['index'], 'status': 'completed', 'result': outcome})
+
+        # parsed resumes wait here and are stored EVALUATION_PERSIST_BATCH_SIZE at a time
+        batch: List[dict] = []
+
+        async def store_batch() -> List[str]:
+            events = []
+            try:
+                outcomes = await asyncio.to_thread(
+                    persist_parsed_resumes, list(batch), job_description, current_user, requisition)
+            except Exception as err:
+                print(f"Error storing evaluations: {err}")
+                traceback.print_exc()
+                events = [
+                    _sse("error", {'index': entry['index'], 'status': 'failed', 'error': str(err)})
+                    for entry in batch
+                ]
+            else:
+                for entry in batch:
+                    result = outcomes[entry["index"]]
+                    if isinstance(result, Exception):
+                        events.append(_sse("error", {'index': entry['index'], 'status': 'failed', 'error': str(result)}))
+                        continue
+                    results.append({"result": result})
+                    events.append(_sse("result", {'index': entry['index'], 'status': 'completed', 'result': result}))
+            batch.clear()
+            return events
+
+        for entry in screened:
+            i = entry["index"]
+            original_name = entry["filename"]
+
             # Check if client disconnected
             if await request.is_disconnected():
                 print("Client disconnected, stopping processing")
                 break
 
-            original_name = file.filename
-
             # Send progress event
-            yield f"event: progress\n"
-            yield f"data: {json.dumps({'index': i, 'status': 'started'})}\n\n"
+            yield _sse("progress", {'index': i, 'status': 'started'})
 
             try:
-                # Read file content
-                content = await file.read()
-
-                # Save to system temp directory in a cross-platform safe way
-
-                tmp_dir = tempfile.gettempdir()
-
-                safe_name = os.path.basename(original_name or "uploaded_file")
-
-                name, ext = os.path.splitext(safe_name)
-                with tempfile.NamedTemporaryFile(delete=False, prefix="eval_", suffix=ext, dir=tmp_dir) as tmpf:
-                    tmpf.write(content)
-                    temp_path = tmpf.name
-
-                try:
-                    # Process the file
-                    result = await process_evaluation_job(
-                        file_path=temp_path,
-                        job_description=job_description,
-                        current_user=current_user,
-                        requisition=requisition
-                    )
-
+                if entry["error"]:
+                    raise RuntimeError(entry["error"])
+
+                # Process the resume, relaying queue updates while it waits
+                progress: asyncio.Queue = asyncio.Queue()
+                loop = asyncio.get_running_loop()
+
+                def on_progress(event: dict, index=i):
+                    loop.call_soon_threadsafe(
+                        progress.put_nowait, {"index": index, **event})
+
+                job = asyncio.create_task(process_evaluation_job(
+                    index=i,
+                    resume_text=entry["text"],
+                    job_description=job_description,
+                    requisition=requisition,
+                    on_progress=on_progress,
+                    prefilter_score=entry["score"]
+                ))
+                while not job.done() or not progress.empty():
+                    getter = asyncio.ensure_future(progress.get())
+                    await asyncio.wait({job, getter}, return_when=asyncio.FIRST_COMPLETED)
+                    if not getter.done():
+                        getter.cancel()
+                        continue
+                    yield _sse("progress", getter.result())
+                parsed = job.result()
+
+                if "duplicate" in parsed:
+                    result = (parsed["duplicate"], None)
                     results.append({"result": result})
-                finally:
-                    # Clean up temp file
-                    try:
-                        os.remove(temp_path)
-                    except Exception:
-                        pass
+                    yield _sse("result", {'index': i, 'status': 'completed', 'result': result})
+                    continue
 
-                # Send result event
-                yield f"event: result\n"
-                yield f"data: {json.dumps({'index': i, 'status': 'completed', 'result': result})}\n\n"
+                batch.append(parsed)
+                yield _sse("progress", {'index': i, 'status': 'parsed'})
 
             except Exception as err:
                 error_msg = str(err)
@@ -186,16 +510,23 @@ async def event_stream_generator(
                 traceback.print_exc()
 
                 # Send error event
-                yield f"event: error\n"
-                yield f"data: {json.dumps({'index': i, 'status': 'failed', 'error': error_msg})}\n\n"
+                yield _sse("error", {'index': i, 'status': 'failed', 'error': error_msg})
+                continue
+
+            if len(batch) >= settings.EVALUATION_PERSIST_BATCH_SIZE:
+                for event in await store_batch():
+                    yield event
+
+        # also after a disconnect: the model calls are paid for already
+        if batch:
+            for event in await store_batch():
+                yield event
 
         # Send done event
-        yield f"event: done\n"
-        yield f"data: {json.dumps({'count': len(results), 'results': results})}\n\n"
+        yield _sse("done", {'count': len(results), 'results': results})
 
         # Send close event
-        yield f"event: close\n"
-        yield f"data: {{}}\n\n"
+        yield _sse("close", {})
 
     except asyncio.CancelledError:
         print("Stream cancelled by client")
@@ -203,5 +534,4 @@ async def event_stream_generator(
     except Exception as e:
         print(f"Unexpected error in event stream: {str(e)}")
         traceback.print_exc()
-        yield f"event: error\n"
-        yield f"data: {json.dumps({'error': str(e)})}\n\n"
+        yield _sse("error", {'error': str(e)})
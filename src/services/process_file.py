@@ -1,92 +1,226 @@
 import re
 import json
+import logging
 import os
-from typing import Any, Optional
-from pdfminer.high_level import extract_text
+from typing import Any, Dict, List, Optional
+from pydantic import ValidationError
+from src.core import providers
+from src.core.config import settings
 from src.schemas.evaluation import EvaluationOut
-from openai import OpenAI
 from .read_prompt import read_prompt
 from dotenv import load_dotenv
-from src.utils.keymanager import KeyManager
+from .llm_router import llm_router
 
 load_dotenv()
 
-# single KeyManager instance used for rotation
-key_manager = KeyManager()
+logger = logging.getLogger(__name__)
 
 
-def generate_content(text: str, job_description: str, retries: int = 3):
-    """Generate structured content for a resume using an LLM with key rotation and retries.
+class PartialFieldExtractor:
+    """Pick completed scalar fields out of a JSON answer that is still streaming.
 
-    - Uses `KeyManager` to rotate API keys on failures (401/429/5xx or exceptions).
-    - Preserves the previous behavior of extracting a JSON block from the model response.
+    Chunks are scanned as they arrive, together with the tail of what came
+    before (a field may straddle two chunks), so the cost per chunk does not
+    grow with the answer. Each field is reported once.
     """
-    SYSTEM_PROMPT = read_prompt(job_description)
 
-    last_exc: Optional[Exception] = None
-    for attempt in range(retries):
-        key = key_manager.get_active_key()
-        print(
-            f"🗝️ Using API key: {key[:8]}... (Attempt {attempt + 1}/{retries})")
-        client = OpenAI(
-            base_url="https://openrouter.ai/api/v1",
-            api_key=key,
-        )
+    PATTERNS = {
+        "name": re.compile(r'"name"\s*:\s*"((?:[^"\\]|\\.)*)"'),
+        "email": re.compile(r'"email"\s*:\s*"((?:[^"\\]|\\.)*)"'),
+        "match_score": re.compile(r'"match_score"\s*:\s*(-?\d+(?:\.\d+)?)\s*[,}\n]'),
+        "is_eligible": re.compile(r'"is_eligible"\s*:\s*(true|false)\b'),
+    }
+    # longest key-and-value that can still be completed by a later chunk
+    LOOKBACK = 512
+
+    def __init__(self):
+        self.found: Dict[str, Any] = {}
+        self._tail = ""
+
+    def feed(self, chunk: str) -> Dict[str, Any]:
+        """Return fields that became available with ``chunk``."""
+        if len(self.found) == len(self.PATTERNS):
+            return {}
+        window = self._tail + chunk
+        self._tail = window[-self.LOOKBACK:]
+        new: Dict[str, Any] = {}
+        for field, pattern in self.PATTERNS.items():
+            if field in self.found:
+                continue
+            match = pattern.search(window)
+            if not match:
+                continue
+            raw = match.group(1)
+            if field == "match_score":
+                value: Any = float(raw)
+            elif field == "is_eligible":
+                value = raw == "true"
+            else:
+                try:
+                    value = json.loads(f'"{raw}"')
+                except json.JSONDecodeError:
+                    value = raw
+            self.found[field] = new[field] = value
+        return new
+
+
+def _extract_json(response_text: str) -> Optional[Any]:
+    """Parse a JSON answer, tolerating a markdown ```json fence."""
+    try:
+        return json.loads(response_text)
+    except json.JSONDecodeError:
+        json_match = re.search(
+            r'```json\s*([\s\S]*?)\s*```', response_text)
+        if not json_match:
+            return None
+        try:
+            return json.loads(json_match.group(1))
+        except json.JSONDecodeError:
+            return None
+
 
+def _set_path(data: Any, loc: tuple, value: Any) -> None:
+    """Assign ``value`` at a pydantic error location inside nested dicts/lists."""
+    target = data
+    for part in loc[:-1]:
         try:
-            completion = client.chat.completions.create(
-                model="openai/gpt-oss-20b:free",
-                messages=[
-                    {"role": "system", "content": SYSTEM_PROMPT},
-                    {"role": "user", "content": [
-                        {"type": "text", "text": text}]},
-                ],
-            )
+            target = target[part]
+        except (KeyError, IndexError, TypeError):
+            return
+    try:
+        target[loc[-1]] = value
+    except (IndexError, TypeError):
+        pass
 
-            response_text = completion.choices[0].message.content or ""
 
+def _drop_invalid(data: Any, errors: List[Dict[str, Any]]) -> None:
+    """Discard what failed validation so the rest of the answer survives.
+
+    An invalid list item is removed (``None`` would be just as invalid in a
+    list); any other field is set to ``None``, which every ``EvaluationOut``
+    field accepts.
+    """
+    removals: Dict[int, tuple] = {}  # id(list) -> (list, {indices})
+    for error in errors:
+        loc = tuple(error["loc"])
+        parent = data
+        for part in loc[:-1]:
             try:
-                return json.loads(response_text)
-            except json.JSONDecodeError:
-                json_match = re.search(
-                    r'```json\s*([\s\S]*?)\s*```', response_text)
-
-                final_response = (
-                    json.loads(json_match.group(1))
-                    if json_match
-                    else {"error": "No valid JSON response found", "raw": response_text}
-                )
-
-                return final_response
-
-        except Exception as e:
-            # Try to inspect attribute-based status where available
-            last_exc = e
-            status_code = None
-            try:
-                # Some OpenAI clients include a .status_code or .http_status
-                status_code = getattr(e, "status_code", None) or getattr(
-                    e, "http_status", None)
-            except Exception:
-                status_code = None
-
-            if status_code == 401:
-                key_manager.mark_key_as_failed(key)
-                continue
+                parent = parent[part]
+            except (KeyError, IndexError, TypeError):
+                parent = None
+                break
+        if isinstance(parent, list) and isinstance(loc[-1], int):
+            removals.setdefault(id(parent), (parent, set()))[1].add(loc[-1])
+        else:
+            _set_path(data, loc, None)
+    # delete from the back so earlier indices stay valid
+    for items, indices in removals.values():
+        for index in sorted(indices, reverse=True):
+            if index < len(items):
+                del items[index]
+
+
+def _reask_invalid_fields(text: str, system_prompt: str,
+                          errors: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Ask the model again for just the fields that failed validation.
+
+    Returns ``{"dotted.path": value}`` for the fields the model fixed.
+    """
+    problems = "\n".join(
+        f"- {'.'.join(str(p) for p in e['loc'])}: {e['msg']} (got {json.dumps(e.get('input'), default=str)[:200]})"
+        for e in errors
+    )
+    user_text = (
+        f"{text}\n\n---\n"
+        "Your previous answer for this resume had invalid fields:\n"
+        f"{problems}\n\n"
+        "Return a JSON object whose keys are exactly these dotted paths and whose "
+        "values are the corrected values. Do not return any other fields."
+    )
+    response_text = llm_router.complete(
+        system_prompt, user_text, providers=settings.LLM_RESUME_PROVIDERS,
+        retries=1, json_mode=True)
+    fixes = _extract_json(response_text)
+    return fixes if isinstance(fixes, dict) else {}
+
+
+def generate_content(text: str, job_description: str, retries: int = 3, on_progress=None) -> EvaluationOut:
+    """Generate a validated `EvaluationOut` for a resume using an LLM.
+
+    - Routing, key rotation, hedging and retries are handled by `llm_router`.
+    - `on_progress` is called with queue updates while waiting for key budget,
+      and with candidate fields (name, email, score) as soon as the streamed
+      answer contains them.
+    - The answer is requested in JSON mode and validated in one pass; fields
+      that fail validation are re-asked on their own instead of repeating the
+      whole call, and anything still invalid is dropped.
+    """
+    SYSTEM_PROMPT = read_prompt(job_description)
 
-            if status_code in (429,) or (status_code and 500 <= int(status_code) < 600):
-                key_manager.mark_key_as_failed(key)
-                continue
+    def on_wait(info):
+        if on_progress is not None:
+            on_progress({"status": "queued", **info})
+
+    def new_stream():
+        # one extractor per attempt, so fields from a failed attempt don't
+        # suppress the ones the retry produces
+        extractor = PartialFieldExtractor()
+
+        def on_delta(chunk: str):
+            fields = extractor.feed(chunk)
+            if fields:
+                on_progress({"status": "partial", **fields})
+
+        return on_delta
+
+    response_text = llm_router.complete(
+        SYSTEM_PROMPT, text, providers=settings.LLM_RESUME_PROVIDERS,
+        retries=retries, on_wait=on_wait, json_mode=True,
+        on_stream=new_stream if on_progress is not None else None)
+
+    # fast path: well-formed answer, parsed and validated by pydantic-core
+    try:
+        return EvaluationOut.model_validate_json(response_text)
+    except ValidationError:
+        pass
+
+    data = _extract_json(response_text)
+    if not isinstance(data, dict):
+        raise ValueError(f"No valid JSON response found: {response_text[:200]}")
+
+    for attempt in range(settings.LLM_REASK_ATTEMPTS + 1):
+        try:
+            return EvaluationOut.model_validate(data)
+        except ValidationError as exc:
+            errors = exc.errors()
+        if attempt == settings.LLM_REASK_ATTEMPTS:
+            break
+        try:
+            fixes = _reask_invalid_fields(text, SYSTEM_PROMPT, errors)
+        except Exception as exc:
+            logger.warning("Re-ask for invalid fields failed: %s", exc)
+            break
+        for path, value in fixes.items():
+            loc = tuple(int(p) if p.isdigit() else p for p in str(path).split("."))
+            _set_path(data, loc, value)
+
+    # last resort: drop whatever is still invalid; a second pass catches
+    # sections that only became invalid once their contents were pruned
+    for _ in range(2):
+        _drop_invalid(data, errors)
+        try:
+            return EvaluationOut.model_validate(data)
+        except ValidationError as exc:
+            errors = exc.errors()
+    raise ValueError(f"Model answer could not be repaired: {errors[:3]}")
 
-            # If we cannot determine a status code, conservatively mark the key failed for network/other errors
-            key_manager.mark_key_as_failed(key)
-            continue
 
-    # If we exit the loop without returning, all retries failed
-    raise RuntimeError("🚨 All API keys failed after retries.") from last_exc
+def extract_resume_text(file_path: str) -> str:
+    return providers.get("pdfminer")(file_path)
 
 
-def parse_resume(file_path: str, job_description: str):
-    text = extract_text(file_path)
-    result = generate_content(text, job_description)
+def parse_resume(file_path: str, job_description: str, on_progress=None) -> EvaluationOut:
+    text = extract_resume_text(file_path)
+    result = generate_content(text, job_description, on_progress=on_progress)
     return result
@@ -1,33 +1,26 @@
 import json
+import logging
 import re
-from typing import Any, Dict
-from google import genai  # type: ignore
-from google.genai import types
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional
+from src.core.config import settings
+from .llm_router import llm_router
+from .transcript import compact_transcript, interview_statistics, render_dialogue, split_segments, reduce_analyses
 
-genai_client = genai.Client()
+logger = logging.getLogger(__name__)
 
-
-def analyze_transcript_content(transcript_data: Dict) -> Dict[str, Any]:
-    """
-    Analyze the transcript content to extract key insights about the interview.
-    """
-
-    # Prepare the request structure for the model
-    model_request = {
-        "model": "gemini-2.0-flash",
-        "config": types.GenerateContentConfig(
-            system_instruction="""
+SYSTEM_INSTRUCTION = """
                 You are a highly skilled AI recruitment analyst trained in behavioral psychology, technical evaluation, and fair-hiring practices.
-Your task is to analyze a structured interview transcript provided in JSON format and generate an objective, bias-free, and role-aligned hiring report in JSON format.
+Your task is to analyze an interview transcript provided as speaker-labelled dialogue and generate an objective, bias-free, and role-aligned hiring report in JSON format.
 Use best practices in recruitment to evaluate the candidate’s communication, domain expertise, confidence, problem-solving ability, soft skills, and technical depth.
 Do not penalize for language fluency or grammar if the candidate demonstrates strong technical understanding or clear problem-solving ability.
 
-🔍 Input JSON Format:
-{
-  "items": [ 
-    { "id": "...", "type": "message", "role": "assistant" | "user", "content": ["..."], "interrupted": true | false } 
-  ]
-}
+🔍 Input Format:
+One dialogue turn per line, prefixed with the speaker:
+interviewer: <question or remark>
+candidate: <answer>
+Question counts, talk ratio and duration are computed separately; do not estimate them.
 📤 Output JSON Format:
 {
   "candidateOverview": {
@@ -40,10 +33,6 @@ Do not penalize for language fluency or grammar if the candidate demonstrates st
     "culturalFit": ""
   },
   "interviewStatistics": {
-    "totalQuestionsAsked": 0,
-    "totalCandidateResponses": 0,
-    "estimatedDurationMinutes": 0,
-    "candidateTalkRatioPercent": 0,
     "technicalToBehavioralRatio": "",
     "keywordsMentioned": [],
     "positiveIndicators": [],
@@ -93,25 +82,25 @@ Do not penalize for language fluency or grammar if the candidate demonstrates st
   }
 }
             
-            """
-        ),
-        "contents": json.dumps(transcript_data),
-    }
+"""
 
-    # Send the request to the model
-    model_response = genai_client.models.generate_content(**model_request)
+
+def _analyze_dialogue(dialogue: str) -> Dict[str, Any]:
+    """Send one block of compacted dialogue to the model and parse its JSON."""
+    response_text = llm_router.complete(
+        SYSTEM_INSTRUCTION, dialogue, providers=settings.LLM_TRANSCRIPT_PROVIDERS)
 
     try:
 
         cleaned_response = re.sub(
-            r"```(?:json)?(.*?)```", r"\1", model_response.text.strip(), flags=re.DOTALL) # type: ignore
+            r"```(?:json)?(.*?)```", r"\1", response_text.strip(), flags=re.DOTALL) # type: ignore
         # model_response may include markdown fences; remove them and parse JSON
         parsed_data = json.loads(cleaned_response)
 
     except Exception as e:
         return {
             "error": f"Failed to parse model response as JSON: {e}",
-            "raw_response": model_response.text.strip() # type: ignore
+            "raw_response": response_text.strip() # type: ignore
         }
 
     if not parsed_data:
@@ -119,8 +108,103 @@ Do not penalize for language fluency or grammar if the candidate demonstrates st
             "error": "No analysis data returned from the model."
         }
 
+    return {"analysis": parsed_data}
+
+
+_segment_pool: Optional[ThreadPoolExecutor] = None
+_segment_pool_lock = threading.Lock()
+
+
+def _get_segment_pool() -> ThreadPoolExecutor:
+    """One pool for every job, so concurrent analyses share the LLM call cap."""
+    global _segment_pool
+    with _segment_pool_lock:
+        if _segment_pool is None:
+            _segment_pool = ThreadPoolExecutor(
+                max_workers=max(1, settings.TRANSCRIPT_ANALYSIS_PARALLELISM),
+                thread_name_prefix="transcript-segment",
+            )
+        return _segment_pool
+
+
+def _analyze_segments(turns: List[Dict[str, str]], segments: List[List[Dict[str, str]]]) -> Dict[str, Any]:
+    """Map: analyse overlapping segments concurrently. Reduce: merge into one report.
+
+    Windows whose analysis failed are listed in ``missing_windows`` (as turn
+    ranges) and the result is marked ``partial``.
+    """
+    pool = _get_segment_pool()
+    futures = [pool.submit(_analyze_dialogue, render_dialogue(seg)) for seg in segments]
+    results = []
+    for future in futures:
+        try:
+            results.append(future.result())
+        except Exception as exc:
+            # one failed window should not sink the whole report
+            results.append({"error": str(exc)})
+
+    # segments are slices of ``turns``, so their dicts are the same objects
+    position = {id(turn): i for i, turn in enumerate(turns)}
+    partials = []
+    weights = []
+    missing = []
+    for segment, result in zip(segments, results):
+        if "error" in result or not isinstance(result.get("analysis"), dict):
+            missing.append({
+                "startTurn": position[id(segment[0])],
+                "endTurn": position[id(segment[-1])],
+                "error": result.get("error", "No analysis data returned from the model."),
+            })
+            continue
+        partials.append(result["analysis"])
+        # segments where the candidate spoke more carry more weight
+        weights.append(sum(len(t["text"].split()) for t in segment if t["role"] == "candidate") or 1)
+
+    if not partials:
+        return next((r for r in results if "error" in r), {"error": "No analysis data returned from the model."})
+    analysis = reduce_analyses(partials, weights)
+    if missing:
+        logger.warning("Transcript analysis missing %d of %d windows", len(missing), len(segments))
+        analysis["partial"] = True
+        analysis["missingWindows"] = missing
+    return {"analysis": analysis}
+
+
+def analyze_transcript_content(transcript_data: Dict) -> Dict[str, Any]:
+    """
+    Analyze the transcript content to extract key insights about the interview.
+
+    The raw transcript is compacted to speaker turns before it is sent, and the
+    deterministic ``interviewStatistics`` fields are computed locally. Long
+    dialogues are split into overlapping segments analysed in parallel.
+    """
+    turns = compact_transcript(transcript_data)
+    if not turns:
+        return {"error": "Transcript contains no dialogue."}
+
+    segments = split_segments(
+        turns,
+        settings.TRANSCRIPT_SEGMENT_WORDS,
+        settings.TRANSCRIPT_SEGMENT_OVERLAP_TURNS,
+    )
+    if len(segments) > 1:
+        result = _analyze_segments(turns, segments)
+    else:
+        result = _analyze_dialogue(render_dialogue(turns))
+    if "error" in result:
+        return result
+    parsed_data = result["analysis"]
+
+    if isinstance(parsed_data, dict):
+        statistics = parsed_data.get("interviewStatistics")
+        if not isinstance(statistics, dict):
+            statistics = {}
+        statistics.update(interview_statistics(transcript_data, turns))
+        parsed_data["interviewStatistics"] = statistics
+
     return {
-        "room_name": transcript_data.get("room_name"),
+        "room_name": transcript_data.get("room_name") if isinstance(transcript_data, dict) else None,
         "analysis": parsed_data,
+        "partial": bool(isinstance(parsed_data, dict) and parsed_data.get("partial")),
         "status": "completed"
     }
\ No newline at end of file
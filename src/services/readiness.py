@@ -0,0 +1,78 @@
+import logging
+import time
+from typing import Any, Dict
+from sqlalchemy import text
+from src.core import providers
+from src.core.config import settings
+from src.db.init_db import engine
+
+logger = logging.getLogger(__name__)
+
+
+def _check_database() -> Dict[str, Any]:
+    with engine.connect() as conn:
+        conn.execute(text("SELECT 1"))
+    return {"ok": True}
+
+
+def _ping_redis(url: str) -> None:
+    import redis  # deferred: keeps the client off the import path
+
+    redis.Redis.from_url(url, socket_timeout=0.5).ping()
+
+
+def _check_redis() -> Dict[str, Any]:
+    # Celery broker, outbox relay and analysis fan-out; required
+    _ping_redis(settings.REDIS_URL)
+    return {"ok": True}
+
+
+def _check_key_health_redis() -> Dict[str, Any]:
+    if not settings.KEY_HEALTH_REDIS_URL:
+        return {"ok": True, "detail": "not configured"}
+    _ping_redis(settings.KEY_HEALTH_REDIS_URL)
+    return {"ok": True}
+
+
+def _check_key_pools() -> Dict[str, Any]:
+    router = providers.get("llm_router")
+    active = {p: len(km.active_keys()) for p, km in router.key_managers.items()}
+    return {"ok": any(active.values()), "active_keys": active}
+
+
+CHECKS = {
+    "database": _check_database,
+    "redis": _check_redis,
+    "key_health_redis": _check_key_health_redis,
+    "llm_keys": _check_key_pools,
+}
+
+
+def check_readiness() -> Dict[str, Any]:
+    """Run every dependency check; ``ready`` is true only if all pass."""
+    results: Dict[str, Any] = {}
+    for name, check in CHECKS.items():
+        started = time.monotonic()
+        try:
+            result = check()
+        except Exception as exc:
+            result = {"ok": False, "error": str(exc)}
+        result["ms"] = round((time.monotonic() - started) * 1000, 1)
+        results[name] = result
+    return {"ready": all(r["ok"] for r in results.values()), "checks": results}
+
+
+def warm_up() -> Dict[str, Any]:
+    """Open pooled DB connections and build the key pools before traffic arrives."""
+    connections = []
+    try:
+        for _ in range(min(settings.DATABASE_POOL_SIZE, engine.pool.size())):
+            connections.append(engine.connect())
+    except Exception:
+        logger.warning("Database warm-up failed", exc_info=True)
+    finally:
+        for conn in connections:
+            conn.close()
+    status = check_readiness()
+    logger.info("Warm-up done, ready=%s", status["ready"])
+    return status
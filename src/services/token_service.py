@@ -1,50 +1,105 @@
-from livekit import api
-import os
+import secrets
 import uuid
-from ..db.init_db import get_db
-from fastapi import Body, HTTPException
+from typing import Any, Dict, List, Optional
+from sqlalchemy import insert, select
+from sqlalchemy.orm import Session
+from ..core import providers
+from ..core.config import settings
+from ..db.init_db import session_scope
+from fastapi import HTTPException
 from ..models.interview import Interview
 
 
 def get_room_name() -> str:
-    return uuid.uuid4().hex[:6]
+    # 128 random bits: collisions are not a practical concern, so no retry loop
+    return uuid.uuid4().hex
 
 
-async def create_token(user):
-
-    db = next(get_db())
-
-    if not os.getenv('LIVEKIT_API_KEY') or not os.getenv('LIVEKIT_API_SECRET'):
+def _credentials():
+    if not settings.LIVEKIT_API_KEY or not settings.LIVEKIT_API_SECRET:
         raise HTTPException(
             status_code=500, detail="LiveKit API key and secret are not set in environment variables.")
+    return settings.LIVEKIT_API_KEY, settings.LIVEKIT_API_SECRET
 
-    livekit_api_key = os.getenv('LIVEKIT_API_KEY')
-    livekit_api_secret = os.getenv('LIVEKIT_API_SECRET')
-    room = get_room_name()
 
-    token = api.AccessToken(
+def mint_room_token(identity: str, room: str) -> str:
+    """Sign a LiveKit join token for ``room``."""
+    livekit_api_key, livekit_api_secret = _credentials()
+    api = providers.get("livekit")
+    return api.AccessToken(
         livekit_api_key,
         livekit_api_secret
-    ).with_identity(user.get("candidate_name") or "interviewer").with_name(user.get("candidate_name") or "interviewer").with_grants(api.VideoGrants(
+    ).with_identity(identity).with_name(identity).with_grants(api.VideoGrants(
         room_join=True,
         room=room
-    ))
-
-    interview = Interview(
-        room_name=room,
-        token=token.to_jwt(),
-        password=uuid.uuid4().hex[:5],
-        candidate_profile_id=user.get("candidate_id"),
-        requisition_id=user.get("requisition_id"),
-        evaluation_id=user.get("evaluation_id")
-    )
-    db.add(interview)
-    db.commit()
-    db.refresh(interview)
+    )).to_jwt()
+
 
+def _interview_result(row) -> Dict[str, Any]:
     return {
-        "token": token.to_jwt(),
-        "room": room,
-        "id": interview.id,
-        "password": interview.password
+        "token": row.token,
+        "room": row.room_name,
+        "id": row.id,
+        "password": row.password
     }
+
+
+def mint_interview_tokens(users: List[Dict[str, Any]], db: Optional[Session] = None) -> List[Dict[str, Any]]:
+    """Create interview rooms for a batch of candidates in one transaction.
+
+    Each token is signed once and all rows go in with a single
+    ``INSERT ... RETURNING``. Candidates whose evaluation already has an
+    interview get that one back, so retried deliveries don't open a second
+    room. Results are in the order of ``users``.
+    """
+    if db is None:
+        with session_scope() as session:
+            return mint_interview_tokens(users, session)
+
+    evaluation_ids = [u.get("evaluation_id") for u in users if u.get("evaluation_id")]
+    existing = {}
+    if evaluation_ids:
+        rows = db.execute(
+            select(Interview.evaluation_id, Interview.id, Interview.token,
+                   Interview.room_name, Interview.password)
+            .where(Interview.evaluation_id.in_(evaluation_ids))
+        ).all()
+        existing = {row.evaluation_id: _interview_result(row) for row in rows}
+
+    values = []
+    for user in users:
+        if user.get("evaluation_id") in existing:
+            continue
+        room = get_room_name()
+        identity = user.get("candidate_name") or "interviewer"
+        values.append(dict(
+            id=uuid.uuid4(),
+            room_name=room,
+            token=mint_room_token(identity, room),
+            password=secrets.token_hex(3)[:5],
+            candidate_profile_id=user.get("candidate_id"),
+            requisition_id=user.get("requisition_id"),
+            evaluation_id=user.get("evaluation_id")
+        ))
+
+    created = []
+    if values:
+        created = db.execute(
+            insert(Interview).returning(
+                Interview.id, Interview.token, Interview.room_name, Interview.password,
+                sort_by_parameter_order=True),
+            values,
+        ).all()
+    created_iter = iter(created)
+
+    results = []
+    for user in users:
+        if user.get("evaluation_id") in existing:
+            results.append(existing[user.get("evaluation_id")])
+        else:
+            results.append(_interview_result(next(created_iter)))
+    return results
+
+
+def create_token(user) -> Dict[str, Any]:
+    return mint_interview_tokens([user])[0]
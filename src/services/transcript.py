@@ -0,0 +1,171 @@
+import re
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+# average conversational speaking rate, used when items carry no timestamps
+WORDS_PER_MINUTE = 150
+
+ROLE_LABELS = {"assistant": "interviewer", "user": "candidate"}
+
+_WS_RE = re.compile(r"\s+")
+
+
+def _item_text(content: Any) -> str:
+    """Flatten a transcript item's ``content`` (str, list of str or parts)."""
+    if content is None:
+        return ""
+    if isinstance(content, str):
+        parts = [content]
+    elif isinstance(content, list):
+        parts = []
+        for part in content:
+            if isinstance(part, str):
+                parts.append(part)
+            elif isinstance(part, dict) and isinstance(part.get("text"), str):
+                parts.append(part["text"])
+    else:
+        parts = [str(content)]
+    return _WS_RE.sub(" ", " ".join(parts)).strip()
+
+
+def _item_time(item: Dict[str, Any]) -> Optional[float]:
+    for key in ("created_at", "timestamp", "start_time"):
+        value = item.get(key)
+        if isinstance(value, (int, float)):
+            return float(value)
+        if isinstance(value, str):
+            try:
+                return datetime.fromisoformat(value).timestamp()
+            except ValueError:
+                continue
+    return None
+
+
+def compact_transcript(transcript_data: Any) -> List[Dict[str, str]]:
+    """Reduce a LiveKit transcript to ``[{"role", "text"}]`` turns.
+
+    Drops ids, ``interrupted`` flags and non-message items, and merges
+    consecutive fragments from the same speaker into one turn.
+    """
+    items = transcript_data.get("items", []) if isinstance(transcript_data, dict) else transcript_data
+    turns: List[Dict[str, str]] = []
+    for item in items or []:
+        if not isinstance(item, dict) or item.get("type", "message") != "message":
+            continue
+        role = ROLE_LABELS.get(item.get("role", ""))
+        text = _item_text(item.get("content"))
+        if not role or not text:
+            continue
+        if turns and turns[-1]["role"] == role:
+            turns[-1]["text"] += " " + text
+        else:
+            turns.append({"role": role, "text": text})
+    return turns
+
+
+def interview_statistics(transcript_data: Any, turns: List[Dict[str, str]]) -> Dict[str, Any]:
+    """Compute the deterministic part of ``interviewStatistics`` locally."""
+    interviewer_words = sum(len(t["text"].split()) for t in turns if t["role"] == "interviewer")
+    candidate_words = sum(len(t["text"].split()) for t in turns if t["role"] == "candidate")
+    total_words = interviewer_words + candidate_words
+
+    questions = sum(
+        1 for t in turns if t["role"] == "interviewer" and "?" in t["text"])
+
+    items = transcript_data.get("items", []) if isinstance(transcript_data, dict) else transcript_data
+    times = [t for t in (_item_time(i) for i in items or [] if isinstance(i, dict)) if t is not None]
+    if len(times) >= 2:
+        duration = (max(times) - min(times)) / 60
+    else:
+        duration = total_words / WORDS_PER_MINUTE
+
+    return {
+        "totalQuestionsAsked": questions,
+        "totalCandidateResponses": sum(1 for t in turns if t["role"] == "candidate"),
+        "estimatedDurationMinutes": round(duration),
+        "candidateTalkRatioPercent": round(100 * candidate_words / total_words) if total_words else 0,
+    }
+
+
+def render_dialogue(turns: List[Dict[str, str]]) -> str:
+    """Plain ``role: text`` lines; far fewer tokens than the JSON form."""
+    return "\n".join(f"{t['role']}: {t['text']}" for t in turns)
+
+
+def split_segments(
+    turns: List[Dict[str, str]], segment_words: int, overlap_turns: int
+) -> List[List[Dict[str, str]]]:
+    """Split turns into windows of about ``segment_words`` words.
+
+    Each window after the first repeats the last ``overlap_turns`` turns of
+    the previous one so a question and its answer are never analysed apart.
+    """
+    segments: List[List[Dict[str, str]]] = []
+    start = 0
+    while start < len(turns):
+        end = start
+        words = 0
+        while end < len(turns) and (end == start or words < segment_words):
+            words += len(turns[end]["text"].split())
+            end += 1
+        segments.append(turns[start:end])
+        if end >= len(turns):
+            break
+        start = max(end - overlap_turns, start + 1)
+    return segments
+
+
+def _merge_values(values: List[Any], weights: List[float]) -> Any:
+    present = [(v, w) for v, w in zip(values, weights) if v not in (None, "", [], {})]
+    if not present:
+        return values[0] if values else None
+    values = [v for v, _ in present]
+    weights = [w for _, w in present]
+
+    if all(isinstance(v, dict) for v in values):
+        keys: List[str] = []
+        for v in values:
+            keys.extend(k for k in v if k not in keys)
+        return {
+            k: _merge_values([v.get(k) for v in values], weights) for k in keys
+        }
+
+    if all(isinstance(v, list) for v in values):
+        merged: List[Any] = []
+        seen = set()
+        for v in values:
+            for entry in v:
+                marker = entry.strip().lower() if isinstance(entry, str) else repr(entry)
+                if marker not in seen:
+                    seen.add(marker)
+                    merged.append(entry)
+        return merged
+
+    if all(isinstance(v, bool) for v in values):
+        return any(values)
+
+    if all(isinstance(v, (int, float)) for v in values):
+        mean = sum(v * w for v, w in zip(values, weights)) / sum(weights)
+        return round(mean) if all(isinstance(v, int) for v in values) else round(mean, 2)
+
+    texts = [str(v).strip() for v in values]
+    if all(len(t) <= 40 for t in texts):
+        # short labels ("Hire", "Positive"): weighted vote
+        tally: Dict[str, float] = {}
+        for t, w in zip(texts, weights):
+            tally[t] = tally.get(t, 0) + w
+        return max(tally, key=tally.__getitem__)
+    distinct: List[str] = []
+    for t in texts:
+        if t not in distinct:
+            distinct.append(t)
+    return " ".join(distinct)
+
+
+def reduce_analyses(partials: List[Dict[str, Any]], weights: List[float]) -> Dict[str, Any]:
+    """Merge per-segment reports into the single report shape.
+
+    Scores are weighted means, lists are de-duplicated unions, flags are OR-ed,
+    short labels are decided by weighted vote and prose is concatenated.
+    """
+    return _merge_values(partials, weights)
@@ -1,23 +1,155 @@
+import asyncio
 import json
-from typing import List
-from fastapi import FastAPI, WebSocket, WebSocketDisconnect
+import logging
+from typing import Any, Dict, Optional
+from fastapi import WebSocket
+from src.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class _Client:
+    """Outbound state for one connected frontend."""
+
+    def __init__(self, ws: WebSocket, queue_size: int):
+        self.ws = ws
+        self.queue: asyncio.Queue[str] = asyncio.Queue(maxsize=queue_size)
+        self.dropped = 0
+        self.sent = 0
+        self.received = 0
+        self.writer: Optional[asyncio.Task] = None
+        self.heartbeat: Optional[asyncio.Task] = None
+        self.closed = asyncio.Event()
+
 
-    
 class ConnectionManager:
-    def __init__(self):
-        self.active_connections: List[WebSocket] = []
+    """Fan-out of server events to connected frontends.
+
+    Every connection gets a bounded outbound queue drained by its own writer
+    task, so ``broadcast`` never awaits a socket. When a slow consumer's queue
+    is full the oldest pending message is dropped to make room for the newest
+    one, and a send that exceeds ``WS_SEND_TIMEOUT`` closes that connection.
+    """
+
+    def __init__(
+        self,
+        queue_size: int = settings.WS_QUEUE_SIZE,
+        send_timeout: float = settings.WS_SEND_TIMEOUT,
+        heartbeat_interval: float = settings.WS_HEARTBEAT_INTERVAL,
+    ):
+        self.queue_size = queue_size
+        self.send_timeout = send_timeout
+        self.heartbeat_interval = heartbeat_interval
+        self.active_connections: Dict[WebSocket, _Client] = {}
+        self.total_dropped = 0
 
     async def connect(self, ws: WebSocket):
         await ws.accept()
-        self.active_connections.append(ws)
+        client = _Client(ws, self.queue_size)
+        client.writer = asyncio.create_task(self._writer(client))
+        client.heartbeat = asyncio.create_task(self._heartbeat(client))
+        self.active_connections[ws] = client
 
     def disconnect(self, ws: WebSocket):
-        self.active_connections.remove(ws)
+        client = self.active_connections.pop(ws, None)
+        if client is None:
+            return
+        client.closed.set()
+        current = asyncio.current_task()
+        for task in (client.writer, client.heartbeat):
+            if task is not None and task is not current:
+                task.cancel()
+
+    async def receive_until_closed(self, ws: WebSocket):
+        """Drain inbound messages until the peer disconnects or the writer
+        gives up on the connection, whichever comes first.
+
+        Reading keeps client messages (e.g. pongs) from piling up and notices
+        a disconnect as soon as the close frame arrives, instead of at the
+        next failed heartbeat.
+        """
+        client = self.active_connections.get(ws)
+        if client is None:
+            return
+        closed = asyncio.create_task(client.closed.wait())
+        try:
+            while True:
+                receiver = asyncio.create_task(ws.receive())
+                done, _ = await asyncio.wait({receiver, closed}, return_when=asyncio.FIRST_COMPLETED)
+                if receiver not in done:
+                    receiver.cancel()
+                    return
+                message = receiver.result()
+                if message["type"] == "websocket.disconnect":
+                    return
+                client.received += 1
+        finally:
+            closed.cancel()
 
     async def broadcast(self, message: dict):
-        # send to all connected frontends
-        for connection in self.active_connections:
-            await connection.send_text(json.dumps(message))
+        # serialize once and enqueue for every connected frontend
+        data = json.dumps(message)
+        for client in list(self.active_connections.values()):
+            self._enqueue(client, data)
+
+    def _enqueue(self, client: _Client, data: str):
+        try:
+            client.queue.put_nowait(data)
+        except asyncio.QueueFull:
+            # slow consumer: drop the oldest pending message, keep the newest
+            try:
+                client.queue.get_nowait()
+            except asyncio.QueueEmpty:
+                pass
+            client.dropped += 1
+            self.total_dropped += 1
+            client.queue.put_nowait(data)
+
+    async def _send(self, client: _Client, data: str) -> bool:
+        try:
+            await asyncio.wait_for(client.ws.send_text(data), timeout=self.send_timeout)
+            return True
+        except asyncio.TimeoutError:
+            logger.warning("WebSocket send timed out after %.1fs, closing slow consumer", self.send_timeout)
+        except Exception as exc:
+            logger.info("WebSocket send failed, dropping connection: %s", exc)
+        return False
+
+    async def _writer(self, client: _Client):
+        try:
+            while True:
+                data = await client.queue.get()
+                if not await self._send(client, data):
+                    break
+                client.sent += 1
+        except asyncio.CancelledError:
+            return
+        self.disconnect(client.ws)
+        try:
+            await client.ws.close()
+        except Exception:
+            pass
+
+    async def _heartbeat(self, client: _Client):
+        ping = json.dumps({"type": "ping"})
+        try:
+            while True:
+                await asyncio.sleep(self.heartbeat_interval)
+                # pings go through the queue so they never interleave with a
+                # send already in flight on the writer task
+                self._enqueue(client, ping)
+        except asyncio.CancelledError:
+            return
+
+    def stats(self) -> Dict[str, Any]:
+        depths = [c.queue.qsize() for c in self.active_connections.values()]
+        return {
+            "connections": len(depths),
+            "queue_size": self.queue_size,
+            "max_queue_depth": max(depths, default=0),
+            "total_queued": sum(depths),
+            "total_dropped": self.total_dropped,
+        }
 
 
 manager = ConnectionManager()
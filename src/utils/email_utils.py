@@ -2,15 +2,12 @@ import smtplib
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 from tenacity import retry, wait_exponential, stop_after_attempt
-import os
-import resend
 from dotenv import load_dotenv
+from src.core import providers
 from .mail_content import generate_mail_content
 
 load_dotenv()
 
-resend.api_key = os.environ["RESEND_API_KEY"]
-
 
 @retry(wait=wait_exponential(multiplier=2, min=2, max=30), stop=stop_after_attempt(5))
 def send_email(to_email: str, candidate_name: str, position: str, is_eligible: bool, id: str, password: str):
@@ -23,7 +20,9 @@ def send_email(to_email: str, candidate_name: str, position: str, is_eligible: b
     body = content["html_content"]
     subject = content["subject"]
 
-    params: resend.Emails.SendParams = {
+    # configured on first send, so importing the worker needs no RESEND_API_KEY
+    resend = providers.get("resend")
+    params = {
         "from": "Acme <onboarding@resend.dev>",
         "to": [to_email],
         "subject": subject,
@@ -0,0 +1,42 @@
+import hashlib
+from typing import Any, Optional
+from fastapi import Request, Response
+
+CACHE_CONTROL = "private, no-cache"
+
+
+def make_etag(*parts: Any) -> str:
+    """Weak ETag over a version stamp; weak so it survives compression."""
+    digest = hashlib.sha1("|".join(str(p) for p in parts).encode()).hexdigest()
+    return f'W/"{digest}"'
+
+
+def _matches(header: Optional[str], etag: str) -> bool:
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    # If-None-Match uses weak comparison
+    wanted = etag[2:] if etag.startswith("W/") else etag
+    for candidate in header.split(","):
+        candidate = candidate.strip()
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == wanted:
+            return True
+    return False
+
+
+def conditional(request: Request, response: Response, *parts: Any) -> Optional[Response]:
+    """Return a 304 if the client already has this version, else tag ``response``.
+
+    ``parts`` is a cheap version stamp of the resource (e.g. row count and
+    latest ``updated_at``) plus anything else the payload depends on, such
+    as the user and query parameters.
+    """
+    etag = make_etag(*parts)
+    headers = {"ETag": etag, "Cache-Control": CACHE_CONTROL}
+    if _matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    response.headers.update(headers)
+    return None
@@ -1,34 +1,405 @@
+import hashlib
+import logging
 import os
-from dotenv import load_dotenv
+import threading
+import time
 from collections import deque
-from datetime import datetime, timedelta
+from concurrent.futures import CancelledError
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+from dotenv import load_dotenv
+from src.core.config import settings
+from src.utils.token_bucket import TokenBucket
 
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
+# Pick the least-loaded key that is not cooling down, is under its in-flight
+# budget and can afford the call under its shared RPM/TPM buckets, and take a
+# slot and the budget on it, in one atomic step.
+# KEYS[1..n] in-flight counters, KEYS[n+1..2n] cooldown markers,
+# KEYS[2n+1..3n] request buckets, KEYS[3n+1..4n] token buckets.
+# ARGV: n, max_in_flight, in-flight counter ttl (ms), rpm, tpm, tokens
+# Returns {index or -1, ms until budget frees}.
+_LEASE_SCRIPT = """
+local n = tonumber(ARGV[1])
+local limit = tonumber(ARGV[2])
+local rpm = tonumber(ARGV[4])
+local tpm = tonumber(ARGV[5])
+local cost = tonumber(ARGV[6])
+local t = redis.call('TIME')
+local now = tonumber(t[1]) * 1000 + math.floor(tonumber(t[2]) / 1000)
+
+-- tokens in a per-minute bucket right now; nil when unlimited
+local function level(key, per_minute)
+  if per_minute <= 0 then
+    return nil
+  end
+  local state = redis.call('HMGET', key, 'tokens', 'ts')
+  local tokens = tonumber(state[1]) or per_minute
+  local ts = tonumber(state[2]) or now
+  return math.min(per_minute, tokens + (now - ts) * per_minute / 60000)
+end
+
+-- ms until ``amount`` is available; requests larger than the bucket wait for a full one
+local function wait_ms(tokens, amount, per_minute)
+  if tokens == nil then
+    return 0
+  end
+  local needed = math.min(amount, per_minute) - tokens
+  if needed <= 0 then
+    return 0
+  end
+  return math.ceil(needed * 60000 / per_minute)
+end
+
+local best = -1
+local best_load = nil
+local best_requests = nil
+local best_tokens = nil
+local retry = nil
+for i = 1, n do
+  if redis.call('EXISTS', KEYS[n + i]) == 0 then
+    local load = tonumber(redis.call('GET', KEYS[i]) or '0')
+    if load < limit then
+      local requests = level(KEYS[2 * n + i], rpm)
+      local tokens = level(KEYS[3 * n + i], tpm)
+      local wait = math.max(wait_ms(requests, 1, rpm), wait_ms(tokens, cost, tpm))
+      if wait > 0 then
+        if retry == nil or wait < retry then
+          retry = wait
+        end
+      elseif best_load == nil or load < best_load then
+        best = i
+        best_load = load
+        best_requests = requests
+        best_tokens = tokens
+      end
+    end
+  end
+end
+if best < 0 then
+  return {-1, retry or 0}
+end
+redis.call('INCR', KEYS[best])
+redis.call('PEXPIRE', KEYS[best], ARGV[3])
+if best_requests ~= nil then
+  redis.call('HSET', KEYS[2 * n + best], 'tokens', best_requests - 1, 'ts', now)
+  redis.call('PEXPIRE', KEYS[2 * n + best], 120000)
+end
+if best_tokens ~= nil then
+  redis.call('HSET', KEYS[3 * n + best], 'tokens', best_tokens - math.min(cost, tpm), 'ts', now)
+  redis.call('PEXPIRE', KEYS[3 * n + best], 120000)
+end
+return {best - 1, 0}
+"""
+
+_RELEASE_SCRIPT = """
+local v = redis.call('DECR', KEYS[1])
+if v < 0 then
+  redis.call('SET', KEYS[1], 0)
+end
+return v
+"""
+
+
+class NoKeyAvailable(RuntimeError):
+    pass
+
+
 class KeyManager:
-    def __init__(self):
-        keys = os.getenv("LLM_KEYS", "").split(",")
-        self.keys = deque(keys)
-        self.failed_keys = {}  # key -> next_retry_time
+    """Health and load tracking for a pool of API keys.
 
-    def get_active_key(self):
-        # Rotate until a valid key is found
-        for _ in range(len(self.keys)):
-            key = self.keys[0]
-            if not self.is_key_failed(key):
-                return key
-            self.keys.rotate(-1)
-        raise RuntimeError("🚨 No active API keys available.")
-
-    def mark_key_as_failed(self, key, cooldown_minutes=5):
-        self.failed_keys[key] = datetime.now() + timedelta(minutes=cooldown_minutes)
-        print(f"⚠️ Key {key[:8]}... failed. Will retry after {cooldown_minutes} min.")
-        self.keys.rotate(-1)
+    All state is guarded by a lock, so concurrent threads can lease keys
+    safely. When ``KEY_HEALTH_REDIS_URL`` is set, cooldowns and in-flight counts
+    live in Redis instead, so every uvicorn and Celery process sees the same
+    view: a key rate-limited in one process cools down in all of them. Redis
+    round trips are made without holding the lock.
+
+    Each key also has request-per-minute and token-per-minute buckets. A lease
+    is only granted when the key can afford the call, so callers queue (FIFO)
+    for budget instead of provoking 429s. With Redis the buckets are shared
+    too, so N workers together stay within one key's budget; the local
+    buckets only apply while Redis is unreachable.
+    """
+
+    def __init__(self, env_var="LLM_KEYS", fallback_env_vars=(),
+                 max_in_flight: int = settings.LLM_KEY_MAX_IN_FLIGHT,
+                 redis_url: Optional[str] = settings.KEY_HEALTH_REDIS_URL,
+                 rpm: int = settings.LLM_KEY_RPM,
+                 tpm: int = settings.LLM_KEY_TPM):
+        raw = os.getenv(env_var, "")
+        for name in fallback_env_vars:
+            if raw:
+                break
+            raw = os.getenv(name, "")
+        self.keys: List[str] = [k.strip() for k in raw.split(",") if k.strip()]
+        self.namespace = env_var.lower()
+        self.max_in_flight = max_in_flight
+        self.rpm = max(rpm, 0)
+        self.tpm = max(tpm, 0)
+
+        self._cond = threading.Condition()
+        self.failed_keys: Dict[str, float] = {}  # key -> retry-after (epoch seconds)
+        self.in_flight: Dict[str, int] = {key: 0 for key in self.keys}
+        # leases counted in Redis; the rest were granted locally (e.g. while
+        # Redis was down) and must not be released there
+        self._shared_leases: Dict[str, int] = {key: 0 for key in self.keys}
+        self._changes = 0  # bumped on every release/failure, to avoid lost wake-ups
+        self.request_budget = {key: TokenBucket.per_minute(rpm if rpm > 0 else 0) for key in self.keys}
+        self.token_budget = {key: TokenBucket.per_minute(tpm if tpm > 0 else 0) for key in self.keys}
+
+        self._waiters: deque = deque()
+        self.total_waits = 0
+        self.total_wait_seconds = 0.0
+        self.max_wait_seconds = 0.0
+
+        self._redis = None
+        if redis_url:
+            try:
+                import redis  # deferred: only needed for shared state
+
+                self._redis = redis.Redis.from_url(redis_url, socket_timeout=0.5)
+                self._lease_script = self._redis.register_script(_LEASE_SCRIPT)
+                self._release_script = self._redis.register_script(_RELEASE_SCRIPT)
+            except Exception:
+                logger.exception("Shared key health disabled; falling back to per-process state")
+                self._redis = None
+
+    # -- redis helpers -------------------------------------------------
+    def _key_id(self, key: str) -> str:
+        # never write raw API keys to Redis
+        return hashlib.sha256(key.encode()).hexdigest()[:16]
+
+    def _rkey(self, kind: str, key: str) -> str:
+        return f"keyhealth:{self.namespace}:{kind}:{self._key_id(key)}"
+
+    def _shared_failed(self, keys: Sequence[str]) -> List[bool]:
+        try:
+            pipe = self._redis.pipeline()  # type: ignore
+            for key in keys:
+                pipe.exists(self._rkey("cooldown", key))
+            return [bool(v) for v in pipe.execute()]
+        except Exception:
+            logger.warning("Redis unavailable for key health lookup", exc_info=True)
+            return [self._local_failed(key) for key in keys]
+
+    # -- health ----------------------------------------------------------
+    def _local_failed(self, key: str) -> bool:
+        with self._cond:
+            retry_at = self.failed_keys.get(key)
+            if retry_at is None:
+                return False
+            if time.time() > retry_at:
+                del self.failed_keys[key]  # retry after cooldown
+                return False
+            return True
 
     def is_key_failed(self, key):
-        if key not in self.failed_keys:
-            return False
-        if datetime.now() > self.failed_keys[key]:
-            del self.failed_keys[key]  # retry after cooldown
-            return False
-        return True
+        if self._redis is not None:
+            return self._shared_failed([key])[0]
+        return self._local_failed(key)
+
+    def active_keys(self):
+        """All keys that are not cooling down."""
+        if self._redis is not None:
+            flags = self._shared_failed(self.keys)
+            return [key for key, failed in zip(self.keys, flags) if not failed]
+        return [key for key in self.keys if not self._local_failed(key)]
+
+    def mark_key_as_failed(self, key, cooldown_minutes=None):
+        if cooldown_minutes is None:
+            cooldown_minutes = settings.LLM_KEY_COOLDOWN_SECONDS / 60
+        with self._cond:
+            self.failed_keys[key] = time.time() + cooldown_minutes * 60
+            self._changes += 1
+            self._cond.notify_all()
+        if self._redis is not None:
+            try:
+                self._redis.set(self._rkey("cooldown", key), 1, px=int(cooldown_minutes * 60_000))
+            except Exception:
+                logger.warning("Redis unavailable, key cooldown kept local", exc_info=True)
+        print(f"⚠️ Key {key[:8]}... failed. Will retry after {cooldown_minutes:g} min.")
+
+    # -- leasing ---------------------------------------------------------
+    def _budget_wait(self, key: str, tokens: int) -> float:
+        return max(self.request_budget[key].wait_time(1), self.token_budget[key].wait_time(tokens))
+
+    def _try_shared_acquire(self, order: Sequence[str], tokens: int) -> Tuple[Optional[str], float]:
+        """Lease through Redis; raises if Redis is unreachable."""
+        keys = (
+            [self._rkey("inflight", k) for k in order]
+            + [self._rkey("cooldown", k) for k in order]
+            + [self._rkey("rpm", k) for k in order]
+            + [self._rkey("tpm", k) for k in order]
+        )
+        index, retry_ms = self._lease_script(
+            keys=keys,
+            args=[len(order), self.max_in_flight, settings.LLM_KEY_LEASE_TTL_SECONDS * 1000,
+                  self.rpm, self.tpm, tokens],
+        )
+        index = int(index)
+        if index < 0:
+            return None, int(retry_ms) / 1000
+        key = order[index]
+        with self._cond:
+            self.in_flight[key] = self.in_flight.get(key, 0) + 1
+            self._shared_leases[key] = self._shared_leases.get(key, 0) + 1
+        return key, 0.0
+
+    def _try_acquire(self, order: Sequence[str], tokens: int) -> Tuple[Optional[str], float]:
+        """Return ``(key, 0)`` on success, else ``(None, seconds until budget frees)``.
+
+        Only the head of the wait queue calls this, so nothing else in this
+        process consumes budget between the checks below and the commit.
+        """
+        if self._redis is not None:
+            try:
+                return self._try_shared_acquire(order, tokens)
+            except Exception:
+                logger.warning("Redis unavailable for key lease, using local state", exc_info=True)
+
+        with self._cond:
+            waits = {key: self._budget_wait(key, tokens) for key in order}
+            affordable = [key for key in order if waits[key] <= 0]
+            if not affordable:
+                return None, min(waits.values(), default=0.0)
+
+            key = None
+            for candidate in affordable:
+                if self._local_failed(candidate):
+                    continue
+                load = self.in_flight.get(candidate, 0)
+                if load < self.max_in_flight and (key is None or load < self.in_flight.get(key, 0)):
+                    key = candidate
+            if key is None:
+                return None, 0.0
+
+            self.request_budget[key].consume(1)
+            self.token_budget[key].consume(tokens)
+            self.in_flight[key] = self.in_flight.get(key, 0) + 1
+        return key, 0.0
+
+    def acquire(self, order: Optional[Sequence[str]] = None, timeout: Optional[float] = None,
+                tokens: int = 0, on_wait: Optional[Callable[[Dict[str, Any]], None]] = None,
+                cancel: Optional[threading.Event] = None) -> str:
+        """Lease the least-loaded healthy key that can afford the call.
+
+        ``order`` ranks keys for tie-breaking (e.g. fastest first) and
+        ``tokens`` is the estimated size of the call. Callers wait in FIFO
+        order for in-flight slots and rate budget; ``on_wait`` is told the
+        queue position and time waited so far while queued. Raises
+        ``NoKeyAvailable`` if every key is cooling down, or if nothing frees
+        up within ``timeout`` seconds, and ``CancelledError`` once ``cancel``
+        is set while still waiting.
+        """
+        order = list(order or self.keys)
+        if timeout is None:
+            timeout = settings.LLM_KEY_ACQUIRE_TIMEOUT
+        started = time.monotonic()
+        deadline = started + timeout
+        ticket = object()
+        last_report: Optional[Tuple[int, int]] = None
+        with self._cond:
+            self._waiters.append(ticket)
+        try:
+            while True:
+                if cancel is not None and cancel.is_set():
+                    raise CancelledError()
+                with self._cond:
+                    seen = self._changes
+                    at_head = self._waiters[0] is ticket
+                retry_in = 0.0
+                if at_head:
+                    key, retry_in = self._try_acquire(order, tokens)
+                    if key is not None:
+                        self._record_wait(time.monotonic() - started)
+                        return key
+                if not self.active_keys():
+                    raise NoKeyAvailable("🚨 No active API keys available.")
+                now = time.monotonic()
+                remaining = deadline - now
+                if remaining <= 0:
+                    raise NoKeyAvailable("🚨 Timed out waiting for an API key within its rate budget.")
+
+                with self._cond:
+                    position = self._waiters.index(ticket) + 1
+                report = (position, int(now - started))
+                if on_wait is not None and report != last_report:
+                    last_report = report
+                    on_wait({
+                        "queue_position": position,
+                        "waited_seconds": round(now - started, 1),
+                        "retry_in_seconds": round(retry_in, 1),
+                    })
+                with self._cond:
+                    if self._changes == seen:
+                        # other processes release through Redis (and nobody
+                        # notifies on cancel), so poll as well
+                        poll = 0.1 if cancel is not None else 1.0
+                        self._cond.wait(min(remaining, max(retry_in, 0.05), poll))
+        finally:
+            with self._cond:
+                self._waiters.remove(ticket)
+                self._changes += 1
+                self._cond.notify_all()
+
+    def _record_wait(self, waited: float):
+        if waited < 0.01:
+            return
+        with self._cond:
+            self.total_waits += 1
+            self.total_wait_seconds += waited
+            self.max_wait_seconds = max(self.max_wait_seconds, waited)
+
+    def release(self, key: str):
+        with self._cond:
+            self.in_flight[key] = max(0, self.in_flight.get(key, 0) - 1)
+            # release to wherever the lease was granted; shared and local
+            # leases of the same key are interchangeable, so a count suffices
+            shared = self._shared_leases.get(key, 0) > 0
+            if shared:
+                self._shared_leases[key] -= 1
+            self._changes += 1
+            self._cond.notify_all()
+        if shared:
+            try:
+                self._release_script(keys=[self._rkey("inflight", key)])
+            except Exception:
+                logger.warning("Redis unavailable for key release", exc_info=True)
+
+    @contextmanager
+    def lease(self, order: Optional[Sequence[str]] = None, timeout: Optional[float] = None,
+              tokens: int = 0, on_wait: Optional[Callable[[Dict[str, Any]], None]] = None,
+              cancel: Optional[threading.Event] = None) -> Iterator[str]:
+        key = self.acquire(order, timeout, tokens, on_wait, cancel)
+        try:
+            yield key
+        finally:
+            self.release(key)
+
+    def get_active_key(self):
+        """Least-loaded healthy key, without leasing it."""
+        keys = self.active_keys()
+        if not keys:
+            raise NoKeyAvailable("🚨 No active API keys available.")
+        with self._cond:
+            return min(keys, key=lambda k: self.in_flight.get(k, 0))
+
+    def stats(self) -> Dict[str, Any]:
+        with self._cond:
+            return {
+                "queue_depth": len(self._waiters),
+                "waits": self.total_waits,
+                "wait_seconds_total": round(self.total_wait_seconds, 2),
+                "wait_seconds_max": round(self.max_wait_seconds, 2),
+                "keys": {
+                    f"{key[:8]}...": {
+                        "in_flight": self.in_flight.get(key, 0),
+                        "cooling_down": key in self.failed_keys and self.failed_keys[key] > time.time(),
+                        "requests_available": round(self.request_budget[key].tokens, 1),
+                    }
+                    for key in self.keys
+                },
+            }
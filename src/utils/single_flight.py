@@ -0,0 +1,89 @@
+import functools
+import threading
+from typing import Any, Callable, Dict, Hashable
+from src.utils.ttl_cache import TTLCache
+
+_MISSING = object()
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: BaseException | None = None
+
+
+class SingleFlight:
+    """Collapse concurrent calls with the same key into one execution.
+
+    The first caller (the leader) runs the function; callers arriving while
+    it runs wait and get its result or exception. Successful results are also
+    served for ``ttl`` seconds afterwards. Threaded: meant for sync routes,
+    which FastAPI runs in its threadpool.
+    """
+
+    def __init__(self, ttl: float = 1.0, max_size: int = 1024):
+        self.ttl = ttl
+        self._results = TTLCache(max_size=max_size, ttl=ttl)
+        self._calls: Dict[Hashable, _Call] = {}
+        self._lock = threading.Lock()
+        self.executions = 0
+        self.shared = 0
+
+    def do(self, key: Hashable, fn: Callable[[], Any]) -> Any:
+        result = self._results.get(key, _MISSING)
+        if result is not _MISSING:
+            return result
+
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+                self.executions += 1
+            else:
+                self.shared += 1
+
+        if not leader:
+            call.done.wait()  # type: ignore
+            if call.error is not None:  # type: ignore
+                raise call.error  # type: ignore
+            return call.result  # type: ignore
+
+        try:
+            call.result = fn()  # type: ignore
+            if self.ttl > 0:
+                self._results.set(key, call.result)  # type: ignore
+            return call.result  # type: ignore
+        except BaseException as exc:
+            call.error = exc  # type: ignore
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            call.done.set()  # type: ignore
+
+    def forget(self, key: Hashable) -> None:
+        self._results.pop(key)
+
+    def stats(self) -> Dict[str, Any]:
+        return {"executions": self.executions, "shared": self.shared, **self._results.stats()}
+
+
+def single_flight(key: Callable[..., Hashable], ttl: float = 1.0):
+    """Decorator form of ``SingleFlight`` for a sync function or route.
+
+    ``key`` receives the call's keyword arguments (FastAPI passes route
+    parameters by keyword) and returns what identifies identical requests.
+    The group is exposed as ``wrapper.flight``.
+    """
+    def decorator(fn: Callable[..., Any]) -> Callable[..., Any]:
+        flight = SingleFlight(ttl=ttl)
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            return flight.do(key(**kwargs), lambda: fn(*args, **kwargs))
+
+        wrapper.flight = flight  # type: ignore
+        return wrapper
+    return decorator
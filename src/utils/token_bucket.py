@@ -0,0 +1,50 @@
+import threading
+import time
+
+
+class TokenBucket:
+    """Classic token bucket: ``capacity`` tokens, refilled at ``rate`` per second.
+
+    A ``rate`` of 0 or less means unlimited.
+    """
+
+    def __init__(self, capacity: float, rate: float):
+        self.capacity = float(capacity)
+        self.rate = float(rate)
+        self.tokens = float(capacity)
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def per_minute(cls, limit: float) -> "TokenBucket":
+        return cls(limit, limit / 60)
+
+    @property
+    def unlimited(self) -> bool:
+        return self.rate <= 0
+
+    def _refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount: float = 1) -> float:
+        """Seconds until ``amount`` tokens are available (0 if they are now)."""
+        if self.unlimited:
+            return 0.0
+        with self._lock:
+            self._refill(time.monotonic())
+            # requests larger than the bucket are allowed once it is full
+            needed = min(amount, self.capacity) - self.tokens
+            return max(0.0, needed / self.rate)
+
+    def consume(self, amount: float = 1) -> bool:
+        """Take ``amount`` tokens if available; return whether it succeeded."""
+        if self.unlimited:
+            return True
+        with self._lock:
+            self._refill(time.monotonic())
+            amount = min(amount, self.capacity)
+            if self.tokens >= amount:
+                self.tokens -= amount
+                return True
+            return False
@@ -1,15 +1,20 @@
 from celery import Celery
 
+from ..core.config import settings
+from ..db.init_db import session_scope
+from ..services.outbox import ANALYSIS_REQUESTED, EVALUATION_COMPLETED, drain_outbox, is_delivered, mark_delivered, mark_failed
 from ..services.token_service import create_token
 from ..utils.email_utils import send_email
-import os
 from dotenv import load_dotenv
 import asyncio
+import logging
 import threading
 
 load_dotenv()
 
-REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+logger = logging.getLogger(__name__)
+
+REDIS_URL = settings.REDIS_URL
 
 celery_app = Celery(
     "email_worker",
@@ -20,11 +25,49 @@ celery_app = Celery(
 
 celery_app.conf.worker_pool = "solo"
 
+# Transcript analysis can take minutes, so it gets its own queue and worker
+# and never holds up result emails or the outbox relay:
+#
+#   celery -A src.worker.conn worker -Q celery                                  # emails, relay, maintenance
+#   celery -A src.worker.conn worker -Q analysis -P threads -c 2 -n analysis@%h  # transcript analysis
+#   celery -A src.worker.conn beat
+ANALYSIS_QUEUE = "analysis"
+celery_app.conf.task_routes = {
+    "src.worker.conn.analyze_transcript_task": {"queue": ANALYSIS_QUEUE},
+}
+# a long task must not sit prefetched behind another one
+celery_app.conf.worker_prefetch_multiplier = 1
+
+celery_app.conf.beat_schedule = {
+    "relay-outbox": {
+        "task": "src.worker.conn.relay_outbox_task",
+        "schedule": settings.OUTBOX_RELAY_INTERVAL,
+        "options": {"expires": settings.OUTBOX_RELAY_INTERVAL * 5},
+    },
+    "maintain-evaluation-partitions": {
+        "task": "src.worker.conn.maintain_partitions_task",
+        "schedule": 24 * 60 * 60,
+    },
+    "reap-analysis-jobs": {
+        "task": "src.worker.conn.reap_analysis_jobs_task",
+        "schedule": 5 * 60,
+    },
+}
+
 
 @celery_app.task(bind=True, max_retries=5)
-def send_email_task(self, to_email: str, candidate_name: str, position: str, is_eligible: bool, candidate_id: str, evaluation_id: str, requisition_id: str):
-    """Celery background task with retry handling."""
+def send_email_task(self, to_email: str, candidate_name: str, position: str, is_eligible: bool, candidate_id: str, evaluation_id: str, requisition_id: str, outbox_id: str = None):
+    """Celery background task with retry handling.
+
+    Safe to run more than once for the same outbox event: a delivered event is
+    skipped and the interview token is reused for the evaluation.
+    """
     
+    if outbox_id is not None:
+        with session_scope() as db:
+            if is_delivered(db, outbox_id):
+                logger.info("Outbox event %s already delivered, skipping", outbox_id)
+                return
     
     user = {
         "candidate_name": candidate_name,
@@ -33,14 +76,71 @@ def send_email_task(self, to_email: str, candidate_name: str, position: str, is_
         "requisition_id": requisition_id
     }
     
-    print(f"🚀 Task started: Sending email to {to_email} for position {position}, eligible: {is_eligible}, {candidate_name}")
+    logger.info("Sending email to %s for position %s, eligible: %s", to_email, position, is_eligible)
     try:
-        result = asyncio.run(create_token(user))
+        result = create_token(user)
         send_email(to_email, candidate_name, position, is_eligible, result["id"], result["password"])
     except Exception as exc:
-        print(f"❌ Failed attempt: {exc}")
+        logger.warning("Sending email to %s failed: %s", to_email, exc)
+        if outbox_id is not None:
+            with session_scope() as db:
+                mark_failed(db, outbox_id, str(exc))
         raise self.retry(exc=exc, countdown=2 ** self.request.retries)  # exponential retry delay
 
+    if outbox_id is not None:
+        with session_scope() as db:
+            mark_delivered(db, outbox_id)
+
+
+def _publish_evaluation_email(event_id: str, payload: dict):
+    # the event id doubles as the task id, so a re-publish is recognisable
+    send_email_task.apply_async(kwargs={**payload, "outbox_id": event_id}, task_id=event_id)
+
+
+@celery_app.task(acks_late=True)
+def analyze_transcript_task(job_id: str, room_name: str, transcript_data, outbox_id: str = None):
+    """Analyse an interview transcript and store the report on its evaluation."""
+    from ..services.analysis_jobs import run_analysis_job
+
+    if outbox_id is not None:
+        with session_scope() as db:
+            if is_delivered(db, outbox_id):
+                return
+    run_analysis_job(job_id, room_name, transcript_data)
+    if outbox_id is not None:
+        with session_scope() as db:
+            mark_delivered(db, outbox_id)
+
+
+def _publish_analysis(event_id: str, payload: dict):
+    analyze_transcript_task.apply_async(kwargs={**payload, "outbox_id": event_id}, task_id=event_id)
+
+
+@celery_app.task
+def reap_analysis_jobs_task():
+    """Fail analysis jobs a crashed worker left queued or running."""
+    from ..services.analysis_jobs import reap_stale_jobs
+
+    with session_scope() as db:
+        return reap_stale_jobs(db)
+
+
+@celery_app.task
+def relay_outbox_task():
+    """Publish committed outbox events to the broker in batches."""
+    return drain_outbox({
+        EVALUATION_COMPLETED: _publish_evaluation_email,
+        ANALYSIS_REQUESTED: _publish_analysis,
+    })
+
+
+@celery_app.task
+def maintain_partitions_task():
+    """Create upcoming evaluation partitions and archive expired ones."""
+    from ..db.partitions import maintain_partitions
+
+    return maintain_partitions()
+
 
 
 
@@ -0,0 +1,43 @@
+"""Analysis jobs: own Celery queue and reaping of jobs a dead worker left behind."""
+import pytest
+
+pytest.importorskip("celery")
+pytest.importorskip("pydantic_settings")
+
+from sqlalchemy.dialects import postgresql  # noqa: E402
+
+from src.services import analysis_jobs  # noqa: E402
+from src.worker import conn  # noqa: E402
+
+
+def test_analysis_runs_on_its_own_queue():
+    router = conn.celery_app.amqp.router
+    analysis = router.route({}, conn.analyze_transcript_task.name)
+    email = router.route({}, conn.send_email_task.name)
+    assert analysis["queue"].name == conn.ANALYSIS_QUEUE
+    assert email["queue"].name != conn.ANALYSIS_QUEUE
+
+
+def test_stale_covers_both_unfinished_states():
+    sql = str(analysis_jobs._stale().compile(dialect=postgresql.dialect()))
+    assert "analysis_jobs.created_at <" in sql
+    assert "analysis_jobs.started_at <" in sql
+
+
+class FakeSession:
+    def __init__(self, rowcount):
+        self.rowcount = rowcount
+        self.statements = []
+
+    def execute(self, statement):
+        self.statements.append(statement)
+        return type("Result", (), {"rowcount": self.rowcount})()
+
+
+def test_reap_marks_stale_jobs_failed():
+    db = FakeSession(rowcount=3)
+    assert analysis_jobs.reap_stale_jobs(db) == 3
+    [update] = db.statements
+    params = update.compile(dialect=postgresql.dialect()).params
+    assert params["status"] == "failed"
+    assert params["error"] == "timed out"
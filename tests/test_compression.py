@@ -0,0 +1,95 @@
+"""Response compression: negotiation, SSE flushing, and a bytes/CPU benchmark."""
+import asyncio
+import json
+import time
+import zlib
+
+import pytest
+
+pytest.importorskip("pydantic_settings")
+
+from src.middleware import compression  # noqa: E402
+from src.middleware.compression import CompressionMiddleware, negotiate  # noqa: E402
+
+
+def evaluations_payload(rows=1000):
+    """Shaped like list_evaluations: JSONB experience and report per row."""
+    return json.dumps([{
+        "id": f"8c1f{i:08d}-0000-4000-8000-000000000000",
+        "candidate": {"name": f"Candidate {i}", "email": f"candidate{i}@example.com",
+                      "skills": ["python", "sql", "fastapi", "docker"],
+                      "experience": [{"job_title": "Backend developer", "company": "Acme", "duration": "2019 - 2022"}]},
+        "match_score": i % 100,
+        "candidate_status": i % 3 == 0,
+        "summary": "Solid backend experience with Python services and relational databases.",
+        "strengths": ["API design", "PostgreSQL tuning"],
+        "weaknesses": ["Little frontend work"],
+    } for i in range(rows)]).encode()
+
+
+def run(app, accept="gzip"):
+    sent = []
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        sent.append(message)
+
+    scope = {"type": "http", "headers": [(b"accept-encoding", accept.encode())]}
+    asyncio.run(CompressionMiddleware(app)(scope, receive, send))
+    return sent
+
+
+def app_sending(chunks, content_type=b"application/json"):
+    async def app(scope, receive, send):
+        await send({"type": "http.response.start", "status": 200,
+                    "headers": [(b"content-type", content_type)]})
+        for i, chunk in enumerate(chunks):
+            await send({"type": "http.response.body", "body": chunk, "more_body": i < len(chunks) - 1})
+    return app
+
+
+def test_negotiate_honours_q_values():
+    assert negotiate("gzip;q=0.5, identity")[0] == "gzip"
+    assert negotiate("gzip;q=0") is None
+    assert negotiate("*")[0] == compression.ENCODERS[0][0]
+
+
+def test_small_bodies_are_sent_as_is():
+    sent = run(app_sending([b'{"ok": true}']))
+    headers = dict(sent[0]["headers"])
+    assert b"content-encoding" not in headers
+    assert sent[1]["body"] == b'{"ok": true}'
+
+
+def test_each_sse_event_decodes_on_arrival():
+    events = [f"event: progress\ndata: {json.dumps({'index': i, 'pad': 'x' * 400})}\n\n".encode()
+              for i in range(5)]
+    sent = run(app_sending(events, b"text/event-stream"))
+
+    assert dict(sent[0]["headers"])[b"content-encoding"] == b"gzip"
+    decoder = zlib.decompressobj(31)
+    for event, message in zip(events, sent[1:]):
+        assert decoder.decompress(message["body"]) == event
+
+
+@pytest.mark.parametrize("encoding, module", [
+    ("zstd", compression.zstandard),
+    ("br", compression.brotli),
+    ("gzip", zlib),
+])
+def test_benchmark_large_json(encoding, module, record_property):
+    if module is None:
+        pytest.skip(f"{encoding} encoder not installed (pip install '.[compression]')")
+    body = evaluations_payload()
+    started = time.process_time()
+    sent = run(app_sending([body[i:i + 65536] for i in range(0, len(body), 65536)]), accept=encoding)
+    cpu = time.process_time() - started
+    wire = sum(len(m.get("body", b"")) for m in sent[1:])
+
+    record_property("bytes_in", len(body))
+    record_property("bytes_out", wire)
+    record_property("cpu_ms", round(cpu * 1000, 1))
+    assert dict(sent[0]["headers"])[b"content-encoding"] == encoding.encode()
+    assert wire < len(body) * 0.2
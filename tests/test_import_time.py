@@ -0,0 +1,52 @@
+"""Cold-start budget: importing the app or the worker must stay cheap.
+
+Each import runs in a fresh interpreter. Raise IMPORT_BUDGET_SECONDS on
+slow machines; the list of SDKs that must stay unloaded is not negotiable.
+"""
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parents[1]
+BUDGET = float(os.getenv("IMPORT_BUDGET_SECONDS", "3.0"))
+
+# built on first use through src.core.providers
+LAZY_SDKS = ("openai", "google.genai", "pdfminer", "livekit", "resend")
+
+PROBE = """
+import json, sys, time
+started = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - started
+print(json.dumps({{"seconds": elapsed, "modules": sorted(sys.modules)}}))
+"""
+
+
+def cold_import(module):
+    out = subprocess.run(
+        [sys.executable, "-c", PROBE.format(module=module)],
+        cwd=ROOT, capture_output=True, text=True, timeout=60,
+        env={**os.environ, "PYTHONDONTWRITEBYTECODE": "1"},
+    )
+    assert out.returncode == 0, out.stderr
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+@pytest.mark.parametrize("module, required, forbidden", [
+    ("main", ("fastapi", "sqlalchemy"), LAZY_SDKS + ("celery",)),
+    ("src.worker.conn", ("celery",), LAZY_SDKS),
+])
+def test_cold_import(module, required, forbidden):
+    for name in required:
+        pytest.importorskip(name)
+
+    probe = cold_import(module)
+
+    print(f"import {module}: {probe['seconds'] * 1000:.0f} ms")
+    loaded = [name for name in forbidden if name in probe["modules"]]
+    assert not loaded, f"{module} imports {loaded} eagerly"
+    assert probe["seconds"] < BUDGET
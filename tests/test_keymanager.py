@@ -0,0 +1,102 @@
+"""Key leasing: locking around Redis and lease bookkeeping."""
+import threading
+
+import pytest
+
+pytest.importorskip("pydantic_settings")
+
+from src.utils.keymanager import KeyManager  # noqa: E402
+
+
+class FlakyScript:
+    """Stands in for a registered Lua script; fails while ``down`` is set."""
+
+    def __init__(self, manager, result=None):
+        self.manager = manager
+        self.result = result if result is not None else [0, 0]
+        self.down = False
+        self.calls = 0
+        self.called_with_lock = False
+
+    def __call__(self, keys, args=()):
+        self.calls += 1
+        # the lock is free iff another thread can take it right now
+        probe = threading.Thread(target=self._probe)
+        probe.start()
+        probe.join()
+        if self.down:
+            raise ConnectionError("redis down")
+        return self.result
+
+    def _probe(self):
+        if self.manager._cond.acquire(timeout=0.2):
+            self.manager._cond.release()
+        else:
+            self.called_with_lock = True
+
+
+@pytest.fixture
+def manager(monkeypatch):
+    monkeypatch.setenv("TEST_KEYS", "key-a")
+    manager = KeyManager("TEST_KEYS", rpm=0, tpm=0)
+    manager._redis = object()  # only the scripts below are used
+    manager._lease_script = FlakyScript(manager)
+    manager._release_script = FlakyScript(manager)
+    monkeypatch.setattr(manager, "active_keys", lambda: manager.keys)
+    return manager
+
+
+def test_redis_calls_are_made_without_the_lock(manager):
+    key = manager.acquire(timeout=1)
+    manager.release(key)
+
+    assert manager._lease_script.calls == 1 and manager._release_script.calls == 1
+    assert not manager._lease_script.called_with_lock
+    assert not manager._release_script.called_with_lock
+
+
+def test_local_lease_is_not_released_to_redis(manager):
+    manager._lease_script.down = True
+    key = manager.acquire(timeout=1)
+    manager._lease_script.down = False
+    manager.release(key)
+
+    assert manager._release_script.calls == 0
+    assert manager.in_flight[key] == 0
+
+
+def test_shared_lease_is_released_to_redis(manager):
+    shared = manager.acquire(timeout=1)
+    manager._lease_script.down = True
+    local = manager.acquire(timeout=1)
+    manager.release(shared)
+    manager.release(local)
+
+    assert manager._release_script.calls == 1
+
+
+def test_rate_budget_is_shared_across_processes(monkeypatch):
+    fakeredis = pytest.importorskip("fakeredis")
+    pytest.importorskip("lupa")
+    from src.utils import keymanager
+
+    monkeypatch.setenv("TEST_KEYS", "key-a")
+    server = fakeredis.FakeServer()
+
+    def worker_process():
+        manager = KeyManager("TEST_KEYS", rpm=3, tpm=0, redis_url=None)
+        manager._redis = fakeredis.FakeRedis(server=server)
+        manager._lease_script = manager._redis.register_script(keymanager._LEASE_SCRIPT)
+        manager._release_script = manager._redis.register_script(keymanager._RELEASE_SCRIPT)
+        return manager
+
+    first, second = worker_process(), worker_process()
+    granted = []
+    for manager in (first, second, first, second):
+        key, retry_in = manager._try_acquire(manager.keys, tokens=100)
+        granted.append(key)
+        if key:
+            manager.release(key)
+
+    assert granted == ["key-a", "key-a", "key-a", None]
+    assert 0 < retry_in <= 20
@@ -0,0 +1,158 @@
+"""Hedged LLM calls against fake backends."""
+import threading
+import time
+from contextlib import contextmanager
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip("pydantic_settings")
+
+from src.services.llm_router import LLMRouter  # noqa: E402
+from src.utils.keymanager import KeyManager  # noqa: E402
+
+
+class FakeKeyManager:
+    def __init__(self, *keys):
+        self.keys = list(keys)
+        self.failed = []
+
+    def active_keys(self):
+        return self.keys
+
+    @contextmanager
+    def lease(self, keys, tokens=0, on_wait=None, cancel=None):
+        yield keys[0]
+
+    def mark_key_as_failed(self, key):
+        self.failed.append(key)
+
+    def stats(self):
+        return {}
+
+
+class FakeStream:
+    """OpenAI-style chunk stream that records whether it was closed."""
+
+    def __init__(self, chunks, interval):
+        self.chunks = chunks
+        self.interval = interval
+        self.closed = threading.Event()
+
+    def __iter__(self):
+        for text in self.chunks:
+            time.sleep(self.interval)
+            yield SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=text))])
+
+    def close(self):
+        self.closed.set()
+
+
+@pytest.fixture
+def router(monkeypatch):
+    from src.services import llm_router as module
+
+    monkeypatch.setattr(module.settings, "LLM_HEDGE_AFTER_SECONDS", 0.05)
+    monkeypatch.setattr(module.settings, "LLM_HEDGE_MIN_SECONDS", 0.05)
+    key_manager = FakeKeyManager("key")
+    router = LLMRouter(models={"openrouter": ["slow", "fast"]}, key_managers={"openrouter": key_manager})
+    streams = {
+        "slow": FakeStream(["a"] * 200, 0.01),
+        "fast": FakeStream(["{", "}"], 0.001),
+    }
+    client = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(
+        create=lambda model, messages, stream, **extra: streams[model])))
+    monkeypatch.setattr(router, "_client", lambda provider, key: client)
+    # force "slow" to be the primary
+    monkeypatch.setattr(router, "_candidates", lambda providers: [("openrouter", "slow"), ("openrouter", "fast")])
+    return router, streams
+
+
+def test_hedge_wins_and_loser_is_cancelled(router):
+    router, streams = router
+
+    assert router.complete("sys", "user") == "{}"
+    assert streams["slow"].closed.wait(1), "losing attempt kept streaming"
+    # an abandoned attempt is not held against the backend
+    time.sleep(0.05)
+    assert router.key_managers["openrouter"].failed == []
+    assert not router._stats(router.model_stats, ("openrouter", "slow")).outcomes
+
+
+def test_candidates_respect_providers():
+    router = LLMRouter(
+        models={"openrouter": ["a"], "gemini": ["b"]},
+        key_managers={"openrouter": FakeKeyManager("k1"), "gemini": FakeKeyManager("k2")},
+    )
+    assert router._candidates(["gemini"]) == [("gemini", "b")]
+
+
+def test_hedge_clock_starts_after_key_is_leased(router, monkeypatch):
+    router, streams = router
+    streams["slow"] = FakeStream(["{", "}"], 0.001)
+    manager = router.key_managers["openrouter"]
+    calls = []
+
+    @contextmanager
+    def slow_lease(keys, tokens=0, on_wait=None, cancel=None):
+        calls.append(on_wait)
+        if on_wait is not None:  # the primary waits for budget well past the hedge delay
+            time.sleep(0.2)
+        yield keys[0]
+
+    monkeypatch.setattr(manager, "lease", slow_lease)
+    assert router.complete("sys", "user", on_wait=lambda info: None) == "{}"
+    assert len(calls) == 1, "hedged while the primary was still queued for a key"
+
+
+def test_single_model_hedges_on_another_key(monkeypatch):
+    from src.services import llm_router as module
+
+    monkeypatch.setattr(module.settings, "LLM_HEDGE_AFTER_SECONDS", 0.05)
+    router = LLMRouter(models={"openrouter": ["only"]},
+                       key_managers={"openrouter": FakeKeyManager("slow-key", "fast-key")})
+    streams = {
+        "slow-key": FakeStream(["a"] * 200, 0.01),
+        "fast-key": FakeStream(["{", "}"], 0.001),
+    }
+    clients = {
+        key: SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(
+            create=lambda model, messages, stream, _s=stream, **extra: _s)))
+        for key, stream in streams.items()
+    }
+    monkeypatch.setattr(router, "_client", lambda provider, key: clients[key])
+    # "slow-key" sorts first for the primary; the hedge must skip it
+    monkeypatch.setattr(router, "_key_order",
+                        lambda provider, exclude=(): [k for k in ("slow-key", "fast-key") if k not in exclude])
+
+    assert router.complete("sys", "user") == "{}"
+    assert streams["slow-key"].closed.wait(1)
+
+
+def test_single_key_single_model_does_not_hedge():
+    router = LLMRouter(models={"openrouter": ["only"]},
+                       key_managers={"openrouter": FakeKeyManager("key")})
+    assert router._hedge_target([("openrouter", "only")], ["key"]) is None
+
+
+def test_cancel_stops_waiting_for_a_lease(monkeypatch):
+    monkeypatch.setenv("TEST_KEYS", "key-a")
+    manager = KeyManager("TEST_KEYS", max_in_flight=1, redis_url=None, rpm=0, tpm=0)
+    held = manager.acquire(timeout=1)
+    cancel = threading.Event()
+    outcome = []
+
+    def waiter():
+        try:
+            manager.acquire(timeout=30, cancel=cancel)
+        except Exception as exc:
+            outcome.append(exc)
+
+    thread = threading.Thread(target=waiter)
+    thread.start()
+    time.sleep(0.1)
+    cancel.set()
+    thread.join(1)
+    assert not thread.is_alive(), "still waiting for a key after cancel"
+    assert type(outcome[0]).__name__ == "CancelledError"
+    manager.release(held)
@@ -0,0 +1,111 @@
+"""Archiving old evaluation partitions, with psycopg2- and psycopg 3-style cursors."""
+import gzip
+from contextlib import contextmanager
+
+import pytest
+
+pytest.importorskip("sqlalchemy")
+pytest.importorskip("pydantic_settings")
+
+from src.db import partitions  # noqa: E402
+
+CSV = [b"id,evaluated_at\n", b"e1,2020-01-05\n", b"e2,2020-01-09\n"]
+
+
+class Psycopg3Cursor:
+    def __init__(self, log, rows=2):
+        self.log = log
+        self.rows = rows
+
+    def execute(self, sql):
+        self.log.append(sql)
+
+    def fetchone(self):
+        return (self.rows,)
+
+    @contextmanager
+    def copy(self, sql):
+        self.log.append(sql)
+        yield iter(CSV)
+
+
+class Psycopg2Cursor(Psycopg3Cursor):
+    copy = None
+
+    def copy_expert(self, sql, fh):
+        self.log.append(sql)
+        for line in CSV:
+            fh.write(line)
+
+
+class FakeRaw:
+    def __init__(self, cursor):
+        self._cursor = cursor
+        self.commits = 0
+
+    def cursor(self):
+        return self._cursor
+
+    def commit(self):
+        self.commits += 1
+
+    def rollback(self):
+        self._cursor.log.append("ROLLBACK")
+
+    def close(self):
+        pass
+
+
+class FakeEngine:
+    def __init__(self, cursor):
+        self.cursor = cursor
+
+    @contextmanager
+    def connect(self):
+        yield None
+
+    def raw_connection(self):
+        return FakeRaw(self.cursor)
+
+
+@pytest.fixture
+def archive(monkeypatch, tmp_path):
+    def run(cursor_cls, **kwargs):
+        log = []
+        monkeypatch.setattr(partitions, "engine", FakeEngine(cursor_cls(log, **kwargs)))
+        monkeypatch.setattr(partitions, "list_partitions",
+                            lambda conn: ["evaluations_y2020m01", "evaluations_default"])
+        archived = partitions.archive_partitions(retention_months=12, archive_dir=str(tmp_path))
+        return archived, log
+    return run
+
+
+@pytest.mark.parametrize("cursor_cls", [Psycopg2Cursor, Psycopg3Cursor])
+def test_copy_runs_before_detach_with_either_driver(archive, tmp_path, cursor_cls):
+    archived, log = archive(cursor_cls)
+
+    assert archived == ["evaluations_y2020m01"]
+    with gzip.open(tmp_path / "evaluations_y2020m01.csv.gz") as fh:
+        assert fh.read() == b"".join(CSV)
+    copy = next(i for i, sql in enumerate(log) if sql.startswith("COPY"))
+    clear = next(i for i, sql in enumerate(log) if sql.startswith("UPDATE interviews"))
+    detach = next(i for i, sql in enumerate(log) if "DETACH PARTITION" in sql)
+    assert copy < clear < detach
+
+
+def test_rows_added_after_the_copy_keep_the_partition(archive):
+    class GrowingCursor(Psycopg3Cursor):
+        counts = iter([2, 3])
+
+        def fetchone(self):
+            return (next(self.counts),)
+
+    with pytest.raises(RuntimeError, match="evaluations_y2020m01"):
+        archive(GrowingCursor)
+
+
+def test_retention_needs_an_archive_dir(monkeypatch):
+    monkeypatch.setattr(partitions.settings, "EVALUATION_ARCHIVE_DIR", None)
+    with pytest.raises(ValueError):
+        partitions.archive_partitions(retention_months=12)
+    assert partitions.archive_partitions(retention_months=0) == []
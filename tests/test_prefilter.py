@@ -0,0 +1,57 @@
+"""Local BM25 pre-filter and contact extraction."""
+import pytest
+
+from src.services.prefilter import RequisitionIndex, find_phone
+
+REQUISITION = "Senior Python developer with PostgreSQL, Kubernetes and AWS experience"
+RESUMES = [
+    "Python developer, five years of PostgreSQL and AWS, some Kubernetes",
+    "Java engineer with Spring and Oracle",
+    "Python and Django, PostgreSQL, team player, project work",
+    "Graphic designer, Photoscope, Illustrator",
+]
+
+
+def test_scores_do_not_depend_on_history_or_order():
+    index = RequisitionIndex(REQUISITION)
+    first = index.score_batch(RESUMES)
+    # unrelated uploads in between must not move the scores
+    index.score_batch(["Python"] * 50)
+    again = index.score_batch(RESUMES)
+    reversed_scores = index.score_batch(RESUMES[::-1])[::-1]
+
+    assert first == again == reversed_scores
+
+
+def test_relevant_resumes_rank_first():
+    scores = RequisitionIndex(REQUISITION).score_batch(RESUMES)
+
+    assert scores[0] == max(scores)
+    assert scores[3] == 0.0
+    assert all(0.0 <= s <= 1.0 for s in scores)
+
+
+def test_empty_requisition_passes_everything():
+    assert RequisitionIndex("").score_batch(RESUMES[:2]) == [1.0, 1.0]
+
+
+@pytest.mark.parametrize("text, phone", [
+    ("Call +91 98765 43210 any time", "+91 98765 43210"),
+    ("(555) 123-4567", "(555) 123-4567"),
+    ("phone: 9876543210", "9876543210"),
+    ("+44 20 7946 0958", "+44 20 7946 0958"),
+    ("Acme Corp, 2019 - 2021", None),
+    ("B.Sc., GPA 3.8 (2015-2019)", None),
+    ("2015-2019 2020-2022", None),
+    ("Employee ID 12345", None),
+])
+def test_find_phone(text, phone):
+    assert find_phone(text) == phone
+
+
+def test_normalize_phone_rejects_year_ranges():
+    pytest.importorskip("sqlalchemy")
+    from src.services.candidate_dedup import normalize_phone
+
+    assert normalize_phone("2019 - 2021") is None
+    assert normalize_phone("+91 98765 43210") == normalize_phone("098765-43210") == "9876543210"
@@ -0,0 +1,111 @@
+"""Repairing resume answers that fail schema validation."""
+import json
+
+import pytest
+
+pytest.importorskip("pydantic_settings")
+
+from src.services import process_file  # noqa: E402
+
+
+class FakeRouter:
+    def __init__(self, *answers):
+        self.answers = list(answers)
+        self.prompts = []
+
+    def complete(self, system_prompt, user_text, **kwargs):
+        self.prompts.append(user_text)
+        return self.answers.pop(0)
+
+
+@pytest.fixture
+def route(monkeypatch):
+    monkeypatch.setattr(process_file, "read_prompt", lambda job_description: "system")
+    monkeypatch.setattr(process_file.settings, "LLM_REASK_ATTEMPTS", 1)
+
+    def install(*answers):
+        router = FakeRouter(*answers)
+        monkeypatch.setattr(process_file, "llm_router", router)
+        return router
+
+    return install
+
+
+def test_unfixable_fields_are_dropped_not_fatal(route):
+    answer = {
+        "candidate_profile": {
+            "name": "Ada",
+            "skills": ["python", {"oops": 1}, "sql"],
+            "experience": [{"job_title": "dev", "company": ["x"]}, "garbage"],
+        },
+        "evaluation": {"match_score": 150, "is_eligible": True},
+    }
+    router = route(json.dumps(answer), "{}")  # the re-ask fixes nothing
+
+    result = process_file.generate_content("resume", "job")
+
+    assert len(router.prompts) == 2
+    assert result.candidate_profile.name == "Ada"
+    assert result.candidate_profile.skills == ["python", "sql"]
+    assert [e.job_title for e in result.candidate_profile.experience] == ["dev"]
+    assert result.candidate_profile.experience[0].company is None
+    assert result.evaluation.match_score is None
+    assert result.evaluation.is_eligible is True
+
+
+def test_reask_fixes_are_applied(route):
+    answer = {"candidate_profile": {"name": "Ada"}, "evaluation": {"match_score": 150}}
+    route(json.dumps(answer), json.dumps({"evaluation.match_score": 72}))
+
+    result = process_file.generate_content("resume", "job")
+
+    assert result.evaluation.match_score == 72
+
+
+def test_unknown_eligibility_stays_unknown(route):
+    route(json.dumps({"candidate_profile": {"name": "Ada"}, "evaluation": {"match_score": 50}}))
+
+    assert process_file.generate_content("resume", "job").evaluation.is_eligible is None
+
+
+def test_fields_straddling_chunks_are_found_once():
+    answer = '{"candidate_profile": {"name": "Ada Lovelace", "email": "ada@example.com"}, ' \
+             '"evaluation": {"match_score": 87, "is_eligible": true}}'
+    extractor = process_file.PartialFieldExtractor()
+    found = {}
+    for i in range(0, len(answer), 3):
+        fields = extractor.feed(answer[i:i + 3])
+        assert not fields.keys() & found.keys()
+        found.update(fields)
+
+    assert found == {"name": "Ada Lovelace", "email": "ada@example.com",
+                     "match_score": 87.0, "is_eligible": True}
+
+
+def test_scan_cost_does_not_grow_with_the_answer():
+    extractor = process_file.PartialFieldExtractor()
+    extractor.feed('{"candidate_profile": {"name": "Ada", ')
+    for _ in range(5000):
+        extractor.feed('"skill", ' * 20)
+    # only the bounded tail is kept between chunks
+    assert len(extractor._tail) <= extractor.LOOKBACK
+
+
+def test_each_attempt_gets_a_fresh_extractor(route, monkeypatch):
+    answer = json.dumps({"candidate_profile": {"name": "Ada"}, "evaluation": {"match_score": 50}})
+
+    class RetryingRouter(FakeRouter):
+        def complete(self, system_prompt, user_text, on_stream=None, **kwargs):
+            # first attempt streams the name, then dies; the retry streams it again
+            on_stream()('{"candidate_profile": {"name": "Ada", ')
+            on_delta = on_stream()
+            for i in range(0, len(answer), 7):
+                on_delta(answer[i:i + 7])
+            return answer
+
+    monkeypatch.setattr(process_file, "llm_router", RetryingRouter())
+    events = []
+    process_file.generate_content("resume", "job", on_progress=events.append)
+
+    names = [e["name"] for e in events if e.get("status") == "partial" and "name" in e]
+    assert names == ["Ada", "Ada"]
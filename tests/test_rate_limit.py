@@ -0,0 +1,50 @@
+"""Rate limits apply to the abusable endpoints only."""
+import asyncio
+
+import pytest
+
+pytest.importorskip("fastapi")
+pytest.importorskip("pydantic_settings")
+
+from src.middleware.rate_limit import RateLimitMiddleware  # noqa: E402
+
+
+async def ok_app(scope, receive, send):
+    await send({"type": "http.response.start", "status": 200, "headers": []})
+    await send({"type": "http.response.body", "body": b"{}"})
+
+
+def statuses(middleware, method, path, times, client="10.0.0.5"):
+    async def run():
+        codes = []
+        for _ in range(times):
+            sent = []
+
+            async def send(message):
+                sent.append(message)
+
+            async def receive():
+                return {"type": "http.request", "body": b""}
+
+            scope = {"type": "http", "method": method, "path": path, "headers": [],
+                     "client": (client, 1234), "query_string": b""}
+            await middleware(scope, receive, send)
+            codes.append(sent[0]["status"])
+        return codes
+    return asyncio.run(run())
+
+
+@pytest.mark.parametrize("method, path", [
+    ("GET", "/api/interview/get-context/room-1"),
+    ("POST", "/api/interview/analyze"),
+    ("GET", "/api/interview/get-data/abc"),
+])
+def test_agent_and_candidate_traffic_from_one_ip_is_not_throttled(method, path):
+    middleware = RateLimitMiddleware(ok_app, redis_url=None)
+    assert set(statuses(middleware, method, path, 500)) == {200}
+
+
+def test_password_guessing_is_throttled():
+    middleware = RateLimitMiddleware(ok_app, redis_url=None)
+    codes = statuses(middleware, "POST", "/api/interview/check-password", 50)
+    assert codes[0] == 200 and codes[-1] == 429
@@ -0,0 +1,57 @@
+"""Readiness checks for the Redis instances the app depends on."""
+import pytest
+
+pytest.importorskip("pydantic_settings")
+redis = pytest.importorskip("redis")
+
+from src.services import readiness  # noqa: E402
+
+
+@pytest.fixture
+def pings(monkeypatch):
+    """URLs pinged; the ones in ``down`` fail."""
+    state = {"pinged": [], "down": set()}
+
+    class FakeRedis:
+        def __init__(self, url):
+            self.url = url
+
+        @classmethod
+        def from_url(cls, url, **kwargs):
+            return cls(url)
+
+        def ping(self):
+            state["pinged"].append(self.url)
+            if self.url in state["down"]:
+                raise ConnectionError("connection refused")
+            return True
+
+    monkeypatch.setattr(redis, "Redis", FakeRedis)
+    monkeypatch.setattr(readiness.settings, "REDIS_URL", "redis://broker")
+    monkeypatch.setattr(readiness.settings, "KEY_HEALTH_REDIS_URL", None)
+    monkeypatch.setattr(readiness, "CHECKS", {
+        "redis": readiness._check_redis,
+        "key_health_redis": readiness._check_key_health_redis,
+    })
+    return state
+
+
+def test_broker_is_checked_without_key_health_redis(pings):
+    pings["down"].add("redis://broker")
+
+    status = readiness.check_readiness()
+
+    assert pings["pinged"] == ["redis://broker"]
+    assert not status["ready"]
+    assert status["checks"]["key_health_redis"]["detail"] == "not configured"
+
+
+def test_key_health_redis_is_checked_when_set(pings, monkeypatch):
+    monkeypatch.setattr(readiness.settings, "KEY_HEALTH_REDIS_URL", "redis://keys")
+    pings["down"].add("redis://keys")
+
+    status = readiness.check_readiness()
+
+    assert pings["pinged"] == ["redis://broker", "redis://keys"]
+    assert status["checks"]["redis"]["ok"]
+    assert not status["ready"]
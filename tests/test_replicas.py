@@ -0,0 +1,50 @@
+"""Replica health: lag and WAL receiver status."""
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip("fastapi")
+pytest.importorskip("pydantic_settings")
+
+from src.db import replicas  # noqa: E402
+
+
+class FakeEngine:
+    def __init__(self, status, lag):
+        self.row = SimpleNamespace(receiver_status=status, lag=lag)
+
+    def connect(self):
+        engine = self
+
+        class Conn:
+            def __enter__(self):
+                return self
+
+            def __exit__(self, *exc):
+                return False
+
+            def execute(self, query):
+                return SimpleNamespace(one=lambda: engine.row)
+
+        return Conn()
+
+
+def replica(status, lag):
+    r = replicas.Replica.__new__(replicas.Replica)
+    r.engine = FakeEngine(status, lag)
+    r.lag = None
+    r.receiver_status = None
+    r.checked_at = float("-inf")
+    r._lock = replicas.threading.Lock()
+    return r
+
+
+@pytest.mark.parametrize("status, lag, healthy", [
+    ("streaming", 0, True),
+    ("streaming", 1_000, False),
+    # receiver gone: received == replayed, so the lag column says 0
+    (None, 0, False),
+    ("stopping", 0, False),
+])
+def test_healthy(status, lag, healthy):
+    assert replica(status, lag).healthy() is healthy
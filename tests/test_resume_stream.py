@@ -0,0 +1,165 @@
+"""Resume upload SSE stream, up to the LLM step."""
+import asyncio
+
+import pytest
+
+pytest.importorskip("fastapi")
+pytest.importorskip("pydantic_settings")
+
+from src.services import process_evalution  # noqa: E402
+
+
+class FakeUpload:
+    def __init__(self, filename, text):
+        self.filename = filename
+        self.text = text
+
+    async def read(self):
+        return self.text.encode()
+
+
+class FakeRequest:
+    def __init__(self, disconnect_after):
+        self.checks = 0
+        self.disconnect_after = disconnect_after
+
+    async def is_disconnected(self):
+        self.checks += 1
+        return self.checks > self.disconnect_after
+
+
+def collect(files, request):
+    async def run():
+        return [event async for event in process_evalution.event_stream_generator(files, "Python", request)]
+    return asyncio.run(run())
+
+
+def test_extraction_streams_and_stops_on_disconnect(monkeypatch):
+    extracted = []
+
+    def fake_extract(path):
+        with open(path) as f:
+            extracted.append(f.read())
+        return extracted[-1]
+
+    monkeypatch.setattr(process_evalution, "extract_resume_text", fake_extract)
+    files = [FakeUpload(f"{i}.pdf", f"resume {i}") for i in range(5)]
+
+    events = collect(files, FakeRequest(disconnect_after=1))
+
+    assert len(extracted) == 2
+    assert [e.split("\n", 1)[0] for e in events] == ["event: progress"] * 2
+    assert all('"status": "extracted"' in e for e in events)
+
+
+@pytest.fixture
+def fake_db(monkeypatch):
+    """In-memory stand-ins for the persistence helpers."""
+    from contextlib import contextmanager
+    from types import SimpleNamespace
+
+    store = {"candidates": {}, "bulk_calls": [], "single_calls": 0}
+
+    @contextmanager
+    def session_scope():
+        yield None
+
+    def find_candidate(db, digest=None, email=None, phone=None):
+        candidate_id = store["candidates"].get(email)
+        return SimpleNamespace(id=candidate_id) if candidate_id else None
+
+    def persist_evaluations_bulk(db, rows, evaluated_by_id=None):
+        store["bulk_calls"].append(len(rows))
+        if any(profile["email"].startswith("broken") for profile, _ in rows):
+            raise RuntimeError("constraint violated")
+        ids = []
+        for profile, _ in rows:
+            candidate_id = f"c{len(store['candidates'])}"
+            store["candidates"][profile["email"]] = candidate_id
+            ids.append((candidate_id, f"e-{candidate_id}"))
+        return ids
+
+    def persist_evaluation(db, profile, evaluation, candidate_id=None, evaluation_id=None, evaluated_by_id=None):
+        store["single_calls"] += 1
+        return candidate_id, f"e2-{candidate_id}", True
+
+    for name, value in {
+        "session_scope": session_scope,
+        "find_candidate": find_candidate,
+        "find_evaluation": lambda db, candidate_id, requisition_id: None,
+        "persist_evaluations_bulk": persist_evaluations_bulk,
+        "persist_evaluation": persist_evaluation,
+        "_queue_result_email": lambda db, *args: "event",
+    }.items():
+        monkeypatch.setattr(process_evalution, name, value)
+    return store
+
+
+def parsed_entry(index, email):
+    from src.schemas.evaluation import CandidateProfile, EvaluationOut
+
+    return {
+        "index": index,
+        "result_candidate": EvaluationOut(candidate_profile=CandidateProfile(name=email, email=email)),
+        "digest": f"digest-{index}",
+        "candidate_id": None,
+    }
+
+
+def test_batch_is_stored_with_one_bulk_insert(fake_db):
+    parsed = [parsed_entry(i, f"{i}@example.com") for i in range(4)]
+
+    outcomes = process_evalution.persist_parsed_resumes(parsed, "job")
+
+    assert fake_db["bulk_calls"] == [4]
+    assert sorted(outcomes) == [0, 1, 2, 3]
+
+
+def test_same_person_twice_in_a_batch_is_not_inserted_twice(fake_db):
+    parsed = [parsed_entry(0, "ada@example.com"), parsed_entry(1, "bob@example.com"),
+              parsed_entry(2, "ada@example.com")]
+
+    process_evalution.persist_parsed_resumes(parsed, "job")
+
+    assert fake_db["bulk_calls"] == [2]
+    assert fake_db["single_calls"] == 1
+    assert len(fake_db["candidates"]) == 2
+
+
+def test_resume_without_email_does_not_sink_its_batch(fake_db):
+    parsed = [parsed_entry(0, "ada@example.com"), parsed_entry(1, None), parsed_entry(2, "bob@example.com")]
+
+    outcomes = process_evalution.persist_parsed_resumes(parsed, "job")
+
+    assert fake_db["bulk_calls"] == [2]
+    assert isinstance(outcomes[1], ValueError)
+    assert outcomes[0][1] == outcomes[2][1] == "event"
+
+
+def test_failed_batch_is_retried_row_by_row(fake_db):
+    parsed = [parsed_entry(0, "ada@example.com"), parsed_entry(1, "broken@example.com"),
+              parsed_entry(2, "bob@example.com")]
+
+    outcomes = process_evalution.persist_parsed_resumes(parsed, "job")
+
+    assert fake_db["bulk_calls"] == [3, 1, 1, 1]
+    assert isinstance(outcomes[1], RuntimeError)
+    assert outcomes[0][1] == outcomes[2][1] == "event"
+    assert set(fake_db["candidates"]) == {"ada@example.com", "bob@example.com"}
+
+
+def test_stream_stores_llm_results_in_batches(fake_db, monkeypatch):
+    from src.schemas.evaluation import CandidateProfile, EvaluationOut
+
+    monkeypatch.setattr(process_evalution.settings, "PREFILTER_MODE", "off")
+    monkeypatch.setattr(process_evalution.settings, "EVALUATION_PERSIST_BATCH_SIZE", 2)
+    monkeypatch.setattr(process_evalution, "extract_resume_text", lambda path: open(path).read())
+    monkeypatch.setattr(
+        process_evalution, "generate_content",
+        lambda text, job, on_progress=None: EvaluationOut(candidate_profile=CandidateProfile(name=text, email=f"{text}@x.io")))
+    files = [FakeUpload(f"{i}.pdf", f"person{i}") for i in range(5)]
+
+    events = collect(files, FakeRequest(disconnect_after=100))
+
+    assert fake_db["bulk_calls"] == [2, 2, 1]
+    assert sum(e.startswith("event: result") for e in events) == 5
@@ -0,0 +1,52 @@
+"""Coalesced interview reads: only the leader opens a database session."""
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+import pytest
+
+pytest.importorskip("fastapi")
+pytest.importorskip("pydantic_settings")
+
+from src.api.routes import interview_analyse  # noqa: E402
+
+
+class SlowQuery:
+    """Enough of a Query for ``get_context``: slow, and finds nothing."""
+
+    def options(self, *args):
+        return self
+
+    def filter(self, *args):
+        return self
+
+    def first(self):
+        time.sleep(0.2)
+        return None
+
+
+def test_followers_never_open_a_session(monkeypatch):
+    opened = []
+    lock = threading.Lock()
+
+    @contextmanager
+    def session_scope():
+        with lock:
+            opened.append(1)
+        yield type("Session", (), {"query": lambda self, *a: SlowQuery()})()
+
+    monkeypatch.setattr(interview_analyse, "session_scope", session_scope)
+    interview_analyse.get_context.flight.forget(("context", "room-herd"))
+
+    def call():
+        try:
+            interview_analyse.get_context(room_name="room-herd")
+        except interview_analyse.HTTPException as exc:
+            return exc.status_code
+
+    with ThreadPoolExecutor(20) as pool:
+        codes = list(pool.map(lambda _: call(), range(20)))
+
+    assert codes == [404] * 20
+    assert len(opened) == 1
@@ -0,0 +1,102 @@
+"""Segmented transcript analysis: synthetic 2-hour interviews, LLM stubbed out."""
+import threading
+import time
+
+import pytest
+
+from src.services.transcript import compact_transcript, reduce_analyses, split_segments
+
+# 2 hours at 150 words per minute, alternating speakers
+TWO_HOURS_WORDS = 2 * 60 * 150
+
+
+def synthetic_transcript(total_words: int = TWO_HOURS_WORDS, turn_words: int = 60):
+    items = []
+    for i in range(total_words // turn_words):
+        role = "assistant" if i % 2 == 0 else "user"
+        text = " ".join(f"w{i}_{j}" for j in range(turn_words - 1))
+        items.append({"type": "message", "role": role, "content": [text + (" ?" if role == "assistant" else " .")]})
+    return {"room_name": "bench-room", "items": items}
+
+
+def test_segments_cover_every_turn_with_overlap():
+    turns = compact_transcript(synthetic_transcript())
+    segments = split_segments(turns, 6000, 2)
+
+    assert len(segments) > 1
+    assert segments[0][0] is turns[0] and segments[-1][-1] is turns[-1]
+    for prev, nxt in zip(segments, segments[1:]):
+        assert prev[-2:] == nxt[:2]
+
+
+def test_reduce_weights_scores():
+    merged = reduce_analyses(
+        [{"candidateOverview": {"domainKnowledge": 8}}, {"candidateOverview": {"domainKnowledge": 2}}],
+        [3, 1],
+    )
+    assert merged["candidateOverview"]["domainKnowledge"] == pytest.approx(6.5, abs=0.5)
+
+
+@pytest.fixture
+def process_interview(monkeypatch):
+    pytest.importorskip("pydantic_settings")
+    from src.services import process_interview as module
+
+    monkeypatch.setattr(module.settings, "TRANSCRIPT_SEGMENT_WORDS", 2000)
+    monkeypatch.setattr(module.settings, "TRANSCRIPT_ANALYSIS_PARALLELISM", 4)
+    monkeypatch.setattr(module, "_segment_pool", None)
+    return module
+
+
+def test_parallelism_is_shared_across_jobs(process_interview, monkeypatch):
+    in_flight = 0
+    peak = 0
+    lock = threading.Lock()
+
+    def fake_analyze(dialogue):
+        nonlocal in_flight, peak
+        with lock:
+            in_flight += 1
+            peak = max(peak, in_flight)
+        time.sleep(0.02)
+        with lock:
+            in_flight -= 1
+        return {"analysis": {"candidateOverview": {"domainKnowledge": 7}}}
+
+    monkeypatch.setattr(process_interview, "_analyze_dialogue", fake_analyze)
+    transcript = synthetic_transcript()
+    results = []
+    jobs = [
+        threading.Thread(target=lambda: results.append(process_interview.analyze_transcript_content(transcript)))
+        for _ in range(2)
+    ]
+    started = time.perf_counter()
+    for job in jobs:
+        job.start()
+    for job in jobs:
+        job.join()
+    elapsed = time.perf_counter() - started
+
+    print(f"2 concurrent 2-hour transcripts: {elapsed * 1000:.0f} ms, peak {peak} LLM calls")
+    assert peak <= 4
+    assert all(r["status"] == "completed" and not r["partial"] for r in results)
+
+
+def test_failed_windows_mark_result_partial(process_interview, monkeypatch):
+    calls = 0
+
+    def flaky_analyze(dialogue):
+        nonlocal calls
+        calls += 1
+        if calls == 2:
+            raise RuntimeError("model timeout")
+        return {"analysis": {"candidateOverview": {"domainKnowledge": 7}}}
+
+    monkeypatch.setattr(process_interview.settings, "TRANSCRIPT_ANALYSIS_PARALLELISM", 1)
+    monkeypatch.setattr(process_interview, "_analyze_dialogue", flaky_analyze)
+    result = process_interview.analyze_transcript_content(synthetic_transcript())
+
+    assert result["partial"] is True
+    [missing] = result["analysis"]["missingWindows"]
+    assert missing["startTurn"] < missing["endTurn"]
+    assert missing["error"] == "model timeout"